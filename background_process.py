@@ -0,0 +1,38 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import os
+import subprocess
+import threading
+
+# Starts the scripts that render and sweep designs outside Rhino (see turntable_render.py and design_sweep.py) as separate
+# processes, and reports how they ended. Rhino doesn't wait for them, so a process that can't be started is raised
+# straight away, and one that fails later is reported through its on_exit function.
+
+# Return the full filename of program (a name looked for on the PATH, or a filename), or None if it isn't there
+def find_program(program):
+	if os.path.dirname(program):
+		return program if os.path.isfile(program) else None
+	extensions = [""] + (os.environ.get("PATHEXT", "").split(os.pathsep) if os.name == "nt" else [])
+	for folder in os.environ.get("PATH", "").split(os.pathsep):
+		for extension in extensions:
+			filename = os.path.join(folder, program + extension)
+			if os.path.isfile(filename):
+				return filename
+	return None
+
+# Start command (a list, the program first) in folder cwd and return its Popen without waiting for it. Raises OSError
+# if the program can't be found or started. on_exit(exit code) is called on a background thread when the process ends
+# (which then waits for it: don't wait on the process elsewhere, Python 2 can hand that thread exit code 0).
+def start(command, cwd=None, on_exit=None):
+	program = find_program(command[0])
+	if program is None:
+		raise OSError("'" + command[0] + "' not found")
+	process = subprocess.Popen([program] + command[1:], cwd=cwd)
+	if on_exit is not None:
+		thread = threading.Thread(target=lambda: on_exit(process.wait()))
+		thread.daemon = True
+		thread.start()
+	return process
@@ -0,0 +1,157 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import os
+import sys
+import json
+import argparse
+import config
+import emotion_class
+import emotion_index
+import emotion_registry
+import form_kernel
+import mesh_export
+import user_dictionary_store
+
+try:
+	import multiprocessing
+except ImportError:		# IronPython has no multiprocessing; the jobs then run one after another
+	multiprocessing = None
+
+# Generates designs without Rhino or any user input, for pre-generating many variants at once.
+# The jobs file is a JSON list of jobs like
+#	{"object": "Bottle", "words": ["calm", "joy"], "breakdown": {"joy": 2, "trust": 1, ...}, "name": "calm_bottle"}
+# where "object" is an object type or its letter in config.object_types, "words" is a list of words or a string of words
+# separated by periods, and "breakdown" (optional) sets the emotions of the words the way the sliders do (missing emotions are 0).
+# Every design is written as a mesh in each of the formats asked for (see mesh_export.py), using all cores. With
+# --watertight the ends Rhino leaves open are capped as well, so the files can be printed, and a design whose mesh still
+# isn't closed is reported as failed instead of written (see mesh_export.check_watertight). --detail picks the level of
+# detail in config.detail_levels the forms are built and meshed at; the sample options override its mesh resolution.
+#
+# Run "python batch_generate.py jobs.json output_folder [--formats obj,stl,3mf,json] [--detail design] [--processes 4] [--force] [--watertight]"
+
+# Dictionaries each worker process loads once
+system_emotion_dict = None
+user_emotion_dict = None
+
+# Load the dictionaries the jobs need (run once in every worker process)
+def initialize_worker():
+	global system_emotion_dict, user_emotion_dict
+	system_emotion_dict = emotion_index.load_system_emotion_dictionary()
+	user_emotion_dict = user_dictionary_store.load_user_emotion_dictionary()
+
+# Return the jobs in jobs_filename with their object types and words checked and normalized
+def read_jobs(jobs_filename):
+	with open(jobs_filename) as jobs_file:
+		jobs = json.loads(jobs_file.read())
+	object_types = emotion_registry.get_object_features()["object_name"]
+	for (index, job) in enumerate(jobs):
+		object_id = config.object_types.get(job.get("object"), job.get("object"))
+		if object_id not in object_types:
+			raise ValueError("Job " + str(index) + ": unknown object type '" + str(job.get("object")) + "' (use one of " + ", ".join(sorted(object_types)) + ")")
+		words = job.get("words", "neutral")
+		if not isinstance(words, list):
+			words = words.split(".")
+		job["object"] = object_id
+		job["words"] = [word.strip().lower() for word in words if word.strip()] or ["neutral"]
+		job["index"] = index
+	return jobs
+
+# Return the name a job's files are written under: its "name", or its number, object type and words
+def get_job_name(job):
+	if job.get("name"):
+		return job["name"]
+	return "%05d_%s_%s" % (job["index"], job["object"], ".".join(sorted(job["words"])))
+
+# Return the files job is written to in output_folder
+def get_output_filenames(job, output_folder, formats):
+	return [os.path.join(output_folder, get_job_name(job) + "." + extension) for extension in formats]
+
+# Return the Emotion for the job's words, using its breakdown if it has one
+def get_job_emotion(job):
+	unknown_words = [word for word in job["words"] if word not in system_emotion_dict]
+	if unknown_words:
+		raise KeyError("not in the dictionary: " + ", ".join(unknown_words))
+	emotion = emotion_class.Emotion(".".join(job["words"]), user_emotion_dict, system_emotion_dict, emotion_registry.get_primary_emotion_taxonomy(), emotion_registry.get_primary_scaling_factors())
+	if job.get("breakdown") is None:
+		return emotion
+	breakdown = dict((primary_emotion, 0) for primary_emotion in config.primary_emotions[1:])
+	breakdown.update(job["breakdown"])
+	job_user_emotion_dict = dict(user_emotion_dict)
+	job_user_emotion_dict[emotion.get_emotion()] = breakdown
+	return emotion_class.Emotion(emotion.get_emotion(), job_user_emotion_dict, system_emotion_dict, emotion_registry.get_primary_emotion_taxonomy(), emotion_registry.get_primary_scaling_factors())
+
+# Generate the design of one job and write its files. Returns (job name, files written, error message or None),
+# so a bad job is reported instead of stopping the batch.
+def generate_design(arguments):
+	(job, output_folder, formats, detail_level, profile_samples, span_samples, feature_samples, watertight) = arguments
+	name = get_job_name(job)
+	try:
+		emotion = get_job_emotion(job)
+		form = form_kernel.build_form(job["object"], emotion.get_properties(), None, detail_level)
+		mesh = mesh_export.get_mesh(form, profile_samples, span_samples, name, feature_samples, watertight)
+		if watertight:
+			mesh_export.check_watertight(mesh)
+		filenames = get_output_filenames(job, output_folder, formats)
+		for filename in filenames:
+			mesh_export.write_mesh(mesh, filename)
+		return (name, filenames, None)
+	except Exception as error:
+		return (name, [], type(error).__name__ + ": " + str(error))
+
+# Generate every job, processes at a time (all cores if None). Jobs whose files all exist already are skipped unless force.
+# Returns the list of (job name, files written, error message or None) in the order the jobs finish.
+def generate_designs(jobs, output_folder, formats=("obj",), processes=None, force=False, profile_samples=mesh_export.DEFAULT_PROFILE_SAMPLES, span_samples=mesh_export.DEFAULT_SPAN_SAMPLES, feature_samples=mesh_export.DEFAULT_FEATURE_SAMPLES, watertight=False, detail_level=form_kernel.DEFAULT_DETAIL_LEVEL):
+	if not os.path.exists(output_folder):
+		os.makedirs(output_folder)
+	if not force:
+		jobs = [job for job in jobs if not all(os.path.exists(filename) for filename in get_output_filenames(job, output_folder, formats))]
+	arguments = [(job, output_folder, formats, detail_level, profile_samples, span_samples, feature_samples, watertight) for job in jobs]
+	# loaded here first as well, so the dictionary index is rebuilt (if needed) before the workers open it
+	initialize_worker()
+	if multiprocessing is None or processes == 1 or len(jobs) < 2:
+		return [generate_design(argument) for argument in arguments]
+	processes = processes or multiprocessing.cpu_count()
+	pool = multiprocessing.Pool(processes, initialize_worker)
+	try:
+		return list(pool.imap_unordered(generate_design, arguments, max(1, len(arguments) // (processes * 8))))
+	finally:
+		pool.close()
+		pool.join()
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Generate EmotiveModeler designs as mesh files, without Rhino.")
+	parser.add_argument("jobs", help="JSON list of jobs")
+	parser.add_argument("output_folder")
+	parser.add_argument("--formats", default="obj", help="comma separated mesh formats: " + ", ".join(sorted(mesh_export.WRITERS)))
+	parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per core)")
+	parser.add_argument("--detail", default=form_kernel.DEFAULT_DETAIL_LEVEL, choices=sorted(config.detail_levels), help="level of detail of the forms and meshes")
+	parser.add_argument("--profile-samples", type=int, default=None, help="points around every cross-section (default: from the detail level)")
+	parser.add_argument("--span-samples", type=int, default=None, help="rings from one cross-section to the next (default: from the detail level)")
+	parser.add_argument("--feature-samples", type=int, default=None, help="points around the cylinder and torus features, 0 leaves them out (default: from the detail level)")
+	parser.add_argument("--watertight", action="store_true", help="cap the ends Rhino leaves open, for printing")
+	parser.add_argument("--force", action="store_true", help="regenerate designs whose files already exist")
+	options = parser.parse_args()
+
+	detail = form_kernel.get_detail_level(options.detail)
+	profile_samples = detail["profile_samples"] if options.profile_samples is None else options.profile_samples
+	span_samples = detail["span_samples"] if options.span_samples is None else options.span_samples
+	feature_samples = detail["feature_samples"] if options.feature_samples is None else options.feature_samples
+	formats = [extension.strip().lower() for extension in options.formats.split(",") if extension.strip()]
+	for extension in formats:
+		if extension not in mesh_export.WRITERS:
+			parser.error("unknown format '" + extension + "'")
+	jobs_filename = os.path.abspath(options.jobs)
+	output_folder = os.path.abspath(options.output_folder)
+	# the dictionaries and taxonomy are found relative to the scripts
+	os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+	jobs = read_jobs(jobs_filename)
+	results = generate_designs(jobs, output_folder, formats, options.processes, options.force, profile_samples, span_samples, feature_samples, options.watertight, options.detail)
+	failures = [(name, error) for (name, filenames, error) in results if error]
+	for (name, error) in failures:
+		print("Failed " + name + ": " + error)
+	print("Generated %d of %d designs (%d already done) in %s" % (len(results) - len(failures), len(jobs), len(jobs) - len(results), output_folder))
+	sys.exit(1 if failures else 0)
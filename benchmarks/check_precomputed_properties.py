@@ -0,0 +1,26 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import sys
+import rhino_stub
+
+# Checks that the precomputed properties of every dictionary word (secondary_emotion_properties.bin) are the ones the
+# dictionary code in emotion_class computes on this Python, rounding included, rebuilding the file first if it is out of date.
+# Run "python benchmarks/check_precomputed_properties.py" with the Python the benchmarks run on (needs NumPy, no Rhino).
+# Exits with 1 if any word differs.
+
+rhino_stub.install()
+
+import emotion_index
+import secondary_emotion_property_constructor
+
+if __name__ == "__main__":
+	if secondary_emotion_property_constructor.is_stale():
+		secondary_emotion_property_constructor.write_results_to_file()
+	(word_count, mismatches) = secondary_emotion_property_constructor.compare_with_dictionary_code(emotion_index.load_system_emotion_dictionary())
+	for (word, difference) in mismatches[:20]:
+		print(word + ": " + difference)
+	print(str(word_count - len(mismatches)) + " of " + str(word_count) + " words match the dictionary code")
+	sys.exit(1 if mismatches else 0)
@@ -0,0 +1,42 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import sys
+import time
+import rhino_stub
+
+# Counts the rhinoscriptsyntax calls ObjectConstruction.create_form makes per design, for every object type, using the
+# recording stand-in in rhino_stub. Every call is a round trip into Rhino, so the counts track drawing time.
+# Run "python benchmarks/count_api_calls.py [word ...]" (any Python, no Rhino needed).
+
+rhino_stub.install()
+
+import construction_functions
+import emotion_class
+import emotion_index
+import emotion_registry
+
+DEFAULT_WORDS = ["neutral", "joy", "bait", "robber", "balm", "bane", "tree", "anger.trust"]
+
+# Return (calls per design by function, total calls per design, seconds per design) for object_id over words
+def count_calls(object_id, words, system_emotion_dict):
+	rs = rhino_stub.rs
+	rs.reset()
+	start = time.time()
+	for word in words:
+		emotion = emotion_class.Emotion(word, {}, system_emotion_dict, emotion_registry.get_primary_emotion_taxonomy(), emotion_registry.get_primary_scaling_factors())
+		construction_functions.ObjectConstruction(object_id, emotion).create_form()
+	seconds = (time.time() - start) / len(words)
+	calls = dict((name, count / float(len(words))) for (name, count) in rs.calls.items())
+	return (calls, rs.total_calls() / float(len(words)), seconds)
+
+if __name__ == "__main__":
+	words = sys.argv[1:] or DEFAULT_WORDS
+	system_emotion_dict = emotion_index.load_system_emotion_dictionary()
+	for object_id in sorted(emotion_registry.get_object_features()["object_name"]):
+		(calls, total, seconds) = count_calls(object_id, words, system_emotion_dict)
+		print("%-8s %7.1f rs calls per design (%.2f ms in the stub)" % (object_id, total, seconds * 1000))
+		for name in sorted(calls, key=lambda name: -calls[name]):
+			print("    %-20s %7.1f" % (name, calls[name]))
@@ -0,0 +1,211 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import os
+import sys
+
+# Recording stand-in for rhinoscriptsyntax and scriptcontext, so the plugin's modules can be run and benchmarked outside
+# Rhino. Every rs call is counted. The geometry queries the construction code relies on (planes, degree 1 curve evaluation,
+# cplane transforms) are answered with form_kernel's math; every other call just returns a new object id.
+# Call install() before importing any of the plugin's modules.
+
+repository_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repository_path not in sys.path:
+	sys.path.insert(0, repository_path)
+
+import form_kernel
+
+# Plane with the attribute names of a Rhino.Geometry.Plane
+class StubPlane(form_kernel.Plane):
+
+	@property
+	def Origin(self):
+		return self.origin
+
+	@property
+	def XAxis(self):
+		return self.xaxis
+
+	@property
+	def YAxis(self):
+		return self.yaxis
+
+	@property
+	def ZAxis(self):
+		return self.zaxis
+
+def to_stub_plane(plane):
+	return StubPlane(plane.origin, plane.xaxis, plane.yaxis, plane.zaxis)
+
+class RecordingRhinoScript():
+
+	def __init__(self):
+		self.calls = {}
+		self.object_count = 0
+		self.curves = {}						# curve id: (points, degree)
+		self.points = {}						# point id: coordinates
+		self.cplane = to_stub_plane(form_kernel.world_xy_plane())
+
+	# Return a recording function for every rs function the stub doesn't implement: it returns a new object id
+	def __getattr__(self, name):
+		if name.startswith("__"):
+			raise AttributeError(name)
+		def call(*args, **kwargs):
+			self.__record(name)
+			return self.__new_id(name)
+		return call
+
+	def reset(self):
+		self.calls = {}
+
+	# Return the total number of rs calls since the last reset
+	def total_calls(self):
+		return sum(self.calls.values())
+
+	def AddPoint(self, point, y=None, z=None):
+		self.__record("AddPoint")
+		point_id = self.__new_id("point")
+		self.points[point_id] = self.__coordinates(point) if y is None else (point, y, z)
+		return point_id
+
+	def AddCurve(self, points, degree=3):
+		self.__record("AddCurve")
+		curve_id = self.__new_id("curve")
+		self.curves[curve_id] = ([self.__coordinates(point) for point in points], degree)
+		return curve_id
+
+	def CurveDomain(self, curve_id):
+		self.__record("CurveDomain")
+		(points, degree) = self.curves[curve_id]
+		return (0.0, float(len(points) - degree))
+
+	def CurveCurvature(self, curve_id, parameter):
+		self.__record("CurveCurvature")
+		return None			# degree 1 curves have no curvature
+
+	def EvaluateCurve(self, curve_id, parameter):
+		self.__record("EvaluateCurve")
+		(points, degree) = self.curves[curve_id]
+		index = min(int(parameter), len(points) - 2)
+		fraction = parameter - index
+		return form_kernel.add(points[index], form_kernel.scale(form_kernel.subtract(points[index+1], points[index]), fraction))
+
+	def CurveTangent(self, curve_id, parameter):
+		self.__record("CurveTangent")
+		(points, degree) = self.curves[curve_id]
+		index = min(int(parameter), len(points) - 2)
+		return form_kernel.unitize(form_kernel.subtract(points[index+1], points[index]))
+
+	def coercegeometry(self, object_id):
+		self.__record("coercegeometry")
+		return StubGeometry(object_id)
+
+	# Record a RhinoCommon call (e.g. scriptcontext.doc.Objects.Add) and return a new object id
+	def record_common_call(self, name):
+		self.__record(name)
+		return self.__new_id(name)
+
+	def CurveStartPoint(self, curve_id):
+		self.__record("CurveStartPoint")
+		return self.curves[curve_id][0][0]
+
+	def VectorCrossProduct(self, a, b):
+		self.__record("VectorCrossProduct")
+		return form_kernel.cross_product(a, b)
+
+	def VectorUnitize(self, vector):
+		self.__record("VectorUnitize")
+		return form_kernel.unitize(vector)
+
+	def PlaneFromNormal(self, origin, normal, xaxis=None):
+		self.__record("PlaneFromNormal")
+		return to_stub_plane(form_kernel.plane_from_normal(self.__coordinates(origin), normal))
+
+	def PlaneFromFrame(self, origin, xaxis, yaxis):
+		self.__record("PlaneFromFrame")
+		return StubPlane(self.__coordinates(origin), xaxis, yaxis, form_kernel.cross_product(xaxis, yaxis))
+
+	def WorldXYPlane(self):
+		self.__record("WorldXYPlane")
+		return to_stub_plane(form_kernel.world_xy_plane())
+
+	def ViewCPlane(self, view=None, plane=None):
+		self.__record("ViewCPlane")
+		previous = self.cplane
+		if plane is not None:
+			self.cplane = plane
+		return previous
+
+	def XformCPlaneToWorld(self, point, plane):
+		self.__record("XformCPlaneToWorld")
+		return plane.point_to_world(point)
+
+	def frange(self, start, stop, step):
+		self.__record("frange")
+		values = []
+		value = start
+		while value <= stop + 1e-9:
+			values.append(value)
+			value += step
+		return values
+
+	def __record(self, name):
+		self.calls[name] = self.calls.get(name, 0) + 1
+
+	def __new_id(self, kind):
+		self.object_count += 1
+		return kind + "-" + str(self.object_count)
+
+	# Return the coordinates of a point given as coordinates or as the id of a point object
+	def __coordinates(self, point):
+		if isinstance(point, str):
+			return self.points[point]
+		return tuple(point)
+
+# Geometry of a document object, as returned by rs.coercegeometry
+class StubGeometry():
+
+	def __init__(self, object_id):
+		self.object_id = object_id
+
+	def Duplicate(self):
+		return StubGeometry(self.object_id)
+
+	def MemoryEstimate(self):
+		return 1024
+
+class StubObjectTable():
+
+	def Add(self, geometry):
+		return rs.record_common_call("Objects.Add")
+
+class StubDocument():
+
+	def __init__(self):
+		self.Objects = StubObjectTable()
+
+class StubScriptContext():
+
+	def __init__(self):
+		self.sticky = {}
+		self.doc = StubDocument()
+
+rs = RecordingRhinoScript()
+scriptcontext = StubScriptContext()
+
+# Put the stand-ins in place of rhinoscriptsyntax and scriptcontext, and give Python 3 the Python 2 reload() and xrange()
+# the modules use
+def install():
+	sys.modules["rhinoscriptsyntax"] = rs
+	sys.modules["scriptcontext"] = scriptcontext
+	try:
+		reload
+	except NameError:
+		import importlib
+		import builtins
+		builtins.reload = importlib.reload
+		builtins.xrange = range
+	# the data files are found relative to the repository
+	os.chdir(repository_path)
@@ -0,0 +1,197 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+import rhino_stub
+
+# Times a fixed set of workloads outside Rhino, using the recording rs stand-in in rhino_stub, and keeps the results of
+# every commit so a slowdown shows up in CI:
+#	import				importing the UI helper (dictionaries, registry and all the plugin modules) in a new process
+#	emotion_single		Emotion for single words; emotion_compound for words of two or three words
+#	properties_cold		Emotion.get_properties with the property cache emptied first; properties_warm with it full
+#	create_form_<object>	ObjectConstruction.create_form for every object type in object_features.json (rs calls counted)
+#	modify_<size>		user_dictionary_store.modify_breakdown on a user dictionary of size compound entries
+#	shape_search		design_search.ShapeIndex.search for the words with forms like a design (index built beforehand)
+# Every workload is run --repeat times and the fastest run counts. Results are seconds and rs calls per operation.
+#
+# Run "python benchmarks/run_benchmarks.py [--repeat 5] [--record] [--compare [commit]] [--tolerance 1.5]" (any Python, no Rhino).
+# --record appends the results to the history file under the current commit; --compare checks them against the last
+# recorded commit (or the one given) and exits with 1 if a workload got slower than tolerance times, or makes more rs calls.
+# With no results recorded yet (a fresh checkout) the comparison is skipped rather than failed, so CI can run
+# "--record --compare" from its first build on and keep the history file between builds.
+
+rhino_stub.install()
+
+import config
+import construction_functions
+import design_search
+import emotion_class
+import emotion_index
+import emotion_property_cache
+import emotion_registry
+import user_dictionary_store
+
+benchmarks_path = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY_FILENAME = os.path.join(benchmarks_path, "benchmark_history.jsonl")
+
+SINGLE_WORDS = ["neutral", "joy", "bait", "robber", "balm", "bane", "tree", "calm", "happy", "furious"]
+COMPOUND_WORDS = ["anger.trust", "calm.happy", "bait.balm", "robber.tree.calm", "happy.furious", "bane.joy.tree"]
+USER_DICTIONARY_SIZES = [10, 100, 1000]
+MODIFIED_WORD = "calm"
+
+# Return (seconds per operation of the fastest of repeat runs, rs calls per operation) of run(), which does operations operations
+def measure(run, operations, repeat):
+	best = None
+	for attempt in range(repeat):
+		rhino_stub.rs.reset()
+		start = time.time()
+		run()
+		seconds = time.time() - start
+		best = seconds if best is None else min(best, seconds)
+	return (best / operations, rhino_stub.rs.total_calls() / float(operations))
+
+def get_emotion(word, system_emotion_dict, user_emotion_dict=None):
+	return emotion_class.Emotion(word, user_emotion_dict if user_emotion_dict is not None else {}, system_emotion_dict, emotion_registry.get_primary_emotion_taxonomy(), emotion_registry.get_primary_scaling_factors())
+
+def benchmark_import(repeat):
+	code = "import sys, time; sys.path.insert(0, %r); import rhino_stub; rhino_stub.install(); start = time.time(); import emotive_script_ui_helper; print(time.time() - start)" % benchmarks_path
+	times = []
+	for attempt in range(repeat):
+		output = subprocess.check_output([sys.executable, "-c", code], cwd=rhino_stub.repository_path)
+		times.append(float(output.decode("utf-8").strip().splitlines()[-1]))
+	return (min(times), 0.0)
+
+def benchmark_emotions(words, system_emotion_dict, repeat):
+	return measure(lambda: [get_emotion(word, system_emotion_dict) for word in words], len(words), repeat)
+
+def benchmark_properties(words, system_emotion_dict, repeat, cold):
+	emotions = [get_emotion(word, system_emotion_dict) for word in words]
+	def run():
+		for emotion in emotions:
+			if cold:
+				emotion_property_cache.property_cache.clear()
+			emotion.get_properties()
+	return measure(run, len(emotions), repeat)
+
+def benchmark_create_form(object_id, words, system_emotion_dict, repeat):
+	emotions = [get_emotion(word, system_emotion_dict) for word in words]
+	return measure(lambda: [construction_functions.ObjectConstruction(object_id, emotion).create_form() for emotion in emotions], len(emotions), repeat)
+
+def benchmark_shape_search(words, system_emotion_dict, repeat):
+	shape_index = design_search.get_shape_index(system_emotion_dict)
+	emotions = [get_emotion(word, system_emotion_dict) for word in words]
+	return measure(lambda: [shape_index.search(emotion.get_properties(), exclude=emotion.get_emotions_contained()) for emotion in emotions], len(emotions), repeat)
+
+# Time modify_breakdown of MODIFIED_WORD in a user dictionary of size compound entries (about a tenth of them contain it),
+# journaling to files in a temp folder
+def benchmark_modify(size, system_emotion_dict, repeat):
+	folder = tempfile.mkdtemp()
+	try:
+		generator = random.Random(size)
+		words = generator.sample(sorted(word for word in system_emotion_dict if word != MODIFIED_WORD), 200)
+		entries = {}
+		while len(entries) < size:
+			key_words = generator.sample(words, generator.choice([2, 3]))
+			if generator.random() < 0.1:
+				key_words[0] = MODIFIED_WORD
+			emotion = get_emotion(".".join(key_words), system_emotion_dict)
+			entries[emotion.get_emotion()] = emotion.get_breakdown()
+		snapshot_filename = os.path.join(folder, "user_emotion_dictionary.json")
+		with open(snapshot_filename, "w") as snapshot_file:
+			json.dump(entries, snapshot_file)
+		store = user_dictionary_store.UserDictionaryStore(snapshot_filename, os.path.join(folder, "user_emotion_dictionary.journal"))
+		breakdowns = [dict((emotion, (step + offset) % 4) for (offset, emotion) in enumerate(config.primary_emotions[1:])) for step in range(5)]
+		return measure(lambda: [user_dictionary_store.modify_breakdown(store, system_emotion_dict, MODIFIED_WORD, breakdown) for breakdown in breakdowns], len(breakdowns), repeat)
+	finally:
+		shutil.rmtree(folder, ignore_errors=True)
+
+# Return {workload name: {"seconds": seconds per operation, "calls": rs calls per operation}} for every workload
+def run_benchmarks(repeat=5):
+	results = {}
+	def record(name, measured):
+		results[name] = {"seconds": measured[0], "calls": measured[1]}
+		print("%-24s %10.3f ms %8.1f rs calls" % (name, measured[0] * 1000, measured[1]))
+	record("import", benchmark_import(repeat))
+	system_emotion_dict = emotion_index.load_system_emotion_dictionary()
+	record("emotion_single", benchmark_emotions(SINGLE_WORDS, system_emotion_dict, repeat))
+	record("emotion_compound", benchmark_emotions(COMPOUND_WORDS, system_emotion_dict, repeat))
+	record("properties_cold", benchmark_properties(SINGLE_WORDS + COMPOUND_WORDS, system_emotion_dict, repeat, True))
+	record("properties_warm", benchmark_properties(SINGLE_WORDS + COMPOUND_WORDS, system_emotion_dict, repeat, False))
+	for object_id in sorted(emotion_registry.get_object_features()["object_name"]):
+		record("create_form_" + object_id, benchmark_create_form(object_id, SINGLE_WORDS + COMPOUND_WORDS, system_emotion_dict, repeat))
+	record("shape_search", benchmark_shape_search(SINGLE_WORDS + COMPOUND_WORDS, system_emotion_dict, repeat))
+	for size in USER_DICTIONARY_SIZES:
+		record("modify_" + str(size), benchmark_modify(size, system_emotion_dict, repeat))
+	return results
+
+# Return the current commit id, or None outside a git checkout
+def get_commit():
+	try:
+		return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=rhino_stub.repository_path).decode("utf-8").strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+# Return the records in the history file, oldest first
+def read_history(history_filename):
+	if not os.path.exists(history_filename):
+		return []
+	with open(history_filename) as history_file:
+		return [json.loads(line) for line in history_file if line.strip()]
+
+def append_history(history_filename, results):
+	record = {"commit": get_commit(), "time": time.strftime("%Y-%m-%d %H:%M:%S"), "python": sys.version.split()[0], "results": results}
+	with open(history_filename, "a") as history_file:
+		history_file.write(json.dumps(record, sort_keys=True) + "\n")
+
+# Return the list of regressions of results against the results of baseline: workloads more than tolerance times slower,
+# and workloads making more rs calls (call counts don't depend on the machine, so any increase counts)
+def compare(results, baseline, tolerance):
+	regressions = []
+	for name in sorted(results):
+		if name not in baseline:
+			continue
+		(old, new) = (baseline[name], results[name])
+		if old["seconds"] > 0 and new["seconds"] > old["seconds"] * tolerance:
+			regressions.append("%s: %.3f ms, was %.3f ms (%.1fx)" % (name, new["seconds"] * 1000, old["seconds"] * 1000, new["seconds"] / old["seconds"]))
+		if new["calls"] > old["calls"] + 1e-9:
+			regressions.append("%s: %.1f rs calls, was %.1f" % (name, new["calls"], old["calls"]))
+	return regressions
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Time EmotiveModeler workloads outside Rhino and track them across commits.")
+	parser.add_argument("--repeat", type=int, default=5, help="runs of every workload (the fastest counts)")
+	parser.add_argument("--history", default=DEFAULT_HISTORY_FILENAME, help="JSON lines file of recorded results")
+	parser.add_argument("--record", action="store_true", help="append the results to the history under the current commit")
+	parser.add_argument("--compare", nargs="?", const="", default=None, metavar="COMMIT", help="check against the last recorded results (or those of COMMIT)")
+	parser.add_argument("--tolerance", type=float, default=1.5, help="slowdown factor counted as a regression")
+	options = parser.parse_args()
+
+	# read before recording, so --record --compare compares against the previous commit
+	history = read_history(options.history)
+	results = run_benchmarks(options.repeat)
+	if options.record:
+		append_history(options.history, results)
+	if options.compare is not None:
+		baselines = [record for record in history if not options.compare or record["commit"] == options.compare]
+		if not history:
+			print("No recorded results in " + options.history + " yet, comparison skipped")
+			sys.exit(0)
+		if not baselines:
+			print("No recorded results to compare with in " + options.history)
+			sys.exit(1)
+		baseline = baselines[-1]
+		regressions = compare(results, baseline["results"], options.tolerance)
+		for regression in regressions:
+			print("Regression " + regression)
+		print("%d regressions against %s" % (len(regressions), baseline["commit"]))
+		sys.exit(1 if regressions else 0)
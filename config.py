@@ -5,9 +5,13 @@
 
 object_features_filename = "object_features.json"
 system_emotion_dictionary_filename = "working dictionary json/word_emotion_dictionary_plutchik_edits.json"
+system_emotion_index_filename = "working dictionary json/word_emotion_dictionary_plutchik_edits.idx"
+system_emotion_overlay_filename = "working dictionary json/word_emotion_dictionary_additions.journal"
+secondary_emotion_properties_filename = "working dictionary json/secondary_emotion_properties.bin"
 primary_emotion_taxonomy_filename = "emotion_taxonomy.json"
 primary_scaling_factors_filename = "emotion_taxonomy_scaling_factors.json"
 user_emotion_dictionary_filename = "working dictionary json/user_emotion_dictionary.json"
+user_emotion_journal_filename = "working dictionary json/user_emotion_dictionary.journal"
 
 primary_emotions = ["neutral","anger","anticipation","disgust","fear","joy","sadness","surprise","trust"]
 
@@ -22,6 +26,67 @@ object_types = { "B":"Bottle",
 outpath_render = "C:\\Users\\Pip\\Documents\\EmotiveModeler\\Animations\\Emotion_"
 outpath_save = "C:\\Users\\Pip\\Documents\\EmotiveModeler\\Saved_models\\Emotion_"
 outpath_design_history = "C:\\Users\\Pip\\Documents\\EmotiveModeler\\Design_history\\History_"
+outpath_sweep = "C:\\Users\\Pip\\Documents\\EmotiveModeler\\Sweeps\\Sweep_"
 
 
-max_trackbar_value = 10
\ No newline at end of file
+max_trackbar_value = 10
+
+# blend emotion properties with the NumPy engine in emotion_engine.py instead of the dictionary code in emotion_class.py (needs NumPy, so not available in Rhino's IronPython)
+use_vectorized_emotion_engine = False
+
+# number of blended emotion properties kept in memory by emotion_property_cache.py
+emotion_property_cache_size = 256
+
+# scriptcontext.sticky key for the ids of the Rhino objects of the design on screen (see construction_functions.py)
+drawn_objects_key = "EmotiveModeler.drawn_objects"
+
+# number of user dictionary changes kept in the journal before it is compacted into user_emotion_dictionary.json (see user_dictionary_store.py)
+user_emotion_journal_limit = 200
+
+# replace words that aren't in the dictionary by the dictionary word they are an inflection of ("happier" -> "happy") instead of asking the user (see word_suggestions.py).
+# Off by default, since the word is swapped without telling the user; asking suggests the closest dictionary word instead
+map_inflected_words = False
+
+# live preview while the emotion sliders are dragged (see live_preview.py): seconds the sliders must be still before a
+# low resolution preview is drawn and before it is replaced by the full design
+live_preview_delay = 0.05
+live_preview_refine_delay = 0.4
+
+# design history pictures (see history_snapshots.py): size in pixels
+history_image_size = (200, 150)
+
+# turntable animations (see turntable_render.py): frames in a full turn, frame size in pixels, and the Python (not
+# Rhino's IronPython) that renders them in the background
+turntable_frames = 30
+turntable_size = (640, 480)
+render_python = "python"
+
+# words suggested in the UI for the design on screen (see design_search.py), and at most how many of them may share a form
+suggestion_count = 6
+suggestion_words_per_shape = 2
+
+# designs in a sweep from one design to the next (see design_sweep.py), the two designs included
+sweep_steps = 24
+
+# mesh files written next to the .3dm when a design is saved (see mesh_export.py)
+export_formats = ["stl", "3mf"]
+
+# level of detail of the designs for each use (see form_kernel.build_form and mesh_export.get_detail_mesh):
+#	profile_detail		factor on the points of every cross-section (points_in_curve in the taxonomy); 1 keeps the designed profile
+#	spine_detail		points of the drawn spine curve per loft
+#	profile_samples		points around every ring of the mesh
+#	span_samples		mesh rings from one cross-section to the next
+#	feature_samples		points around the cylinder and torus of the mesh
+detail_levels = {
+	"preview": {"profile_detail": 0.5, "spine_detail": 1, "profile_samples": 12, "span_samples": 1, "feature_samples": 12},
+	"thumbnail": {"profile_detail": 0.5, "spine_detail": 1, "profile_samples": 24, "span_samples": 2, "feature_samples": 16},
+	"design": {"profile_detail": 1.0, "spine_detail": 1, "profile_samples": 48, "span_samples": 4, "feature_samples": 32},
+	"render": {"profile_detail": 1.0, "spine_detail": 2, "profile_samples": 64, "span_samples": 6, "feature_samples": 32},
+	"fabrication": {"profile_detail": 1.0, "spine_detail": 4, "profile_samples": 96, "span_samples": 8, "feature_samples": 48},
+}
+
+# bytes of Rhino geometry of drawn designs kept in memory by geometry_cache.py, so undo and redo don't rebuild them
+geometry_cache_limit = 64 << 20
+
+# bytes of design history pictures kept in memory before the least recently used are dropped (see design_history.py)
+history_thumbnail_limit = 1 << 20
\ No newline at end of file
@@ -0,0 +1,175 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import array
+import bisect
+import hashlib
+from collections import OrderedDict
+import config
+
+# Undo/redo history of the designs drawn in the UI.
+# Every design is kept as a small fixed-size record in flat arrays instead of a tuple of strings and dicts:
+#	breakdowns		one byte per primary emotion (config.primary_emotions, without neutral), clamped to 0-255
+#	word sets		the id of its emotion id ("calm.happy"), interned so repeated words are stored once
+#	modified		1 if its breakdown was set with the sliders (the user dictionary's), 0 if it is the system dictionary's
+#	thumbnails		the id of its picture in the ThumbnailStore, or NO_THUMBNAIL
+#	serials			a number that is never reused, so a picture made for a design that was dropped can't be given to another
+# A cursor points at the design on screen: undo and redo move it, and any design can be read by its index, all without
+# copying the list. Drawing a new design after undoing drops the designs that could have been redone.
+
+NO_THUMBNAIL = -1
+BREAKDOWN_EMOTIONS = config.primary_emotions[1:]			# remove "neutral"
+
+# Return breakdown (primary emotion: strength) as a byte array in the order of BREAKDOWN_EMOTIONS
+def pack_breakdown(emotion_breakdown):
+	return array.array("B", [max(0, min(255, int(emotion_breakdown.get(emotion, 0)))) for emotion in BREAKDOWN_EMOTIONS])
+
+# PNG pictures of designs by content: a picture that is the same as one already stored (the same design drawn again)
+# takes no extra memory. Once the pictures take more than limit bytes, the least recently used ones are dropped.
+class ThumbnailStore():
+
+	def __init__(self, limit=config.history_thumbnail_limit):
+		self.limit = limit
+		self.ids = {}					# content hash: thumbnail id
+		self.images = OrderedDict()		# thumbnail id: picture, least recently used first
+		self.size = 0
+
+	# Store picture (the bytes of a PNG) and return its id
+	def add(self, picture):
+		digest = hashlib.sha1(picture).digest()
+		thumbnail_id = self.ids.setdefault(digest, len(self.ids))
+		if thumbnail_id in self.images:
+			self.images[thumbnail_id] = self.images.pop(thumbnail_id)
+		else:
+			self.images[thumbnail_id] = picture
+			self.size += len(picture)
+			# the new picture itself is always kept
+			while self.size > self.limit and len(self.images) > 1:
+				(old_id, old_picture) = self.images.popitem(last=False)
+				self.size -= len(old_picture)
+		return thumbnail_id
+
+	# Return the picture with thumbnail_id, or None if it was dropped
+	def get(self, thumbnail_id):
+		picture = self.images.pop(thumbnail_id, None)
+		if picture is not None:
+			self.images[thumbnail_id] = picture
+		return picture
+
+class DesignHistory():
+
+	def __init__(self, thumbnail_limit=config.history_thumbnail_limit):
+		self.word_sets = []				# word set id: emotion id
+		self.word_set_ids = {}			# emotion id: word set id
+		self.breakdowns = array.array("B")
+		self.word_set_of_design = array.array("i")
+		self.modified = array.array("B")
+		self.thumbnail_of_design = array.array("i")
+		self.serials = array.array("i")
+		self.next_serial = 0
+		self.position = -1				# index of the design on screen
+		self.thumbnails = ThumbnailStore(thumbnail_limit)
+
+	def __len__(self):
+		return len(self.serials)
+
+	# Add the design on screen after the current one (dropping the designs that could have been redone) and return its
+	# serial number, which set_thumbnail takes. modified: True if emotion_breakdown comes from the user dictionary.
+	def push(self, emotion_id, emotion_breakdown, modified=False):
+		if self.position < len(self) - 1:
+			end = self.position + 1
+			del self.breakdowns[end * len(BREAKDOWN_EMOTIONS):]
+			del self.word_set_of_design[end:]
+			del self.modified[end:]
+			del self.thumbnail_of_design[end:]
+			del self.serials[end:]
+		self.breakdowns.extend(pack_breakdown(emotion_breakdown))
+		self.word_set_of_design.append(self.__intern(emotion_id))
+		self.modified.append(1 if modified else 0)
+		self.thumbnail_of_design.append(NO_THUMBNAIL)
+		self.serials.append(self.next_serial)
+		self.next_serial += 1
+		self.position = len(self) - 1
+		return self.serials[-1]
+
+	# Return the serial number of the design with index
+	def get_serial(self, index):
+		return self.serials[index]
+
+	# Return (emotion id, breakdown) of the design with index
+	def get(self, index):
+		start = index * len(BREAKDOWN_EMOTIONS)
+		values = self.breakdowns[start:start + len(BREAKDOWN_EMOTIONS)]
+		return (self.word_sets[self.word_set_of_design[index]], dict(zip(BREAKDOWN_EMOTIONS, values)))
+
+	# Return True if the breakdown of the design with index comes from the user dictionary, False if from the system dictionary
+	def is_modified(self, index):
+		return bool(self.modified[index])
+
+	# Return the blend weights of the design with index (see Emotion.get_blend_weights): the breakdown values of a
+	# modified word, and 1 for every emotion present in a word from the system dictionary
+	def get_blend_weights(self, index):
+		(emotion_id, emotion_breakdown) = self.get(index)
+		return dict((emotion, value if self.is_modified(index) else 1) for (emotion, value) in emotion_breakdown.items() if value != 0)
+
+	# Return [(emotion id, breakdown), ...] of all the designs, oldest first
+	def get_states(self):
+		return [self.get(index) for index in range(len(self))]
+
+	def get_current(self):
+		return self.get(self.position)
+
+	# Return the index of the design on screen
+	def get_position(self):
+		return self.position
+
+	# Return the index of the design before the one on screen, or None if there isn't one
+	def get_previous_index(self):
+		return self.position - 1 if self.position > 0 else None
+
+	def can_undo(self):
+		return self.position > 0
+
+	def can_redo(self):
+		return self.position < len(self) - 1
+
+	# Move to the previous design and return it
+	def undo(self):
+		return self.go_to(self.position - 1)
+
+	# Move to the next design and return it
+	def redo(self):
+		return self.go_to(self.position + 1)
+
+	# Move to the design with index and return it
+	def go_to(self, index):
+		if not 0 <= index < len(self):
+			raise IndexError("There is no design " + str(index) + " in the history")
+		self.position = index
+		return self.get(index)
+
+	# Store picture (PNG bytes) as the thumbnail of the design with serial and return its index, or None if the design
+	# has been dropped from the history since
+	def set_thumbnail(self, serial, picture):
+		index = bisect.bisect_left(self.serials, serial)
+		if index == len(self) or self.serials[index] != serial:
+			return None
+		self.thumbnail_of_design[index] = self.thumbnails.add(picture)
+		return index
+
+	# Return the thumbnail (PNG bytes) of the design with index, or None if it isn't ready or was dropped to save memory
+	def get_thumbnail(self, index):
+		thumbnail_id = self.thumbnail_of_design[index]
+		if thumbnail_id == NO_THUMBNAIL:
+			return None
+		return self.thumbnails.get(thumbnail_id)
+
+	def __intern(self, emotion_id):
+		word_set_id = self.word_set_ids.get(emotion_id)
+		if word_set_id is None:
+			word_set_id = len(self.word_sets)
+			self.word_sets.append(emotion_id)
+			self.word_set_ids[emotion_id] = word_set_id
+		return word_set_id
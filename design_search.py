@@ -0,0 +1,129 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import sys
+import math
+import time
+import config
+import emotion_class
+import emotion_registry
+
+# Finds the dictionary words whose forms look most like a design, for the suggestion panel of the UI.
+# A form is described by a shape vector of its emotion properties: the spine equation terms, the global and per level
+# aspect ratios, vertical wrapping, spikiness and color. Every column is divided by its spread over the dictionary, so
+# a step in color counts about as much as a step in aspect ratio.
+# A dictionary word's properties only depend on which primary emotions it contains (see
+# secondary_emotion_property_constructor.py), so the 14k words share a few hundred shapes. The index keeps one vector per
+# shape with the words that have it, and a search is a brute force distance to every shape: at this size that is
+# quicker than a KD-tree, and it needs no NumPy, so it runs in Rhino's IronPython. The index is built once per dictionary
+# and taxonomy, the first time it is searched. Like emotion_property_cache, this module is left out of the reload() calls in
+# the scripts so the index survives between runs.
+#
+# Run "python design_search.py word ..." to see the words with forms like each word's and the search times.
+
+SPINE_TERMS = ("a_term", "b_term", "h_term", "k_term")
+NUMBER_PROPERTIES = ("global_vertical_AR", "global_horizontal_AR", "vertical_wrapping", "spikiness")
+COLOR_TERMS = ("r", "g", "b")
+MIN_SUGGESTED_LENGTH = 4			# shorter words (mostly abbreviations and interjections) are suggested after the others
+
+# Return the shape vector of emotion_properties (see Emotion.get_properties); levels without a vertical_AR count as 0
+def get_shape_vector(emotion_properties, vertical_levels):
+	vector = [float(emotion_properties["spine_equation"][term]) for term in SPINE_TERMS]
+	vector += [float(emotion_properties[name]) for name in NUMBER_PROPERTIES]
+	vector += [float(emotion_properties["color"][term]) for term in COLOR_TERMS]
+	vector += [float(emotion_properties["vertical_AR"].get(level) or 0) for level in vertical_levels]
+	return vector
+
+class ShapeIndex():
+
+	# system_emotion_dict: word -> breakdown for every dictionary word (e.g. an emotion_index.EmotionIndex)
+	# primary_emotion_taxonomy, primary_scaling_factors: as for emotion_class.Emotion
+	def __init__(self, system_emotion_dict, primary_emotion_taxonomy, primary_scaling_factors):
+		self.vertical_levels = sorted(set(level for emotion in primary_emotion_taxonomy.values() for level in emotion["vertical_AR"]), key=int)
+		# group the words by the emotions they contain, like secondary_emotion_property_constructor.get_patterns
+		shape_ids = {}
+		self.shape_words = []				# shape id: its words, shortest first
+		vectors = []
+		for word in system_emotion_dict:
+			breakdown = system_emotion_dict[word]
+			key = word if word in config.primary_emotions else tuple(sorted(emotion for emotion in breakdown if breakdown[emotion] != 0))
+			if key not in shape_ids:
+				shape_ids[key] = len(vectors)
+				self.shape_words.append([])
+				if word in config.primary_emotions:
+					emotion_properties = primary_emotion_taxonomy[word]
+				elif not key:
+					emotion_properties = primary_emotion_taxonomy["neutral"]
+				else:
+					emotion_properties = emotion_class.Emotion(word, {}, system_emotion_dict, primary_emotion_taxonomy, primary_scaling_factors).get_properties()
+				vectors.append(get_shape_vector(emotion_properties, self.vertical_levels))
+			self.shape_words[shape_ids[key]].append(word)
+		for words in self.shape_words:
+			words.sort(key=lambda word: (len(word) < MIN_SUGGESTED_LENGTH, len(word), word))
+
+		# standard deviation of every column over the words (columns that never change are left as they are)
+		word_count = float(sum(len(words) for words in self.shape_words))
+		self.scales = []
+		for column in range(len(vectors[0]) if vectors else 0):
+			mean = sum(vector[column] * len(words) for (vector, words) in zip(vectors, self.shape_words)) / word_count
+			variance = sum((vector[column] - mean) ** 2 * len(words) for (vector, words) in zip(vectors, self.shape_words)) / word_count
+			self.scales.append(1.0 / math.sqrt(variance) if variance > 0 else 1.0)
+		self.vectors = [self.__scale(vector) for vector in vectors]
+
+	def __len__(self):
+		return len(self.vectors)
+
+	# Return up to limit (distance, word) of the dictionary words whose forms are nearest to emotion_properties, nearest
+	# first. At most words_per_shape words are taken from every shape, so the suggestions aren't all the same form.
+	# exclude: words to leave out (the words of the design itself); user_emotion_dict: words the user modified are left
+	# out too, since their forms aren't the ones in the index
+	def search(self, emotion_properties, limit=config.suggestion_count, exclude=(), words_per_shape=config.suggestion_words_per_shape, user_emotion_dict=None):
+		query = self.__scale(get_shape_vector(emotion_properties, self.vertical_levels))
+		distances = []
+		for (shape_id, vector) in enumerate(self.vectors):
+			distances.append((sum((a - b) * (a - b) for (a, b) in zip(query, vector)), shape_id))
+		distances.sort()
+		excluded = set(exclude)
+		results = []
+		for (distance, shape_id) in distances:
+			taken = 0
+			for word in self.shape_words[shape_id]:
+				if taken == words_per_shape or len(results) == limit:
+					break
+				if word in excluded or (user_emotion_dict is not None and word in user_emotion_dict):
+					continue
+				results.append((math.sqrt(distance), word))
+				taken += 1
+			if len(results) == limit:
+				break
+		return results
+
+	def __scale(self, vector):
+		return [value * scale for (value, scale) in zip(vector, self.scales)]
+
+shape_index = None
+shape_index_key = None
+
+# Return the ShapeIndex for system_emotion_dict and the registry taxonomy, building it the first time (and again after
+# the taxonomy changes). Words added to the dictionary later aren't in it until the taxonomy changes.
+def get_shape_index(system_emotion_dict):
+	global shape_index, shape_index_key
+	key = (id(system_emotion_dict), emotion_registry.get_taxonomy_version())
+	if shape_index is None or shape_index_key != key:
+		shape_index = ShapeIndex(system_emotion_dict, emotion_registry.get_primary_emotion_taxonomy(), emotion_registry.get_primary_scaling_factors())
+		shape_index_key = key
+	return shape_index
+
+if __name__ == "__main__":
+	import emotion_index
+	system_emotion_dict = emotion_index.load_system_emotion_dictionary()
+	start = time.time()
+	index = get_shape_index(system_emotion_dict)
+	print("Indexed %d words as %d shapes in %.2f s" % (len(system_emotion_dict), len(index), time.time() - start))
+	for word in sys.argv[1:] or ["calm", "furious", "joy.trust", "melancholy", "neutral"]:
+		emotion = emotion_class.Emotion(word, {}, system_emotion_dict, emotion_registry.get_primary_emotion_taxonomy(), emotion_registry.get_primary_scaling_factors())
+		start = time.time()
+		results = index.search(emotion.get_properties(), exclude=emotion.get_emotions_contained())
+		print("%-12s %s (%.2f ms)" % (emotion.get_emotion(), ", ".join("%s %.2f" % (match, distance) for (distance, match) in results), (time.time() - start) * 1000))
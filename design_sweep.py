@@ -0,0 +1,235 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import os
+import sys
+import json
+import argparse
+import background_process
+import config
+import emotion_class
+import emotion_index
+import emotion_registry
+import file_utils
+import form_kernel
+import mesh_export
+import mesh_rasterizer
+import user_dictionary_store
+
+try:
+	import multiprocessing
+except ImportError:		# IronPython has no multiprocessing; the steps then run one after another
+	multiprocessing = None
+
+try:
+	import emotion_engine
+except ImportError:		# no NumPy (Rhino's IronPython); the steps are then blended one by one with emotion_class
+	emotion_engine = None
+
+# Sweeps through the design space: the form morphing from one design to the next, e.g. from "calm" to "furious".
+# The blend weights of the keyframes (see Emotion.get_blend_weights: 1 for every emotion a dictionary word contains, the
+# slider values for a modified word) are interpolated linearly over the steps, the properties of all the steps are blended in
+# one batch with emotion_engine, and the form of every step is built and meshed in a pool of processes. The result is
+# either a sequence (a mesh file per step, and a PNG frame per step with --frames, all framed alike so the form doesn't
+# jump) or a grid (every step in one mesh, laid out in rows, to compare them side by side).
+#
+# Run "python design_sweep.py Bottle calm furious [more keyframes] [--steps 24] [--output folder] [--name sweep]
+# [--layout sequence|grid] [--formats json,stl] [--frames] [--size 640x480] [--columns 6] [--detail render] [--processes 4]".
+# A keyframe is a word (or words separated by periods) or JSON blend weights like '{"joy": 3, "trust": 1}'.
+
+LAYOUTS = ("sequence", "grid")
+GRID_SPACING = 1.2					# distance between the grid cells, as a share of the widest step
+
+# Return the blend weights the design of word (words separated by periods) is built from, with the user's modifications
+def get_word_blend_weights(word, user_emotion_dict, system_emotion_dict):
+	emotion = emotion_class.Emotion(word, user_emotion_dict, system_emotion_dict, emotion_registry.get_primary_emotion_taxonomy(), emotion_registry.get_primary_scaling_factors())
+	blend_weights = emotion.get_blend_weights()
+	blend_weights.pop("neutral", None)			# the design of "neutral" is the blend of no emotion
+	return blend_weights
+
+# Return the blend weights of steps designs evenly spread from the first to the last of keyframes (blend weights, primary
+# emotion: weight), passing through the others; the keyframes are steps of their own
+def interpolate_blend_weights(keyframes, steps):
+	if len(keyframes) < 2:
+		raise ValueError("A sweep needs at least two keyframes")
+	if steps < len(keyframes):
+		raise ValueError("A sweep through " + str(len(keyframes)) + " keyframes needs at least as many steps")
+	blend_weights = []
+	for step in range(steps):
+		position = step * (len(keyframes) - 1) / float(steps - 1)
+		index = min(int(position), len(keyframes) - 2)
+		t = position - index
+		(start, end) = (keyframes[index], keyframes[index + 1])
+		blend_weights.append(dict((emotion, (1 - t) * start.get(emotion, 0) + t * end.get(emotion, 0)) for emotion in config.primary_emotions[1:]))
+	return blend_weights
+
+# Return the emotion properties of every one of blend_weights: all in one batch with the vectorized engine when NumPy is
+# there, otherwise one by one with the dictionary code (as the design of a word modified to those values)
+def get_sweep_properties(blend_weights, primary_emotion_taxonomy, primary_scaling_factors):
+	blend_weights = [dict((emotion, value) for (emotion, value) in weights.items() if value != 0) for weights in blend_weights]
+	if emotion_engine is not None:
+		engine = emotion_engine.get_engine(primary_emotion_taxonomy, primary_scaling_factors)
+		batch = engine.get_properties_batch(*engine.pack(blend_weights))
+		return [engine.unpack(batch, row) for row in range(len(blend_weights))]
+	properties = []
+	for weights in blend_weights:
+		emotion_dict = {"sweep": weights}
+		emotion = emotion_class.Emotion("sweep", emotion_dict, emotion_dict, primary_emotion_taxonomy, primary_scaling_factors)
+		properties.append(emotion.get_properties())
+	return properties
+
+# Return the name the files of step are written under
+def get_step_name(name, step):
+	return "%s_%04d" % (name, step)
+
+# Build and mesh one step, and write it in formats to output_folder if it is given. Returns (step, Mesh, error message
+# or None), so a bad step is reported instead of stopping the others.
+def build_step(arguments):
+	(step, object_id, emotion_properties, detail_level, name, output_folder, formats) = arguments
+	try:
+		form = form_kernel.build_form(object_id, emotion_properties, None, detail_level)
+		mesh = mesh_export.get_detail_mesh(form, get_step_name(name, step))
+		if output_folder:
+			for extension in formats:
+				mesh_export.write_mesh(mesh, os.path.join(output_folder, mesh.name + "." + extension))
+		return (step, mesh, None)
+	except Exception as error:
+		return (step, None, type(error).__name__ + ": " + str(error))
+
+# Render the PNG frame of a step's mesh, fitted to sphere. Returns (filename, error message or None).
+def render_step_frame(arguments):
+	(mesh, filename, width, height, sphere) = arguments
+	try:
+		temp_filename = filename + ".tmp"
+		mesh_rasterizer.write_png(mesh_rasterizer.render_mesh(mesh, width, height, sphere=sphere), temp_filename)
+		file_utils.replace_file(temp_filename, filename)
+		return (filename, None)
+	except Exception as error:
+		return (filename, type(error).__name__ + ": " + str(error))
+
+# Return the results of function for every one of arguments, processes at a time (all cores if None), in the order they finish
+def run_pool(function, arguments, processes):
+	if multiprocessing is None or processes == 1 or len(arguments) < 2:
+		return [function(argument) for argument in arguments]
+	processes = processes or multiprocessing.cpu_count()
+	pool = multiprocessing.Pool(processes)
+	try:
+		return list(pool.imap_unordered(function, arguments))
+	finally:
+		pool.close()
+		pool.join()
+
+# Return one Mesh of meshes laid out in a grid, columns wide (about square if None), first row at the back. Each step is
+# centered on its cell and keeps its height.
+def get_grid_mesh(meshes, columns=None, name="grid"):
+	columns = columns or int(len(meshes) ** 0.5 + 0.999)
+	spheres = [mesh_rasterizer.get_bounding_sphere(mesh.vertices) for mesh in meshes if mesh.vertices]
+	spacing = GRID_SPACING * 2 * max([radius for (center, radius) in spheres] or [1.0])
+	vertices = []
+	triangles = []
+	for (index, mesh) in enumerate(meshes):
+		if not mesh.vertices:
+			continue
+		(center, radius) = mesh_rasterizer.get_bounding_sphere(mesh.vertices)
+		offset = ((index % columns) * spacing - center[0], -(index // columns) * spacing - center[1], 0.0)
+		first_vertex = len(vertices)
+		vertices.extend(form_kernel.add(vertex, offset) for vertex in mesh.vertices)
+		triangles.extend((i + first_vertex, j + first_vertex, k + first_vertex) for (i, j, k) in mesh.triangles)
+	return mesh_export.Mesh(name, vertices, triangles)
+
+# Sweep object_id through keyframes (blend weights) in steps and write the result to output_folder under name:
+#	sequence	name_0000.<format> for every step in formats, and name_0000.png frames if frame_size (width, height) is given
+#	grid		name.<format> with every step in a grid columns wide
+# Returns the list of (filename, error message or None), in step order.
+def sweep_designs(object_id, keyframes, steps, output_folder, name="sweep", layout="sequence", formats=("json",), frame_size=None, columns=None, detail_level="render", processes=None):
+	if layout not in LAYOUTS:
+		raise ValueError("Unknown layout '" + str(layout) + "' (use one of " + ", ".join(LAYOUTS) + ")")
+	if not os.path.exists(output_folder):
+		os.makedirs(output_folder)
+	blend_weights = interpolate_blend_weights(keyframes, steps)
+	properties = get_sweep_properties(blend_weights, emotion_registry.get_primary_emotion_taxonomy(), emotion_registry.get_primary_scaling_factors())
+	step_folder = output_folder if layout == "sequence" else None
+	arguments = [(step, object_id, properties[step], detail_level, name, step_folder, formats) for step in range(steps)]
+	built = sorted(run_pool(build_step, arguments, processes), key=lambda result: result[0])
+	results = [(os.path.join(output_folder, get_step_name(name, step)), error) for (step, mesh, error) in built if error]
+	meshes = [mesh for (step, mesh, error) in built if mesh is not None]
+
+	if layout == "grid":
+		filenames = [os.path.join(output_folder, name + "." + extension) for extension in formats]
+		grid_mesh = get_grid_mesh(meshes, columns, name)
+		for filename in filenames:
+			mesh_export.write_mesh(grid_mesh, filename)
+		return results + [(filename, None) for filename in filenames]
+
+	results += [(os.path.join(output_folder, mesh.name + "." + extension), None) for mesh in meshes for extension in formats]
+	if frame_size and meshes:
+		# every frame fitted to a sphere around all the steps, so the form keeps its scale and position through the sequence
+		sphere = mesh_rasterizer.get_bounding_sphere([vertex for mesh in meshes for vertex in mesh.vertices])
+		frame_arguments = [(mesh, os.path.join(output_folder, mesh.name + ".png"), frame_size[0], frame_size[1], sphere) for mesh in meshes]
+		results += sorted(run_pool(render_step_frame, frame_arguments, processes))
+	return results
+
+# Start sweeping object_id through keyframes (blend weights) into output_folder in a separate process (config.render_python),
+# writing the meshes and frames of a sequence, and return its Popen without waiting for it. Raises OSError if the process
+# can't be started; on_exit(exit code) is called on a background thread when it ends (see background_process.py).
+def start_sweep(object_id, keyframes, output_folder, name, steps=config.sweep_steps, on_exit=None):
+	script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "design_sweep.py")
+	command = [config.render_python, script, object_id] + [json.dumps(keyframe) for keyframe in keyframes]
+	command += ["--steps", str(steps), "--output", output_folder, "--name", name, "--frames"]
+	return background_process.start(command, os.path.dirname(script), on_exit)
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Sweep an EmotiveModeler design from one emotion to the next, without Rhino.")
+	parser.add_argument("object", help="object type, or its letter in config.object_types")
+	parser.add_argument("keyframes", nargs="+", help="words (separated by periods) or JSON blend weights, at least two")
+	parser.add_argument("--steps", type=int, default=config.sweep_steps, help="designs in the sweep, keyframes included")
+	parser.add_argument("--output", default=".", help="folder for the files")
+	parser.add_argument("--name", default="sweep", help="name the files are written under")
+	parser.add_argument("--layout", default="sequence", choices=LAYOUTS, help="a file per step, or every step in one grid")
+	parser.add_argument("--formats", default="json", help="comma separated mesh formats: " + ", ".join(sorted(mesh_export.WRITERS)))
+	parser.add_argument("--frames", action="store_true", help="render a PNG frame of every step of a sequence")
+	parser.add_argument("--size", default="%dx%d" % config.turntable_size, help="frame size in pixels, e.g. 640x480")
+	parser.add_argument("--columns", type=int, default=None, help="steps per row of a grid (default: about square)")
+	parser.add_argument("--detail", default="render", choices=sorted(config.detail_levels), help="level of detail of the forms and meshes")
+	parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per core)")
+	options = parser.parse_args()
+
+	object_id = config.object_types.get(options.object, options.object)
+	if object_id not in emotion_registry.get_object_features()["object_name"]:
+		parser.error("unknown object type '" + options.object + "'")
+	formats = [extension.strip().lower() for extension in options.formats.split(",") if extension.strip()]
+	for extension in formats:
+		if extension not in mesh_export.WRITERS:
+			parser.error("unknown format '" + extension + "'")
+	try:
+		size = tuple(int(value) for value in options.size.lower().split("x"))
+	except ValueError:
+		size = ()
+	if len(size) != 2:
+		parser.error("--size must look like 640x480")
+	output_folder = os.path.abspath(options.output)
+	# the dictionaries and taxonomy are found relative to the scripts
+	os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+	system_emotion_dict = emotion_index.load_system_emotion_dictionary()
+	user_emotion_dict = user_dictionary_store.load_user_emotion_dictionary()
+	keyframes = []
+	for keyframe in options.keyframes:
+		if keyframe.strip().startswith("{"):
+			keyframes.append(json.loads(keyframe))
+		else:
+			unknown_words = [word for word in keyframe.lower().split(".") if word not in system_emotion_dict]
+			if unknown_words:
+				parser.error("not in the dictionary: " + ", ".join(unknown_words))
+			keyframes.append(get_word_blend_weights(keyframe.lower(), user_emotion_dict, system_emotion_dict))
+	try:
+		results = sweep_designs(object_id, keyframes, options.steps, output_folder, options.name, options.layout, formats, size if options.frames else None, options.columns, options.detail, options.processes)
+	except ValueError as error:
+		parser.error(str(error))
+	failures = [(filename, error) for (filename, error) in results if error]
+	for (filename, error) in failures:
+		print("Failed " + filename + ": " + error)
+	print("Wrote %d files of %d steps to %s" % (len(results) - len(failures), options.steps, output_folder))
+	sys.exit(1 if failures else 0)
@@ -6,8 +6,15 @@
 import math
 import json
 import config
-import rhinoscriptsyntax as rs
-import emotive_script_ui_helper
+import emotion_property_cache
+import emotion_registry
+import secondary_emotion_property_constructor
+import word_suggestions
+
+try:
+	import rhinoscriptsyntax as rs
+except ImportError:		# running outside Rhino (batch tools); unknown words are then skipped instead of asking the user
+	rs = None
 
 # Bulk of the emotion processing: uses dictionaries and user input to get all the shape's emotive properties (spine equation, aspect ratios, color, weight of 'primary' emotions)
 class Emotion():
@@ -23,10 +30,10 @@ class Emotion():
 		self.primary_emotion_taxonomy = primary_emotion_taxonomy
 		self.primary_scaling_factors = primary_scaling_factors
 
-		# sort and alphabetize emotions in emotion
-		self.emotions_contained = emotion.split(".")
+		# replace unknown words by dictionary words (or drop them), then sort and alphabetize emotions in emotion
+		self.emotions_contained = [self.__get_known_word(e) for e in emotion.split(".")]
+		self.emotions_contained[:] = [e for e in self.emotions_contained if e]
 		self.emotions_contained.sort()
-		self.emotions_contained[:] = [e for e in self.emotions_contained if self.__is_emotion_valid(e)]
 		if len(self.emotions_contained) == 0:
 			self.emotion = "neutral"
 		else:
@@ -34,6 +41,7 @@ class Emotion():
 
 		self.revert = revert
 		self.primary_emotions_present = self.__get_emotions_present()
+		self.multipliers = self.__get_multipliers()
 		self.sum_scaling_factors = self.__get_sum_scaling_factors()
 
 	# Return string representation of emotion
@@ -49,11 +57,39 @@ class Emotion():
 		self.revert = revert
 		return self.__get_breakdown_helper(self.emotion, self.revert)
 
+	# Return a dictionary of how strongly each primary emotion present is weighted when blending properties
+	def get_blend_weights(self):
+		return dict(self.multipliers)
+
+	# Return a key that is the same for every Emotion with the same properties (whatever its words or breakdown), or None
+	# if its properties don't come from the registry taxonomy. Used to cache what is built from the properties.
+	def get_properties_key(self):
+		if not self.__uses_registry_taxonomy():
+			return None
+		if self.__is_primary_emotion():
+			return (self.emotion, emotion_registry.get_taxonomy_version())
+		return emotion_property_cache.get_key(self.multipliers)
+
 	# Return a dictionary of properties for a secondary emotion
 	def get_properties(self):
-		emotion_properties = {}
 		if self.__is_primary_emotion():
-			emotion_properties = self.primary_emotion_taxonomy[self.emotion]
+			return self.primary_emotion_taxonomy[self.emotion]
+		if self.__uses_registry_taxonomy():
+			# shared between all words with the same blend weights; read-only, like the taxonomy
+			return emotion_property_cache.property_cache.get(emotion_property_cache.get_key(self.multipliers), self.__calculate_properties)
+		return self.__calculate_properties()
+
+	# Return a newly calculated dictionary of properties for a secondary emotion
+	def __calculate_properties(self):
+		emotion_properties = {}
+		precomputed_properties = self.__get_precomputed_properties()
+		if precomputed_properties:
+			emotion_properties = precomputed_properties
+		elif config.use_vectorized_emotion_engine:
+			# imported here because NumPy isn't available in Rhino's IronPython
+			import emotion_engine
+			engine = emotion_engine.get_engine(self.primary_emotion_taxonomy, self.primary_scaling_factors)
+			emotion_properties = engine.get_properties(self.get_blend_weights())
 		else:
 			emotion_properties["spine_equation"] = self.__get_spine_equation()
 			emotion_properties["global_vertical_AR"] = self.__get_value_number_property("global_vertical_AR")
@@ -65,19 +101,57 @@ class Emotion():
 			emotion_properties["spikiness"] = self.__get_spikiness()
 		return emotion_properties
 
-	def __is_emotion_valid(self, e):
+	# Return e if it is in the dictionary, the dictionary word it is an inflection of ("happier" -> "happy"), a close
+	# dictionary word or e itself if the user picks one, or None if the word should be left out
+	def __get_known_word(self, e):
 		if e in self.system_emotion_dict:
-			return True
-		else:
-			if e:
-				user_response = rs.MessageBox("Word '"+e+"' not found. Would you like to add '"+e+"' to the dictionary?", 4 | 0)
+			return e
+		if not e:
+			return None
+		suggestions = word_suggestions.get_word_suggestions(self.system_emotion_dict)
+		if config.map_inflected_words:
+			best_match = suggestions.get_best_match(e)
+			if best_match:
+				return best_match
+		if rs:
+			close_words = suggestions.suggest(e, 1)
+			if close_words:
+				user_response = rs.MessageBox("Word '"+e+"' not found. Did you mean '"+close_words[0]+"'? Click 'No' to add '"+e+"' to the dictionary instead.", 3 | 32)
 				if user_response == 6: #user says 'yes'
-					rs.MessageBox("'"+e+"' added to dictionary. Neutral object created to reflect '"+e+"'; add its emotive components using sliders.")
-					neutral_emotion_breakdown = {"sadness": 0, "trust": 0, "anger": 0, "surprise": 0, "joy": 0, "fear": 0, "anticipation": 0, "disgust": 0}
-					emotive_script_ui_helper.modify_user_dictionary(None, e, neutral_emotion_breakdown)
-					emotive_script_ui_helper.add_to_system_dictionary(e, neutral_emotion_breakdown)
-					return True
-			return False
+					return close_words[0]
+				if user_response == 7 and self.__add_word(e, False): #user says 'no'
+					return e
+			elif self.__add_word(e):
+				return e
+		return None
+
+	# Add e to the dictionary as a neutral word (asking the user first if ask). Returns True if it was added.
+	def __add_word(self, e, ask=True):
+		import emotive_script_ui_helper		# imported here to avoid a circular import
+		if ask:
+			user_response = rs.MessageBox("Word '"+e+"' not found. Would you like to add '"+e+"' to the dictionary?", 4 | 0)
+			if user_response != 6: #user doesn't say 'yes'
+				return False
+		rs.MessageBox("'"+e+"' added to dictionary. Neutral object created to reflect '"+e+"'; add its emotive components using sliders.")
+		neutral_emotion_breakdown = {"sadness": 0, "trust": 0, "anger": 0, "surprise": 0, "joy": 0, "fear": 0, "anticipation": 0, "disgust": 0}
+		emotive_script_ui_helper.modify_user_dictionary(None, e, neutral_emotion_breakdown)
+		emotive_script_ui_helper.add_to_system_dictionary(e, neutral_emotion_breakdown)
+		return True
+
+	# Return the properties precomputed by secondary_emotion_property_constructor for a single dictionary word the user hasn't
+	# modified, or None if they don't apply (word not in the file, file missing or out of date, or a different breakdown or taxonomy)
+	def __get_precomputed_properties(self):
+		if len(self.emotions_contained) != 1 or self.emotion in self.user_emotion_dict or not self.__uses_registry_taxonomy():
+			return None
+		precomputed_properties = secondary_emotion_property_constructor.get_precomputed_properties()
+		if precomputed_properties is None:
+			return None
+		return precomputed_properties.get_properties(self.emotion, self.primary_emotions_present)
+
+	# Return True if this emotion uses the taxonomy and scaling factors of emotion_registry (which the precomputed and cached
+	# properties are built from) and False otherwise
+	def __uses_registry_taxonomy(self):
+		return self.primary_emotion_taxonomy is emotion_registry.get_primary_emotion_taxonomy() and self.primary_scaling_factors is emotion_registry.get_primary_scaling_factors()
 
 	# Return True if emotion is primary emotion and False otherwise
 	def __is_primary_emotion(self):
@@ -124,6 +198,18 @@ class Emotion():
 				primary_emotions_present.append(primary_emotion)
 		return primary_emotions_present
 
+	# Return a dictionary of how strongly each primary emotion present is weighted when blending properties
+	def __get_multipliers(self):
+		multipliers = {}
+		for primary_emotion in self.primary_emotions_present:
+			# In the original word_emotion_dictionary, emotions either are present or aren't (0 or 1)
+			multiplier = 1
+			# Otherwise, look up what the user has set it to be
+			if self.emotion in self.user_emotion_dict:
+				multiplier = self.user_emotion_dict[self.emotion][primary_emotion]
+			multipliers[primary_emotion] = multiplier
+		return multipliers
+
 	# Return a dictionary of the sum of each scaling factors for all the primary emotions present in a secondary emotion
 	def __get_sum_scaling_factors(self):
 		sums = {}
@@ -131,12 +217,7 @@ class Emotion():
 			sums[weight] = 0
 		for primary_emotion in self.primary_emotions_present:
 			for weight in sums:
-				# In the original word_emotion_dictionary, emotions either are present or aren't (0 or 1)
-				multiplier = 1
-				# Otherwise, look up what the user has set it to be
-				if self.emotion in self.user_emotion_dict:
-					multiplier = self.user_emotion_dict[self.emotion][primary_emotion]
-				sums[weight] += self.primary_scaling_factors[primary_emotion][weight] * multiplier
+				sums[weight] += self.primary_scaling_factors[primary_emotion][weight] * self.multipliers[primary_emotion]
 		return sums
 
 	# Return the spine equation for a secondary emotion
@@ -151,9 +232,7 @@ class Emotion():
 				for term in emotion_spine_equation:			# a_term, b_term, h_term, k_term
 					if term not in spine_equation:
 						spine_equation[term] = 0
-					multiplier = 1
-					if self.emotion in self.user_emotion_dict:
-						multiplier = self.user_emotion_dict[self.emotion][primary_emotion]
+					multiplier = self.multipliers[primary_emotion]
 					spine_equation[term] += (emotion_spine_equation[term] * emotion_spine_equation_weighting * multiplier)/self.sum_scaling_factors["spine_weighting"]
 		return spine_equation
 
@@ -174,9 +253,7 @@ class Emotion():
 			for primary_emotion in self.primary_emotions_present:
 				emotion_number_property = self.primary_emotion_taxonomy[primary_emotion][property_name]
 				emotion_number_property_weighting = self.primary_scaling_factors[primary_emotion][property_name+"_weighting"]
-				multiplier = 1
-				if self.emotion in self.user_emotion_dict:
-					multiplier = self.user_emotion_dict[self.emotion][primary_emotion]
+				multiplier = self.multipliers[primary_emotion]
 				number_property += (emotion_number_property * emotion_number_property_weighting * multiplier)/self.sum_scaling_factors[property_name+"_weighting"]
 		return number_property
 
@@ -203,9 +280,7 @@ class Emotion():
 						sums[level] = 0
 						levels_present[level] = 0
 					levels[level].append(primary_emotion)
-					multiplier = 1
-					if self.emotion in self.user_emotion_dict:
-						multiplier = self.user_emotion_dict[self.emotion][primary_emotion]
+					multiplier = self.multipliers[primary_emotion]
 					sums[level] += primary_emotion_scaling_factors_data[primary_emotion]["vertical_AR_weighting"] * multiplier
 					# check to see how many emotions present at each level
 					if emotion_vertical_AR[primary_emotion][level] == None:
@@ -219,17 +294,15 @@ class Emotion():
 				for primary_emotion in levels[level]:
 					primary_emotion_data = self.primary_emotion_taxonomy[primary_emotion]
 					if primary_emotion_data["vertical_AR"][level] != None:
-						multiplier = 1
-						if self.emotion in self.user_emotion_dict:
-							multiplier = self.user_emotion_dict[self.emotion][primary_emotion]
+						multiplier = self.multipliers[primary_emotion]
 						# scaling factors for diff nos. of emotions present at every level
 						# if combo of emotions, i.e. levels_present>1, need weighted scaling factors,
 						# if only one emotion present, i.e. levels_present<=1, scaling factor weighting needs to be 1 in total (i.e. sum of weightings/sum of weightings)
 						if levels_present[level] > 1:
-						 	scaling_factor = primary_emotion_scaling_factors_data[primary_emotion]["vertical_AR_weighting"]
+							scaling_factor = primary_emotion_scaling_factors_data[primary_emotion]["vertical_AR_weighting"]
 						else:
-						 	scaling_factor = sums[level]
-					 	# scaling_factor = primary_emotion_scaling_factors_data[primary_emotion]["vertical_AR_weighting"]
+							scaling_factor = sums[level]
+						# scaling_factor = primary_emotion_scaling_factors_data[primary_emotion]["vertical_AR_weighting"]
 						vertical_AR[level] += (primary_emotion_data["vertical_AR"][level] * scaling_factor * multiplier)/sums[level]
 						# set to null if it is 0 (all numbers are positive so there cannot be a valid 0)
 				if vertical_AR[level] == 0:
@@ -261,29 +334,25 @@ class Emotion():
 							sums[level][term+"_weighting"] = 0
 					levels[level].append(primary_emotion)
 					for term in sums[level]:
-						multiplier = 1
-						if self.emotion in self.user_emotion_dict:
-							multiplier = self.user_emotion_dict[self.emotion][primary_emotion]
+						multiplier = self.multipliers[primary_emotion]
 						sums[level][term] += primary_emotion_scaling_factors_data[primary_emotion][term] * multiplier
 			for level in levels:
 				horizontal_AR[level] = {"level_horizontal_AR_x":0,"level_horizontal_AR_y":0,"points_in_curve":0,"horizontal_smoothness":0}
 				for primary_emotion in levels[level]:
 					primary_emotion_data = self.primary_emotion_taxonomy[primary_emotion]
 					for term in horizontal_AR[level]:
-						multiplier = 1
-						if self.emotion in self.user_emotion_dict:
-							multiplier = self.user_emotion_dict[self.emotion][primary_emotion]
+						multiplier = self.multipliers[primary_emotion]
 						# scaling factors for diff nos. of emotions present at every level
 						# if combo of emotions, i.e. length of levels array at each level >1, need weighted scaling factors,
 						# if only one emotion present, i.e. length of levels array at each level <=1, scaling factor weighting needs to be 1 in total (i.e. sum of weightings/sum of weightings)
 						if len(levels[level]) > 1:
-						 	scaling_factor = primary_emotion_scaling_factors_data[primary_emotion][term+"_weighting"]
+							scaling_factor = primary_emotion_scaling_factors_data[primary_emotion][term+"_weighting"]
 						else:
-						 	scaling_factor = sums[level][term+"_weighting"]
-					 	scaling_factor = primary_emotion_scaling_factors_data[primary_emotion][term+"_weighting"]
+							scaling_factor = sums[level][term+"_weighting"]
+						scaling_factor = primary_emotion_scaling_factors_data[primary_emotion][term+"_weighting"]
 						horizontal_AR[level][term] += (primary_emotion_data["horizontal_AR"][level][term] * scaling_factor * multiplier)/sums[level][term+"_weighting"]
-				horizontal_AR[level]["points_in_curve"] = int(round(horizontal_AR[level]["points_in_curve"]))
-				horizontal_AR[level]["horizontal_smoothness"] = int(round(horizontal_AR[level]["horizontal_smoothness"]))
+				horizontal_AR[level]["points_in_curve"] = secondary_emotion_property_constructor.round_half_away_from_zero(horizontal_AR[level]["points_in_curve"])
+				horizontal_AR[level]["horizontal_smoothness"] = secondary_emotion_property_constructor.round_half_away_from_zero(horizontal_AR[level]["horizontal_smoothness"])
 		return horizontal_AR
 
 	# Return rgb colour value for combination of primary emotions
@@ -298,9 +367,7 @@ class Emotion():
 				for term in emotion_render_rgb:			# r, g, b
 					if term not in render_rgb:
 						render_rgb[term] = 0
-					multiplier = 1
-					if self.emotion in self.user_emotion_dict:
-						multiplier = self.user_emotion_dict[self.emotion][primary_emotion]
+					multiplier = self.multipliers[primary_emotion]
 					render_rgb[term] += (emotion_render_rgb[term] * emotion_render_rgb_weighting * multiplier)/self.sum_scaling_factors["color_weighting"]
 		return render_rgb
 
@@ -0,0 +1,248 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import sys
+import random
+import numpy as np
+import config
+
+# Vectorized blending engine: the same emotion properties as Emotion.get_properties in emotion_class, computed with NumPy.
+# The taxonomy and scaling factors are packed once into dense arrays (emotions x properties, emotions x levels x terms),
+# and the properties of any number of breakdowns are then blended with a few weighted matrix operations.
+# Select it with config.use_vectorized_emotion_engine (CPython only - Rhino's IronPython has no NumPy).
+# Run "python emotion_engine.py" to check it against the dictionary code for every breakdown in the system dictionary.
+
+# The dictionary code divides ints with floor division when it runs on Python 2 (IronPython in Rhino), so the engine copies
+# whichever behaviour the interpreter it runs on gives the dictionary code. It rounds halves away from zero on every Python
+# (see secondary_emotion_property_constructor.round_half_away_from_zero), and so does the engine.
+INTEGER_DIVISION = (1/2 == 0)
+
+SPINE_TERMS = ("a_term", "b_term", "h_term", "k_term")
+NUMBER_PROPERTIES = ("global_vertical_AR", "global_horizontal_AR", "vertical_wrapping")
+COLOR_TERMS = ("r", "g", "b")
+HORIZONTAL_TERMS = ("level_horizontal_AR_x", "level_horizontal_AR_y", "points_in_curve", "horizontal_smoothness")
+ROUNDED_HORIZONTAL_TERMS = ("points_in_curve", "horizontal_smoothness")
+
+class VectorizedEmotionEngine():
+
+	# primary_emotion_taxonomy: geometric representations for primary emotions
+	# primary_scaling_factors: weights for combining primary emotions
+	# integer_division: blend int colors the way Python 2 does (defaults to the behaviour of the running interpreter)
+	def __init__(self, primary_emotion_taxonomy, primary_scaling_factors, emotion_names=config.primary_emotions, integer_division=INTEGER_DIVISION):
+		self.primary_emotion_taxonomy = primary_emotion_taxonomy
+		self.integer_division = integer_division
+		self.emotion_names = list(emotion_names)
+		self.emotion_columns = dict((name, column) for (column, name) in enumerate(self.emotion_names))
+		taxonomy = [primary_emotion_taxonomy[name] for name in self.emotion_names]
+		scaling_factors = [primary_scaling_factors[name] for name in self.emotion_names]
+
+		# spine equation, global aspect ratios, vertical wrapping and color: emotions x properties, with the scaling factor of each
+		self.scalar_columns = [("spine_equation", term, "spine_weighting") for term in SPINE_TERMS]
+		self.scalar_columns += [(name, None, name+"_weighting") for name in NUMBER_PROPERTIES]
+		self.scalar_columns += [("color", term, "color_weighting") for term in COLOR_TERMS]
+		self.color_columns = [column for (column, (name, term, weighting)) in enumerate(self.scalar_columns) if name == "color"]
+		self.scalar_values = np.array([[emotion[name][term] if term else emotion[name] for (name, term, weighting) in self.scalar_columns] for emotion in taxonomy], dtype=float)
+		self.scalar_weights = np.array([[factors[weighting] for (name, term, weighting) in self.scalar_columns] for factors in scaling_factors], dtype=float)
+		# emotions whose color would be blended with (Python 2) integer division
+		self.color_is_int = np.array([all(isinstance(value, int) for value in [factors["color_weighting"]] + [emotion["color"][term] for term in COLOR_TERMS]) for (emotion, factors) in zip(taxonomy, scaling_factors)])
+
+		self.spikiness = np.array([emotion["spikiness"] for emotion in taxonomy], dtype=float)
+
+		# vertical_AR: emotions x levels, NaN where a level is None
+		self.vertical_levels = sorted(set(level for emotion in taxonomy for level in emotion["vertical_AR"]), key=int)
+		self.vertical_has_level = np.array([[level in emotion["vertical_AR"] for level in self.vertical_levels] for emotion in taxonomy])
+		self.vertical_values = np.array([[self.__none_to_nan(emotion["vertical_AR"].get(level)) for level in self.vertical_levels] for emotion in taxonomy], dtype=float)
+		self.vertical_weights = np.array([factors["vertical_AR_weighting"] for factors in scaling_factors], dtype=float)
+
+		# horizontal_AR: emotions x levels x terms, zero where an emotion has no such level
+		self.horizontal_levels = sorted(set(level for emotion in taxonomy for level in emotion["horizontal_AR"]), key=int)
+		self.horizontal_has_level = np.array([[level in emotion["horizontal_AR"] for level in self.horizontal_levels] for emotion in taxonomy])
+		self.horizontal_values = np.array([[[emotion["horizontal_AR"][level][term] if level in emotion["horizontal_AR"] else 0 for term in HORIZONTAL_TERMS] for level in self.horizontal_levels] for emotion in taxonomy], dtype=float)
+		self.horizontal_weights = np.array([[factors[term+"_weighting"] for term in HORIZONTAL_TERMS] for factors in scaling_factors], dtype=float)
+		self.rounded_terms = [HORIZONTAL_TERMS.index(term) for term in ROUNDED_HORIZONTAL_TERMS]
+
+	# Return the properties for one breakdown. blend_weights maps each primary emotion present to its multiplier (see Emotion.get_blend_weights)
+	def get_properties(self, blend_weights):
+		(presence, multipliers) = self.pack([blend_weights])
+		return self.unpack(self.get_properties_batch(presence, multipliers), 0)
+
+	# Return (presence, multipliers) arrays (breakdowns x emotions) for a list of blend weight dicts
+	def pack(self, blend_weights_list):
+		presence = np.zeros((len(blend_weights_list), len(self.emotion_names)), dtype=bool)
+		multipliers = np.zeros(presence.shape)
+		for (row, blend_weights) in enumerate(blend_weights_list):
+			for primary_emotion in blend_weights:
+				presence[row, self.emotion_columns[primary_emotion]] = True
+				multipliers[row, self.emotion_columns[primary_emotion]] = blend_weights[primary_emotion]
+		return (presence, multipliers)
+
+	# Blend the properties of many breakdowns at once.
+	# presence: bool array (breakdowns x emotions) of the primary emotions present; multipliers: their weights (breakdowns x emotions)
+	# Returns a dict of arrays with one row per breakdown; use unpack to turn a row into a properties dict.
+	def get_properties_batch(self, presence, multipliers):
+		presence = np.asarray(presence, dtype=bool)
+		multipliers = np.asarray(multipliers, dtype=float)
+		weights = np.where(presence, multipliers, 0.0)
+		emotions_present = presence.sum(axis=1)
+		batch = {"emotions_present": emotions_present}
+
+		with np.errstate(divide="ignore", invalid="ignore"):
+			# weighted average of every scalar property
+			sums = weights.dot(self.scalar_weights)
+			batch["scalar"] = weights.dot(self.scalar_values * self.scalar_weights) / sums
+			batch["color_is_int"] = np.zeros(len(presence), dtype=bool)
+			if self.integer_division:
+				# every term of the color average is floor-divided when all the numbers involved are ints
+				batch["color_is_int"] = ~np.any(presence & ~(self.color_is_int & (multipliers == np.floor(multipliers))), axis=1)
+				color_terms = weights[:, :, None] * (self.scalar_values * self.scalar_weights)[None, :, self.color_columns]
+				color = np.floor(color_terms / sums[:, None, self.color_columns]).sum(axis=1)
+				batch["scalar"][:, self.color_columns] = np.where(batch["color_is_int"][:, None], color, batch["scalar"][:, self.color_columns])
+
+			# spikiness is the plain average of the emotions present
+			batch["spikiness"] = np.minimum(presence.dot(self.spikiness) / emotions_present, 1)
+
+			(batch["vertical_AR"], batch["vertical_AR_present"]) = self.__blend_vertical_AR(presence, weights)
+			(batch["horizontal_AR"], batch["horizontal_AR_unrounded"], batch["horizontal_AR_present"]) = self.__blend_horizontal_AR(presence, weights)
+		return batch
+
+	# Return the properties dict for row of a batch from get_properties_batch (with rounded=False, points_in_curve and
+	# horizontal_smoothness are left as the unrounded blend)
+	def unpack(self, batch, row, rounded=True):
+		if batch["emotions_present"][row] == 0:			# set to neutral values
+			neutral = self.primary_emotion_taxonomy["neutral"]
+			emotion_properties = {}
+			for name in ("spine_equation", "global_vertical_AR", "global_horizontal_AR", "vertical_AR", "horizontal_AR", "vertical_wrapping", "color"):
+				emotion_properties[name] = neutral[name]
+			emotion_properties["spikiness"] = 0
+			return emotion_properties
+
+		emotion_properties = {"spine_equation": {}, "color": {}}
+		for (column, (name, term, weighting)) in enumerate(self.scalar_columns):
+			value = float(batch["scalar"][row, column])
+			if name == "color" and batch["color_is_int"][row]:
+				value = int(value)
+			if term:
+				emotion_properties[name][term] = value
+			else:
+				emotion_properties[name] = value
+		emotion_properties["spikiness"] = float(batch["spikiness"][row])
+
+		vertical_AR = {}
+		for (column, level) in enumerate(self.vertical_levels):
+			if batch["vertical_AR_present"][row, column]:
+				value = batch["vertical_AR"][row, column]
+				vertical_AR[level] = None if np.isnan(value) else float(value)
+		emotion_properties["vertical_AR"] = vertical_AR
+
+		horizontal_AR = {}
+		for (column, level) in enumerate(self.horizontal_levels):
+			if batch["horizontal_AR_present"][row, column]:
+				horizontal_AR[level] = {}
+				for (index, term) in enumerate(HORIZONTAL_TERMS):
+					if term in ROUNDED_HORIZONTAL_TERMS and rounded:
+						horizontal_AR[level][term] = int(batch["horizontal_AR"][row, column, index])
+					else:
+						horizontal_AR[level][term] = float(batch["horizontal_AR_unrounded"][row, column, index])
+		emotion_properties["horizontal_AR"] = horizontal_AR
+		return emotion_properties
+
+	# vertical_AR per level. A level is None (NaN) when no emotion present has a value for it.
+	# With several emotions at a level each is weighted by its own scaling factor; a single emotion is weighted by the
+	# level's sum of scaling factors, i.e. counts fully.
+	def __blend_vertical_AR(self, presence, weights):
+		at_level = presence[:, :, None] & self.vertical_has_level[None]					# breakdowns x emotions x levels
+		has_value = ~np.isnan(self.vertical_values)
+		contributing = at_level & has_value[None]
+		sums = (weights[:, :, None] * self.vertical_weights[None, :, None] * at_level).sum(axis=1)
+		levels_present = contributing.sum(axis=1)
+		scaling_factor = np.where((levels_present > 1)[:, None, :], self.vertical_weights[None, :, None], sums[:, None, :])
+		terms = (np.where(has_value, self.vertical_values, 0)[None] * scaling_factor * weights[:, :, None]) / sums[:, None, :]
+		vertical_AR = np.where(contributing, terms, 0).sum(axis=1)
+		# set to None if it is 0 (all numbers are positive so there cannot be a valid 0)
+		vertical_AR[vertical_AR == 0] = np.nan
+		return (vertical_AR, at_level.any(axis=1))
+
+	# horizontal_AR per level and term: weighted average over the emotions that have the level
+	def __blend_horizontal_AR(self, presence, weights):
+		at_level = presence[:, :, None] & self.horizontal_has_level[None]				# breakdowns x emotions x levels
+		level_weights = weights[:, :, None, None] * self.horizontal_weights[None, :, None, :] * at_level[:, :, :, None]
+		sums = level_weights.sum(axis=1)												# breakdowns x levels x terms
+		terms = ((self.horizontal_values * self.horizontal_weights[:, None, :])[None] * weights[:, :, None, None]) / sums[:, None]
+		unrounded = np.where(at_level[:, :, :, None], terms, 0).sum(axis=1)
+		horizontal_AR = unrounded.copy()
+		# snap away summation-order noise first, so a blend that is exactly n.5 rounds the same way every time
+		rounded = np.round(unrounded[:, :, self.rounded_terms], 9)
+		horizontal_AR[:, :, self.rounded_terms] = np.floor(rounded + 0.5)			# the terms are never negative
+		return (horizontal_AR, unrounded, at_level.any(axis=1))
+
+	def __none_to_nan(self, value):
+		return np.nan if value is None else value
+
+cached_engine = None
+
+# Return an engine for this taxonomy and these scaling factors, reusing the last one built while they are the same objects
+# (emotion_registry hands out the same objects until a file changes)
+def get_engine(primary_emotion_taxonomy, primary_scaling_factors):
+	global cached_engine
+	if cached_engine is None or cached_engine[0] is not primary_emotion_taxonomy or cached_engine[1] is not primary_scaling_factors:
+		cached_engine = (primary_emotion_taxonomy, primary_scaling_factors, VectorizedEmotionEngine(primary_emotion_taxonomy, primary_scaling_factors))
+	return cached_engine[2]
+
+# Return a description of the first difference between two properties dicts, or None if they match within tolerance.
+# unrounded: actual's properties before rounding; a rounded value that is off by one is accepted when the unrounded blend is
+# an exact tie (n.5), because the dictionary code rounds those either way depending on the order it adds the emotions in.
+def properties_difference(expected, actual, unrounded=None, tolerance=1e-9, path="properties"):
+	if isinstance(expected, dict) or isinstance(actual, dict):
+		if not isinstance(expected, dict) or not isinstance(actual, dict) or sorted(expected) != sorted(actual):
+			return path + ": keys " + str(sorted(expected)) + " != " + str(sorted(actual))
+		for key in expected:
+			difference = properties_difference(expected[key], actual[key], unrounded[key] if unrounded else None, tolerance, path + "[" + str(key) + "]")
+			if difference:
+				return difference
+		return None
+	if expected is None or actual is None:
+		return None if expected is actual else path + ": " + str(expected) + " != " + str(actual)
+	if abs(expected - actual) > tolerance * max(1.0, abs(expected)):
+		if abs(expected - actual) == 1 and unrounded is not None and abs(unrounded % 1 - 0.5) < tolerance * max(1.0, abs(unrounded)):
+			return None
+		return path + ": " + str(expected) + " != " + str(actual)
+	return None
+
+# Check the engine against the dictionary code in emotion_class for every distinct breakdown in system_emotion_dict, both as a
+# dictionary word (every emotion present counts once) and as a user-modified word (breakdown values are the multipliers),
+# plus random_cases random slider settings. Returns (number of cases, list of (breakdown, user_modified, difference)).
+def compare_with_dict_engine(system_emotion_dict, primary_emotion_taxonomy, primary_scaling_factors, random_cases=500, seed=0):
+	import emotion_class
+	engine = VectorizedEmotionEngine(primary_emotion_taxonomy, primary_scaling_factors)
+	breakdowns = dict((tuple(sorted(breakdown.items())), breakdown) for breakdown in (system_emotion_dict[word] for word in system_emotion_dict)).values()
+	cases = [(breakdown, False) for breakdown in breakdowns] + [(breakdown, True) for breakdown in breakdowns]
+	generator = random.Random(seed)
+	for i in range(random_cases):
+		breakdown = dict((name, generator.choice([0, 0, generator.randint(1, config.max_trackbar_value)])) for name in config.primary_emotions[1:])
+		cases.append((breakdown, True))
+
+	use_vectorized_emotion_engine = config.use_vectorized_emotion_engine
+	config.use_vectorized_emotion_engine = False
+	mismatches = []
+	try:
+		for (breakdown, user_modified) in cases:
+			user_emotion_dict = {"check": breakdown} if user_modified else {}
+			emotion = emotion_class.Emotion("check", user_emotion_dict, {"check": breakdown}, primary_emotion_taxonomy, primary_scaling_factors)
+			batch = engine.get_properties_batch(*engine.pack([emotion.get_blend_weights()]))
+			difference = properties_difference(emotion.get_properties(), engine.unpack(batch, 0), engine.unpack(batch, 0, rounded=False))
+			if difference:
+				mismatches.append((breakdown, user_modified, difference))
+	finally:
+		config.use_vectorized_emotion_engine = use_vectorized_emotion_engine
+	return (len(cases), mismatches)
+
+if __name__ == "__main__":
+	import emotion_index
+	import emotion_registry
+	(case_count, mismatches) = compare_with_dict_engine(emotion_index.load_system_emotion_dictionary(), emotion_registry.get_primary_emotion_taxonomy(), emotion_registry.get_primary_scaling_factors())
+	for (breakdown, user_modified, difference) in mismatches[:20]:
+		print(("user " if user_modified else "system ") + str(breakdown) + ": " + difference)
+	print(str(case_count - len(mismatches)) + " of " + str(case_count) + " breakdowns match the dictionary engine")
+	sys.exit(1 if mismatches else 0)
@@ -0,0 +1,268 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import sys
+import json
+import struct
+import config
+import file_utils
+
+try:
+	import mmap
+except ImportError:		# not every IronPython build ships mmap; the index is then read into memory instead
+	mmap = None
+
+# Compiled word-emotion index for the system dictionary (word_emotion_dictionary_plutchik_edits.json).
+# Parsing the 14k word JSON takes seconds in IronPython, so the words are compiled once into a sorted, memory-mapped
+# index that is searched by bisection: loading is near instant and a lookup reads ~14 words instead of the whole file.
+# The 14k breakdowns are only a few hundred distinct patterns, so every distinct breakdown is stored once and each word
+# keeps the 2 byte id of its pattern. If the index can't be used, the JSON is compiled into the same layout in memory
+# rather than kept as a dict per word, which takes about 25 times less memory.
+#
+# Index layout (little endian):
+#	header			magic, word count, emotion count, pattern count
+#	emotion names	emotion count x 16 byte null-padded names
+#	word offsets	(word count + 1) x uint32, relative to the start of the word block
+#	word block		utf-8 encoded words, sorted by their encoded bytes
+#	pattern ids		word count x uint16: the breakdown pattern of every word
+#	patterns		pattern count x emotion count uint8 values, the distinct breakdowns
+#
+# Words the user adds to the dictionary don't touch the JSON or the index: they are appended to a small overlay journal
+# (config.system_emotion_overlay_filename, one {"word": ..., "breakdown": ...} line per word) that is read on load and
+# takes precedence over the index, so the base lexicon stays read-only and adding a word takes constant time.
+#
+# Run "python emotion_index.py" to rebuild the index when the JSON is newer (add --force to always rebuild).
+
+INDEX_MAGIC = b"EMWIDX02"
+HEADER = struct.Struct("<8sIII")
+EMOTION_NAME = struct.Struct("<16s")
+OFFSET = struct.Struct("<I")
+PATTERN_ID = struct.Struct("<H")
+
+# Sorted table of utf-8 words inside a compiled file: (word count + 1) uint32 offsets followed by the word block.
+# Shared by the compiled files that are looked up by word (this index and the precomputed emotion properties).
+class WordTable():
+
+	# data: contents of the file (string or mmap); position: where the offsets start
+	def __init__(self, data, position, word_count):
+		self.data = data
+		self.word_count = word_count
+		self.offsets_start = position
+		self.words_start = self.offsets_start + (word_count + 1) * OFFSET.size
+		self.end = self.words_start + self.__offset(word_count)
+
+	def __len__(self):
+		return self.word_count
+
+	# Return the encoded word at position index
+	def word(self, index):
+		return self.data[self.words_start + self.__offset(index):self.words_start + self.__offset(index+1)]
+
+	# Return the position of word in the table, or -1 if it isn't there (bisection over the sorted words)
+	def find(self, word):
+		if not isinstance(word, bytes):
+			word = word.encode("utf-8")
+		low = 0
+		high = self.word_count
+		while low < high:
+			middle = (low + high) // 2
+			if self.word(middle) < word:
+				low = middle + 1
+			else:
+				high = middle
+		if low < self.word_count and self.word(low) == word:
+			return low
+		return -1
+
+	# Return the offset of word number index inside the word block
+	def __offset(self, index):
+		position = self.offsets_start + index * OFFSET.size
+		return OFFSET.unpack(self.data[position:position+OFFSET.size])[0]
+
+# Return the bytes of a word table for encoded_words (already sorted)
+def pack_word_table(encoded_words):
+	offsets = [0]
+	for word in encoded_words:
+		offsets.append(offsets[-1] + len(word))
+	return b"".join(OFFSET.pack(offset) for offset in offsets) + b"".join(encoded_words)
+
+# Mapping of word -> emotion breakdown dict, backed by a compiled index (a memory-mapped file, or bytes from pack_index).
+# The index itself is read-only; words from the overlay and words added during the session are kept in self.additions.
+class EmotionIndex():
+
+	# data: the compiled index, as bytes or an mmap of the file written by build_index
+	# overlay_filename: overlay of added words (see add_word), or None
+	# index_file: the open file data is mapped from, closed with the index
+	def __init__(self, data, overlay_filename=None, index_file=None):
+		self.data = data
+		self.index_file = index_file
+
+		(magic, self.word_count, emotion_count, pattern_count) = HEADER.unpack(self.data[:HEADER.size])
+		if magic != INDEX_MAGIC:
+			self.close()
+			raise ValueError("Not an emotion index in the current format")
+		self.emotion_names = []
+		position = HEADER.size
+		for i in range(emotion_count):
+			name = EMOTION_NAME.unpack(self.data[position:position+EMOTION_NAME.size])[0]
+			self.emotion_names.append(name.rstrip(b"\0").decode("ascii"))
+			position += EMOTION_NAME.size
+		self.words = WordTable(self.data, position, self.word_count)
+		self.pattern_ids_start = self.words.end
+		# the few hundred distinct breakdowns, decoded once
+		pattern_struct = struct.Struct("<%dB" % emotion_count)
+		patterns_start = self.pattern_ids_start + self.word_count * PATTERN_ID.size
+		self.patterns = [pattern_struct.unpack(self.data[start:start+pattern_struct.size]) for start in range(patterns_start, patterns_start + pattern_count * pattern_struct.size, pattern_struct.size)]
+		self.additions = read_overlay(overlay_filename) if overlay_filename else {}
+
+	def __len__(self):
+		return self.word_count + len([word for word in self.additions if self.words.find(word) < 0])
+
+	def __contains__(self, word):
+		return word in self.additions or self.words.find(word) >= 0
+
+	def __getitem__(self, word):
+		if word in self.additions:
+			return self.additions[word]
+		index = self.words.find(word)
+		if index < 0:
+			raise KeyError(word)
+		return self.__breakdown(index)
+
+	def __setitem__(self, word, emotion_breakdown):
+		self.additions[word] = emotion_breakdown
+
+	def __iter__(self):
+		for index in range(self.word_count):
+			word = self.words.word(index).decode("utf-8")
+			if word not in self.additions:
+				yield word
+		for word in self.additions:
+			yield word
+
+	def get(self, word, default=None):
+		if word in self:
+			return self[word]
+		return default
+
+	def keys(self):
+		return list(self)
+
+	def items(self):
+		return [(word, self[word]) for word in self]
+
+	# Return the number of distinct breakdowns of the dictionary words (not counting the additions)
+	def get_pattern_count(self):
+		return len(self.patterns)
+
+	def close(self):
+		if mmap and isinstance(self.data, mmap.mmap):
+			self.data.close()
+		if self.index_file:
+			self.index_file.close()
+
+	# Return a new breakdown dict for the word at position index (a copy, so callers are free to modify it)
+	def __breakdown(self, index):
+		position = self.pattern_ids_start + index * PATTERN_ID.size
+		pattern_id = PATTERN_ID.unpack(self.data[position:position+PATTERN_ID.size])[0]
+		return dict(zip(self.emotion_names, self.patterns[pattern_id]))
+
+# Return the EmotionIndex of the index file index_filename, memory-mapped if possible
+def open_index(index_filename, overlay_filename=None):
+	index_file = open(index_filename, "rb")
+	if mmap:
+		data = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+	else:
+		data = index_file.read()
+	try:
+		return EmotionIndex(data, overlay_filename, index_file)
+	except ValueError:
+		raise ValueError("'"+index_filename+"' is not an emotion index in the current format")
+
+# Return the bytes of a compiled index of emotion_dict (word -> breakdown dict)
+def pack_index(emotion_dict):
+	emotion_names = config.primary_emotions[1:]			# remove "neutral"
+	words = sorted(word.encode("utf-8") for word in emotion_dict)
+	pattern_struct = struct.Struct("<%dB" % len(emotion_names))
+	pattern_ids = {}			# breakdown values: pattern id
+	word_pattern_ids = []
+	for word in words:
+		breakdown = emotion_dict[word.decode("utf-8")]
+		values = tuple(breakdown.get(name, 0) for name in emotion_names)
+		if min(values) < 0 or max(values) > 255:
+			raise ValueError("Emotion values for '"+word.decode("utf-8")+"' don't fit in the index (0-255)")
+		word_pattern_ids.append(pattern_ids.setdefault(values, len(pattern_ids)))
+	if len(pattern_ids) > 65535:
+		raise ValueError("Too many distinct breakdowns for the index")
+	patterns = sorted(pattern_ids, key=lambda values: pattern_ids[values])
+
+	parts = [HEADER.pack(INDEX_MAGIC, len(words), len(emotion_names), len(patterns))]
+	parts += [EMOTION_NAME.pack(name.encode("ascii")) for name in emotion_names]
+	parts.append(pack_word_table(words))
+	parts += [PATTERN_ID.pack(pattern_id) for pattern_id in word_pattern_ids]
+	parts += [pattern_struct.pack(*values) for values in patterns]
+	return b"".join(parts)
+
+# Compile the JSON dictionary in json_filename into an index file at index_filename
+def build_index(json_filename=config.system_emotion_dictionary_filename, index_filename=config.system_emotion_index_filename):
+	with open(json_filename) as json_file:
+		emotion_dict = json.loads(json_file.read())
+	data = pack_index(emotion_dict)
+	temp_filename = index_filename + ".tmp"
+	with open(temp_filename, "wb") as index_file:
+		index_file.write(data)
+	file_utils.replace_file(temp_filename, index_filename)
+
+# Return True if index_filename is an index in the current format
+def is_current_index(index_filename=config.system_emotion_index_filename):
+	try:
+		with open(index_filename, "rb") as index_file:
+			return index_file.read(len(INDEX_MAGIC)) == INDEX_MAGIC
+	except (IOError, OSError):
+		return False
+
+# Return the words in the overlay file as a word -> breakdown dict (later lines win; unreadable lines are skipped)
+def read_overlay(overlay_filename=config.system_emotion_overlay_filename):
+	additions = {}
+	for entry in file_utils.read_lines(overlay_filename)[0]:
+		additions[entry["word"]] = entry["breakdown"]
+	return additions
+
+# Add word to the system dictionary system_emotion_dict (as returned by load_system_emotion_dictionary) and append it to
+# the overlay file, so it is there the next time the dictionary is loaded
+def add_word(system_emotion_dict, word, emotion_breakdown, overlay_filename=config.system_emotion_overlay_filename):
+	file_utils.append_line(overlay_filename, json.dumps({"word": word, "breakdown": emotion_breakdown}))
+	system_emotion_dict[word] = emotion_breakdown
+
+# Rebuild the index if the JSON dictionary is newer than it or it is in an older format (or always, if force).
+# Returns True if it was rebuilt.
+def build_index_if_stale(json_filename=config.system_emotion_dictionary_filename, index_filename=config.system_emotion_index_filename, force=False):
+	if force or file_utils.is_stale(json_filename, index_filename) or not is_current_index(index_filename):
+		build_index(json_filename, index_filename)
+		return True
+	return False
+
+# Return the system dictionary (with the words added to the overlay) as a word -> breakdown mapping. Uses the compiled
+# index (rebuilding it first if the JSON is newer) and falls back to compiling the JSON in memory if the index can't be
+# written or read, e.g. in a read-only install, or to a plain dict if the JSON can't be compiled at all (values over 255).
+def load_system_emotion_dictionary(json_filename=config.system_emotion_dictionary_filename, index_filename=config.system_emotion_index_filename, overlay_filename=config.system_emotion_overlay_filename):
+	try:
+		build_index_if_stale(json_filename, index_filename)
+		return open_index(index_filename, overlay_filename)
+	except (IOError, OSError, ValueError):
+		with open(json_filename) as json_file:
+			emotion_dict = json.loads(json_file.read())
+		try:
+			return EmotionIndex(pack_index(emotion_dict), overlay_filename)
+		except ValueError:
+			emotion_dict.update(read_overlay(overlay_filename))
+			return emotion_dict
+
+if __name__ == "__main__":
+	force = "--force" in sys.argv[1:]
+	if build_index_if_stale(force=force):
+		print("Built " + config.system_emotion_index_filename)
+	else:
+		print(config.system_emotion_index_filename + " is up to date")
@@ -0,0 +1,70 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import collections
+import threading
+import config
+import emotion_registry
+
+# Least recently used cache of blended emotion properties, shared by every Emotion (UI and command line scripts alike).
+# Most words share a breakdown with many others (the majority of the dictionary is all zero or a single emotion), so
+# properties are cached by the normalized blend weights rather than by word, together with the taxonomy version so that
+# editing emotion_taxonomy.json or the scaling factors invalidates every entry.
+# Like emotion_registry, this module is left out of the reload() calls in the scripts so the cache survives between runs.
+# Lookups are locked, because the live preview (live_preview.py) gets properties on a background thread.
+
+class EmotionPropertyCache():
+
+	# max_size: number of properties dicts kept before the least recently used one is dropped
+	def __init__(self, max_size=config.emotion_property_cache_size):
+		self.max_size = max_size
+		self.entries = collections.OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.lock = threading.RLock()
+
+	def __len__(self):
+		return len(self.entries)
+
+	# Return the cached properties for key, calling compute() for them (and caching them read-only) on a miss
+	def get(self, key, compute):
+		with self.lock:
+			if key in self.entries:
+				self.hits += 1
+				emotion_properties = self.entries.pop(key)		# put back below as the most recently used
+			else:
+				self.misses += 1
+				emotion_properties = emotion_registry.freeze(compute())
+				while len(self.entries) >= self.max_size:
+					self.entries.popitem(last=False)
+					self.evictions += 1
+			self.entries[key] = emotion_properties
+			return emotion_properties
+
+	def clear(self):
+		with self.lock:
+			self.entries.clear()
+
+	# Return a dict of the cache counters
+	def get_stats(self):
+		return {"size": len(self.entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+	# Return the cache counters as one line for the Rhino command line
+	def report(self):
+		lookups = self.hits + self.misses
+		hit_rate = 100.0 * self.hits / lookups if lookups else 0.0
+		return "Emotion property cache: %d hits, %d misses (%.0f%% hit rate), %d of %d entries used, %d evicted" % (self.hits, self.misses, hit_rate, len(self.entries), self.max_size, self.evictions)
+
+property_cache = EmotionPropertyCache()
+
+# Return the cache key for blend weights (see Emotion.get_blend_weights): the weight of every primary emotion in a fixed
+# order, which of them are floats (Python 2 blends int colors with floor division, so 2 and 2.0 can give different
+# properties), the blending engine in use, and the taxonomy version
+def get_key(blend_weights):
+	names = config.primary_emotions[1:]			# remove "neutral"
+	weights = tuple(blend_weights.get(name) for name in names)		# None for an emotion that isn't present (0 is a weight)
+	float_weights = tuple(isinstance(weight, float) for weight in weights)
+	return (weights, float_weights, config.use_vectorized_emotion_engine, emotion_registry.get_taxonomy_version())
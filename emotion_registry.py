@@ -0,0 +1,100 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import os
+import json
+import config
+
+# Process-wide registry for the JSON files that describe emotions and objects (taxonomy, scaling factors, object features).
+# Each file is parsed once and only parsed again when its modification time changes, so redrawing a shape doesn't
+# reread the files. The data is handed out as read-only views that every Emotion and ObjectConstruction shares.
+# This module is deliberately left out of the reload() calls in the scripts so the registry survives between runs in Rhino.
+
+# dict that refuses modification, so shared registry data can't be changed by one caller under another
+class ReadOnlyDict(dict):
+
+	def __read_only(self, *args, **kwargs):
+		raise TypeError("registry data is read-only; use emotion_registry.thaw() for a modifiable copy")
+
+	__setitem__ = __read_only
+	__delitem__ = __read_only
+	clear = __read_only
+	pop = __read_only
+	popitem = __read_only
+	setdefault = __read_only
+	update = __read_only
+
+	# pickle and copy rebuild the dict from its items instead of setting them one by one
+	def __reduce__(self):
+		return (self.__class__, (dict(self),))
+
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
+
+# Return data (parsed JSON) with every dict replaced by a ReadOnlyDict and every list by a tuple
+def freeze(data):
+	if isinstance(data, dict):
+		return ReadOnlyDict((key, freeze(value)) for (key, value) in data.items())
+	if isinstance(data, list):
+		return tuple(freeze(value) for value in data)
+	return data
+
+# Return a plain, modifiable deep copy of frozen data
+def thaw(data):
+	if isinstance(data, dict):
+		return dict((key, thaw(value)) for (key, value) in data.items())
+	if isinstance(data, tuple):
+		return [thaw(value) for value in data]
+	return data
+
+class JsonFileRegistry():
+
+	def __init__(self):
+		self.entries = {}			# filename: (mtime, version, frozen data)
+		self.loads = 0
+
+	# Return the frozen contents of filename, parsing it only if it is new or has changed on disk
+	def get(self, filename):
+		return self.__entry(filename)[2]
+
+	# Return a version number for filename that changes every time the file is parsed again
+	def get_version(self, filename):
+		return self.__entry(filename)[1]
+
+	def __entry(self, filename):
+		mtime = os.path.getmtime(filename)
+		entry = self.entries.get(filename)
+		if entry is None or entry[0] != mtime:
+			with open(filename) as json_file:
+				data = freeze(json.loads(json_file.read()))
+			self.loads += 1
+			entry = (mtime, self.loads, data)
+			self.entries[filename] = entry
+		return entry
+
+registry = JsonFileRegistry()
+
+# Geometric representations for primary emotions
+def get_primary_emotion_taxonomy():
+	return registry.get(config.primary_emotion_taxonomy_filename)
+
+# Weights for combining primary emotions
+def get_primary_scaling_factors():
+	return registry.get(config.primary_scaling_factors_filename)
+
+# Object properties (volume, width, number of lofts) for each object type
+def get_object_features():
+	return registry.get(config.object_features_filename)
+
+# Return a value that changes whenever the taxonomy or scaling factors are reloaded (used to key caches of emotion properties)
+def get_taxonomy_version():
+	return (registry.get_version(config.primary_emotion_taxonomy_filename), registry.get_version(config.primary_scaling_factors_filename))
+
+# Return a value that changes whenever the object features are reloaded (used to key caches of built geometry)
+def get_object_features_version():
+	return registry.get_version(config.object_features_filename)
@@ -9,12 +9,17 @@ import json
 import construction_functions
 import config
 import emotion_class
+import emotion_index
+import emotion_property_cache
+import emotion_registry
+import turntable_render
+import user_dictionary_store
 import os
 
-# Generate user_emotion_dict object
-# TODO: what to do if doesn't exist
-user_emotion_dict_file = open(config.user_emotion_dictionary_filename).read()
-user_emotion_dict = json.loads(user_emotion_dict_file)
+# Generate user_emotion_dict object (journals every change to disk; empty if there is no user dictionary yet)
+user_emotion_dict = user_dictionary_store.get_user_emotion_dictionary()
+# Word dictionary of default emotion breakdowns (compiled index, loaded once)
+system_emotion_dict = emotion_index.load_system_emotion_dictionary()
 
 class Drawable_Object():
 	def __init__(self, object_id, emotion_id, user_emotion_dict):
@@ -22,12 +27,15 @@ class Drawable_Object():
 		self.user_emotion_dict = user_emotion_dict
 		self.emotion = self.__get_emotion_object(emotion_id)
 
-	# Draws Drawable_Object based on its form.
+	# Draws Drawable_Object based on its form, replacing the objects of the previous design.
 	def draw(self):
-		self.__get_shape()
-		self.__clear_all()
-		# reset_view()
-		self.__get_shape()
+		rs.EnableRedraw(False)
+		try:
+			self.__clear_all()
+			self.__get_shape()
+		finally:
+			# redraw again even if the design failed, or the viewport stays frozen
+			rs.EnableRedraw(True)
 		self.__reset_view()
 
 	def get_emotion(self):
@@ -37,16 +45,13 @@ class Drawable_Object():
 	def __get_shape(self):
 		obj = construction_functions.ObjectConstruction(self.object_id, self.emotion)
 		(spine_curve, end_plane) = obj.create_form()
+		construction_functions.record_drawn_objects(obj.get_object_ids())
 		return (spine_curve, end_plane)
 
 	# Returns Emotion object based on string representation of emotion.
 	def __get_emotion_object(self, emotion_id):
-		with open(config.system_emotion_dictionary_filename) as system_emotion_dict_file:		# Word dictionary of default emotion breakdowns
-			system_emotion_dict = json.loads(system_emotion_dict_file.read())
-		with open(config.primary_emotion_taxonomy_filename) as primary_emotion_taxonomy_file:	# Emotion taxonomy for primary emotions
-			primary_emotion_taxonomy = json.loads(primary_emotion_taxonomy_file.read())
-		with open(config.primary_scaling_factors_filename) as primary_scaling_factors_file:		# Scaling factors for primary emotions
-			primary_scaling_factors = json.loads(primary_scaling_factors_file.read())
+		primary_emotion_taxonomy = emotion_registry.get_primary_emotion_taxonomy()		# Emotion taxonomy for primary emotions
+		primary_scaling_factors = emotion_registry.get_primary_scaling_factors()		# Scaling factors for primary emotions
 
 		return emotion_class.Emotion(emotion_id, self.user_emotion_dict, system_emotion_dict, primary_emotion_taxonomy, primary_scaling_factors)
 
@@ -60,8 +65,7 @@ class Drawable_Object():
 
 	# Clears everything drawn
 	def __clear_all(self):
-		rs.Command("_SelAll")
-		rs.Command("Delete")
+		construction_functions.delete_drawn_objects()
 
 
 # Returns object type from input
@@ -138,30 +142,9 @@ def get_modify_directly_or_proportionally(emotion_object, emotion_id):
 		next_action = "c"
 	return next_action
 
-# Modifies the user dictionary and writes it to file
+# Modifies the user dictionary: sets emotion_id and updates the emotions that contain it (every change is journaled to file by user_dictionary_store)
 def modify_user_dictionary(object_id, emotion_id, emotion_breakdown):
-	# update entry for emotion_id in user_emotion_dict
-	user_emotion_dict[emotion_id] = emotion_breakdown
-	# update emotions that contain this emotion
-	emotions_contained = emotion_id.split(".")
-	for key in user_emotion_dict:
-		key_emotions = key.split(".")
-		# check to see if all emotions in emotion_id are contained in key
-		contains_all_so_far = True
-		for e in emotions_contained:
-			if e not in key_emotions:
-				contains_all_so_far = False
-				break
-		# if so, updates user_emotion_dict_data
-		if contains_all_so_far and key != emotion_id:
-			# remove from dictionary and put back correctly
-			user_emotion_dict.pop(key)
-			drawable = Drawable_Object(object_id, key, user_emotion_dict)
-			key_breakdown = drawable.get_emotion().get_breakdown()
-			user_emotion_dict[key] = key_breakdown
-	# write user_emotion_dict data to file
-	with open(config.user_emotion_dictionary_filename, 'w') as outfile:
-		json.dump(user_emotion_dict, outfile)
+	user_dictionary_store.modify_breakdown(user_emotion_dict, system_emotion_dict, emotion_id, emotion_breakdown)
 
 # Draws Drawable_Object with type and emotion
 def draw_emotion_object(object_id, emotion_id):
@@ -170,6 +153,7 @@ def draw_emotion_object(object_id, emotion_id):
 	return drawable
 
 def exit_script():
+	print(emotion_property_cache.property_cache.report())
 	rs.Exit()
 
 def switch_on_new_emotion(object_id, emotion_id=None):
@@ -203,14 +187,11 @@ def switch_on_new_emotion(object_id, emotion_id=None):
 	
 	elif next_action == "r":								# render
 		outpath = config.outpath_render + emotion_id
-		if not os.path.exists(outpath):
-			os.makedirs(outpath)
-		# set render view to perspective view
-		rs.CurrentView("Perspective")
-		# set animation turntable properties
-		rs.Command("-SetTurntableAnimation 30 Clockwise png RenderFull Perspective " + emotion_id + " -Enter")
-		# record animation to target folder
-		rs.Command("-RecordAnimation  _TargetFolder " + outpath + " -Enter")
+		# the frames are rendered by a separate process (see turntable_render.py), so Rhino can be used meanwhile
+		emotion = Drawable_Object(object_id, emotion_id, user_emotion_dict).get_emotion()
+		mesh_filename = turntable_render.export_design(object_id, emotion, outpath, emotion_id)
+		turntable_render.start_render(mesh_filename)
+		print("Rendering " + str(config.turntable_frames) + " frames of " + emotion_id + " to " + outpath + " in the background")
 		switch_on_new_emotion(object_id, emotion_id)
 	
 	elif next_action == "s":								# save
@@ -239,6 +220,7 @@ if __name__ == "__main__":
 	# Fixes data reload problem in Rhino
 	construction_functions = reload(construction_functions)
 	emotion_class = reload(emotion_class)
+	emotion_index = reload(emotion_index)
 	config = reload(config)
 	# clear_all()
 	# reset_view()
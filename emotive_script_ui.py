@@ -5,11 +5,17 @@
 
 import rhinoscriptsyntax as rs
 import Rhino
+import System
+import System.Drawing
+import System.IO
 import Meier_UI_Utility
 import random
 import json
 import config
 import emotive_script_ui_helper
+import live_preview
+import design_history
+import history_snapshots
 
 # Creates initial UI panel, buttons, slidebars, textboxes, design_history capability, checkboxes, and all their associated listeners. Look at Meier_UI_Utility to understand how this goes to Rhino.
     # draw_emotion_helper method is where you want to go for solving weird UI edge cases when a new drawing is rendered.
@@ -21,6 +27,9 @@ def Main():
     ui = AllControlExample()
     # Show the dialog from the UI class
     Rhino.UI.Dialogs.ShowSemiModal(ui.form)
+    ui.stop_preview()
+    ui.stop_history()
+    emotive_script_ui_helper.report_caches()
 
 # This is just a class to test all the UI controls
 class AllControlExample():
@@ -28,18 +37,26 @@ class AllControlExample():
         self.object_id = "Bottle"
         self.drawn_emotion = "neutral"
         self.emotion_id = "neutral"
-        self.design_history = 0
-        self.outpath = str(config.outpath_design_history + str(self.design_history) + ".jpg")
-        self.history = []
+        self.history_placeholder = str(config.outpath_design_history + "0.jpg")    # shown until there is a previous design
+        self.preview = None         # live_preview.LivePreview, started the first time a slider is dragged
+        self.history_snapshots = None   # history_snapshots.SnapshotQueue, started with the first design history picture
+        self.pending_thumbnails = set()     # serials of the designs whose pictures are being made
 
         # Make a new form (dialog)
         self.form = Meier_UI_Utility.UIForm("EmotiveModeler")
         # Initialize drawable object
         self.drawn = emotive_script_ui_helper.draw_emotion_object(self.object_id, self.emotion_id)
+        self.history = design_history.DesignHistory()
+        self.history.push(self.drawn_emotion, self.drawn.get_emotion().get_breakdown(), emotive_script_ui_helper.is_modified(self.drawn_emotion))
         # Accumulate controls for the form
         self.addControls()
         # Layout the controls on the form
         self.form.layoutControls()
+        # Slider controls, looked up once instead of on every slider tick
+        p = self.form.panel
+        self.track_bars = dict((e, p.Controls.Find("track_bar_"+e, True)[0]) for e in config.primary_emotions[1:])
+        self.track_bar_values = dict((e, p.Controls.Find("track_bar_value_"+e, True)[0]) for e in config.primary_emotions[1:])
+        self.live_preview_checkbox = p.Controls.Find("live_preview_checkbox", True)[0]
         self.init_enable_disable()
 
     # Add each control to an accumulated list of controls
@@ -60,7 +77,8 @@ class AllControlExample():
         # checkboxes and sliders for emotion breakdown
         self.modify_emotion_sliders(p)
 
-        # self.suggested_words(p)
+        # words with forms like the design on screen
+        self.suggested_words(p)
 
         #  design history text and image
         self.addDesignHistory(p)    
@@ -91,9 +109,11 @@ class AllControlExample():
         design_history_image = self.form.panel.Controls.Find("history_image", True)[0]
         design_history_image.Enabled = True
         self.form.panel.Controls.Find("undo_button", True)[0].Enabled = False
+        self.form.panel.Controls.Find("redo_button", True)[0].Enabled = False
 
         self.form.panel.Controls.Find("render_button", True)[0].Enabled = True
         self.form.panel.Controls.Find("save_button", True)[0].Enabled = True
+        self.form.panel.Controls.Find("sweep_button", True)[0].Enabled = True
         self.form.panel.Controls.Find("history_button", True)[0].Enabled = True
 
         self.current_emotion_label.Enabled = True
@@ -127,6 +147,12 @@ class AllControlExample():
         p.addButton("remove_button","Remove words",150,True,self.remove_emotion_button)
         p.addSeparator("sep2", 400, True)
 
+    # links to the dictionary words whose forms look most like the design on screen (see design_search.py)
+    def suggested_words(self, p):
+        p.addLabel("suggested_words_label", "Words with similar forms (click to draw one): ", None, True)
+        p.addFlowLayoutPanel("suggested", "Suggested words", 20, 400, True)
+        p.addSeparator("sep_suggested", 400, True)
+
     # checkboxes and sliders for emotion breakdown
     def modify_emotion_sliders(self, p):            #emotion_breakdown(self, p):
         p.addLabel("modify_label", "Modify the number and amount of individual emotions included in the form: ", None, True)
@@ -140,7 +166,8 @@ class AllControlExample():
             p.addTrackBar("track_bar_"+e, 0, config.max_trackbar_value, 1, 2, 1, emotion_breakdown[e], 150, False, self.trackbar_slider_listener)
             p.addTextBox("track_bar_value_"+e, str(emotion_breakdown[e]), 50, True, self.trackbar_value_listener)
 
-        p.addButton("modify_button","Modify shape",150,True,self.modify_emotion_button)
+        p.addButton("modify_button","Modify shape",150,False,self.modify_emotion_button)
+        p.addCheckBox("live_preview_checkbox", "Live preview while dragging", True, True, None)
 
     # add emotion breakdown text and image of previous design 
     def addDesignHistory(self, p):
@@ -153,10 +180,11 @@ class AllControlExample():
         p.addLabel("design_history_breakdown", "", None, True)
         p.addLabel("", "", None, False)
 
-        p.addPictureBox("history_image", self.outpath, False)
+        p.addPictureBox("history_image", self.history_placeholder, False)
         p.addLabel("", "", None, True)
 
         p.addButton("undo_button", "Revert to previous design", 150, False, self.undo_button)
+        p.addButton("redo_button", "Redo", 80, False, self.redo_button)
         p.addButton("revert_button", "Revert to original design", 150, True, self.revert_button)
 
     # render and savebuttons
@@ -164,6 +192,7 @@ class AllControlExample():
         p.addSeparator("sep4", 400, True)
         p.addButton("render_button", "Render", 150, False, self.render_button)
         p.addButton("save_button", "Save", 150, False, self.save_button)
+        p.addButton("sweep_button", "Morph from previous", 150, False, self.sweep_button)
         p.addButton("history_button", "Design History", 150, True, self.history_button)
 
 
@@ -171,6 +200,7 @@ class AllControlExample():
 
     # Called when the objectType buttons are pressed
     def objectType_selected(self, sender, e):
+        self.__cancel_preview()
         self.object_selection = sender.SelectedIndex
         self.object_id = sender.SelectedItem
         emotive_script_ui_helper.draw_emotion_object(self.object_id, self.drawn_emotion)
@@ -182,14 +212,13 @@ class AllControlExample():
         self.emotion_id = sender.Text.lower()
         print self.emotion_id
 
-    # Called when the slider is slid along the trackbar; makes text boxes match sliders
+    # Called when the slider is slid along the trackbar; makes the slider's text box match it and previews the shape
     def trackbar_slider_listener(self, sender, e):
-        p = self.form.panel
-        # Can't figure out how to pass in one 'emotion' value well, so am just updating all of them
-        primary_emotions = config.primary_emotions[1:]      # remove "neutral"
-        for emotion in primary_emotions:
-            new_value = p.Controls.Find("track_bar_"+emotion, True)[0].Value
-            p.Controls.Find("track_bar_value_"+emotion, True)[0].Text = str(new_value)
+        emotion = sender.Name[len("track_bar_"):]
+        self.track_bar_values[emotion].Text = str(sender.Value)
+        # only while the user drags (the sliders are also set by the code when a design is drawn)
+        if sender.Focused and self.live_preview_checkbox.Checked and self.live_preview_checkbox.Enabled:
+            self.__request_preview()
 
     # Called when the text boxes next to the sliders are modified; makes sliders match text boxes
     def trackbar_value_listener(self, sender, e):
@@ -206,13 +235,8 @@ class AllControlExample():
     # Called when "Modify shape" is pressed; modifies and draws the shape
     # TODO: how is this different from draw_emotion_helper?
     def modify_emotion_button(self, sender, e):
+        self.__cancel_preview()
         p = self.form.panel
-        # render image
-        self.__historyImage(p)
-        old_modify_emotion_breakdown = self.drawn.get_emotion().get_breakdown()
-        self.history.append((self.drawn_emotion, old_modify_emotion_breakdown))
-        p.Controls.Find("design_history_breakdown", True)[0].Text = str(old_modify_emotion_breakdown)
-
         new_modify_emotion_breakdown = self.drawn.get_emotion().get_breakdown()
 
         self.drawn_emotion = self.drawn.get_emotion().get_emotion()
@@ -225,7 +249,8 @@ class AllControlExample():
         # modify user dictionary and draw
         emotive_script_ui_helper.modify_user_dictionary(self.object_id, self.drawn_emotion, new_modify_emotion_breakdown)
         self.drawn = emotive_script_ui_helper.draw_emotion_object(self.object_id, self.drawn_emotion)
-        self.history.append((self.drawn_emotion, new_modify_emotion_breakdown))
+        self.history.push(self.drawn_emotion, new_modify_emotion_breakdown, True)
+        self.__update_history_panel()
 
 
     # Called when the draw button is pressed
@@ -273,19 +298,15 @@ class AllControlExample():
 
     # Used for both "Create Design" and "Add Word to Design"
     def draw_emotion_helper(self, revert=False):
+        self.__cancel_preview()
         p = self.form.panel
 
-        if not revert: #update history and render images if undo function has not already done it
-            # render image
-            self.__historyImage(p)
-            old_breakdown = self.drawn.get_emotion().get_breakdown(revert)
+        if not revert: #update history if undo function has not already done it
             self.drawn = emotive_script_ui_helper.draw_emotion_object(self.object_id, self.emotion_id, revert)
             #TODO: __str__ or __repr__ in Emotion class
-            self.history.append((self.drawn_emotion, old_breakdown))
             breakdown = self.drawn.get_emotion().get_breakdown(revert)
-            p.Controls.Find("design_history_breakdown", True)[0].Enabled = True
-            p.Controls.Find("design_history_breakdown", True)[0].Text = str(old_breakdown)
             self.drawn_emotion = self.drawn.get_emotion().get_emotion()
+            self.history.push(self.drawn_emotion, breakdown, emotive_script_ui_helper.is_modified(self.drawn_emotion))
             self.current_emotion_label.Text = "Current emotion: "+self.drawn_emotion
 
             # reset toolbar if undo function has not already done it
@@ -305,11 +326,9 @@ class AllControlExample():
         not_neutral = True if self.drawn_emotion != "neutral" else False
         self.__set_neutral_dependent_buttons(not_neutral)
         self.__add_emotion_checkboxes(self.emotions_contained, not_neutral)
+        self.__add_suggested_words(self.drawn.get_emotion())
 
-        if len(self.history[:self.design_history]) < 1: #Do not let user click undo button if there are no previous designs to revert to
-            p.Controls.Find("undo_button", True)[0].Enabled = False
-        else:
-            p.Controls.Find("undo_button", True)[0].Enabled = True
+        self.__update_history_panel()
 
     def __add_emotion_checkboxes(self, emotions, not_neutral):
         p = self.form.panel
@@ -324,47 +343,147 @@ class AllControlExample():
                 c = p.addCheckBox(emotion,emotion,False,False,None)
                 flp_ctrls.Add(c)
 
+    # Replace the suggested words with the ones for emotion (the design on screen)
+    def __add_suggested_words(self, emotion):
+        p = self.form.panel
+        p.Controls.Find("suggested_words_label", True)[0].Enabled = True
+        suggested = p.Controls.Find("suggested", True)[0]
+        suggested.Enabled = True
+        for ctrl in list(suggested.Controls):
+            ctrl.Dispose()
+        for word in emotive_script_ui_helper.get_similar_words(emotion):
+            suggested.Controls.Add(p.addLinkLabel("", word, word, False, self.suggested_word_clicked))
+
     def __set_neutral_dependent_buttons(self, not_neutral):
         p = self.form.panel
         p.Controls.Find("add_emotion_button", True)[0].Enabled = not_neutral
         p.Controls.Find("removed", True)[0].Enabled = not_neutral
         p.Controls.Find("remove_button", True)[0].Enabled = not_neutral
         p.Controls.Find("modify_button", True)[0].Enabled = not_neutral
-
-    # Called when the button is pressed
-    def __historyImage(self, p):
-        self.design_history = self.design_history + 1
-        self.outpath = str(config.outpath_design_history + str(self.design_history) + ".jpg")
-        # set view and render image to target folder
-        rs.CurrentView("Perspective")
-        rs.Command("_-Render", False)
-        rs.Command("_-SaveRenderWindowAs  \n\"" + self.outpath + "\"\n", False)
-        rs.Command("_-CloseRenderWindow", False)
-        p.Controls.Find("history_image", True)[0].Load(self.outpath)
-        p.Controls.Find("design_history_outpath", True)[0].Text = self.drawn_emotion
+        p.Controls.Find("live_preview_checkbox", True)[0].Enabled = not_neutral
+
+    # Preview the shape for the current slider values (see live_preview.py): the latest values are drawn as a coarse
+    # mesh once the sliders are still for a moment, and as the full design once they have been still a little longer
+    def __request_preview(self):
+        if self.preview is None:
+            invoke = lambda function: self.form.BeginInvoke(System.Action(function))
+            self.preview = live_preview.LivePreview(self.__compute_preview, self.__show_preview, invoke, config.live_preview_delay, config.live_preview_refine_delay, self.__preview_failed)
+        emotion_breakdown = dict(self.drawn.get_emotion().get_breakdown())
+        for emotion in config.primary_emotions[1:]:
+            emotion_breakdown[emotion] = self.track_bars[emotion].Value
+        self.preview.request((self.object_id, self.drawn_emotion, emotion_breakdown))
+
+    # Runs on the live preview's background thread
+    def __compute_preview(self, value, low_resolution):
+        (object_id, emotion_id, emotion_breakdown) = value
+        return (object_id, emotive_script_ui_helper.compute_preview(object_id, emotion_id, emotion_breakdown, low_resolution))
+
+    # Runs on the UI thread
+    def __show_preview(self, result, low_resolution):
+        (object_id, preview) = result
+        emotive_script_ui_helper.draw_preview(object_id, preview, low_resolution)
+
+    # Runs on the UI thread when a preview couldn't be computed; the design on screen is left as it is
+    def __preview_failed(self, error):
+        print "Live preview failed: " + str(error)
+
+    # Drop any preview that hasn't been drawn yet, so it can't replace the design that is about to be drawn
+    def __cancel_preview(self):
+        if self.preview:
+            self.preview.cancel()
+
+    # Stop the live preview thread (when the dialog closes)
+    def stop_preview(self):
+        if self.preview:
+            self.preview.stop()
+
+    # Shows the design before the one on screen in the "Previous design" section: its words, breakdown and picture. The
+    # picture is made on the design history queue (see history_snapshots.py) the first time it is needed, so drawing
+    # doesn't wait for it; until it is ready (or if it was dropped to save memory) the placeholder is shown.
+    def __update_history_panel(self):
+        p = self.form.panel
+        index = self.history.get_previous_index()
+        if index is None:
+            p.Controls.Find("design_history_outpath", True)[0].Text = ""
+            p.Controls.Find("design_history_breakdown", True)[0].Text = ""
+            p.Controls.Find("history_image", True)[0].Load(self.history_placeholder)
+        else:
+            (emotion_id, emotion_breakdown) = self.history.get(index)
+            p.Controls.Find("design_history_outpath", True)[0].Text = emotion_id
+            p.Controls.Find("design_history_breakdown", True)[0].Enabled = True
+            p.Controls.Find("design_history_breakdown", True)[0].Text = str(emotion_breakdown)
+            picture = self.history.get_thumbnail(index)
+            if picture is None:
+                p.Controls.Find("history_image", True)[0].Load(self.history_placeholder)
+                self.__request_thumbnail(index)
+            else:
+                stream = System.IO.MemoryStream(System.Array[System.Byte](bytearray(picture)))
+                p.Controls.Find("history_image", True)[0].Image = System.Drawing.Image.FromStream(stream)
+        #Do not let user click undo button if there are no previous designs to revert to
+        p.Controls.Find("undo_button", True)[0].Enabled = self.history.can_undo()
+        p.Controls.Find("redo_button", True)[0].Enabled = self.history.can_redo()
+
+    # Queues the picture of design index, unless it is already being made
+    def __request_thumbnail(self, index):
+        serial = self.history.get_serial(index)
+        if serial in self.pending_thumbnails:
+            return
+        if self.history_snapshots is None:
+            invoke = lambda function: self.form.BeginInvoke(System.Action(function))
+            self.history_snapshots = history_snapshots.SnapshotQueue(self.__capture_history_image, invoke)
+        self.pending_thumbnails.add(serial)
+        (emotion_id, emotion_breakdown) = self.history.get(index)
+        blend_weights = self.history.get_blend_weights(index)
+        on_ready = lambda picture, serial=serial: self.__show_history_image(serial, picture)
+        self.history_snapshots.submit((self.object_id, emotion_id, blend_weights), on_ready)
+
+    # Runs on the design history queue's background thread
+    def __capture_history_image(self, value):
+        (object_id, emotion_id, blend_weights) = value
+        return emotive_script_ui_helper.get_history_image(object_id, emotion_id, blend_weights)
+
+    # Runs on the UI thread; the picture is stored with its design and shown if that is still the previous design. If it
+    # couldn't be made (picture is None) the placeholder stays, and the picture is asked for again the next time the
+    # panel shows that design.
+    def __show_history_image(self, serial, picture):
+        self.pending_thumbnails.discard(serial)
+        if picture is None:
+            return
+        index = self.history.set_thumbnail(serial, picture)
+        if index is not None and index == self.history.get_previous_index():
+            self.__update_history_panel()
+
+    # Stop the design history thread (when the dialog closes)
+    def stop_history(self):
+        if self.history_snapshots:
+            self.history_snapshots.stop()
+
+    # Draws the design with index from the history and sets the sliders and buttons to match it
+    def __show_history_design(self, index):
+        (emotion_id, emotion_breakdown) = self.history.get(index)
+        self.drawn_emotion = emotion_id
+        self.current_emotion_label.Text = "Current emotion: "+self.drawn_emotion
+        self.drawn = emotive_script_ui_helper.restore_emotion_object(self.object_id, emotion_id, self.history.get_blend_weights(index))
+        for e in config.primary_emotions[1:]:
+            self.track_bars[e].Value = min(config.max_trackbar_value, emotion_breakdown[e])
+        self.draw_emotion_helper(True)
 
     # Called when undo_button clicked
     def undo_button(self, sender, e):
-        self.history = self.history[:self.design_history]
-
-        if len(self.history) >= 1:
-            self.design_history = self.design_history - 1
-            self.drawn_emotion = self.history[self.design_history][0]
-            self.current_emotion_label.Text = "Current emotion: "+self.drawn_emotion
-            self.drawn = emotive_script_ui_helper.draw_emotion_object(self.object_id, self.drawn_emotion)
-
-            p = self.form.panel
-            for e in config.primary_emotions[1:]:
-                p.Controls.Find("track_bar_"+e, True)[0].Value = self.history[self.design_history][1][e]
-
-            self.outpath = str(config.outpath_design_history + str(self.design_history) + ".jpg")
-            p.Controls.Find("history_image", True)[0].Load(self.outpath)
-            p.Controls.Find("design_history_outpath", True)[0].Text = str(self.history[self.design_history-1][0])
-            p.Controls.Find("design_history_breakdown", True)[0].Text = str(self.history[self.design_history-1][1])
-            self.draw_emotion_helper(True)
+        self.__cancel_preview()
+        if self.history.can_undo():
+            self.history.undo()
+            self.__show_history_design(self.history.get_position())
         else:
             rs.MessageBox("You don't have a previous design to revert to")
 
+    # Called when redo_button clicked
+    def redo_button(self, sender, e):
+        self.__cancel_preview()
+        if self.history.can_redo():
+            self.history.redo()
+            self.__show_history_design(self.history.get_position())
+
     # Called when revert_button clicked
     def revert_button(self, sender, e):
         self.emotion_id = self.drawn_emotion
@@ -372,41 +491,35 @@ class AllControlExample():
 
     # Called when render_button clicked
     def render_button(self, sender, e):
-        emotive_script_ui_helper.render_emotion_object(self.object_id, self.emotions_contained[0])
+        invoke = lambda function: self.form.BeginInvoke(System.Action(function))
+        emotive_script_ui_helper.render_emotion_object(self.object_id, self.drawn_emotion, invoke)
 
     # Called when save_button clicked
     def save_button(self, sender, e):
-        emotive_script_ui_helper.save_emotion_object(self.object_id, self.emotions_contained[0])
-
-    # Called when save_button clicked
-    def history_button(self, sender, e):
-        rs.MessageBox(self.history)
-        print self.history
-
+        emotive_script_ui_helper.save_emotion_object(self.object_id, self.drawn_emotion)
 
-    # def suggested_words(self,p):
-    #     emotions = self.drawn.get_emotion().get_emotions_contained()
-
-    #     synonyms = []
-    #     syn_list= []
-
-    #     for emotion in emotions:
-
-    #         for i, syn in enumerate(wn.synsets(emotion, pos)):
-    #             syns = [n.replace('_', '') for n in syn.lemma_names]
-    #             synonyms.append(syns)
-
-    #     syn_list = list(set(sum(synonyms,[])))
-
-    #     # for i in xrange(len(nltk_words)):
-    #     #     # p.addCheckBox(str(nltk_words[i]), str(nltk_words[i]), False, False, self.add_emotion_nltk_CheckStateChanged)
-    #     #     p.addLabel("nltk_words_label", related_words_label, None, True)
-
-    #     rs.MessageBox(syn_list)
-    #     # related_words_label = str("Related words to " + emotion_words + ": " + syn_list)
-    #     # p.addLabel("suggested_words_label", related_words_label, None, True)
+    # Called when a suggested word is clicked: draws it as the new design
+    def suggested_word_clicked(self, sender, e):
+        self.emotion_id = sender.Tag
+        self.draw_emotion_helper()
 
+    # Called when sweep_button clicked: morphs from the previous design in the history to the one on screen
+    def sweep_button(self, sender, e):
+        index = self.history.get_previous_index()
+        if index is None:
+            rs.MessageBox("You don't have a previous design to morph from")
+            return
+        (previous_emotion, previous_breakdown) = self.history.get(index)
+        (emotion_id, emotion_breakdown) = self.history.get_current()
+        # the weights the designs were built from, not their breakdowns (a dictionary word's are clamped to 1)
+        blend_weights = [self.history.get_blend_weights(index), self.history.get_blend_weights(self.history.get_position())]
+        invoke = lambda function: self.form.BeginInvoke(System.Action(function))
+        emotive_script_ui_helper.sweep_emotion_objects(self.object_id, blend_weights, previous_emotion + "_to_" + emotion_id, invoke)
 
+    # Called when save_button clicked
+    def history_button(self, sender, e):
+        rs.MessageBox(self.history.get_states())
+        print self.history.get_states()
 
 
 # Execute it...
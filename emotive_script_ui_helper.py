@@ -8,30 +8,42 @@ import math
 import json
 import construction_functions
 import config
+import design_search
+import design_sweep
 import emotion_class
+import emotion_index
+import emotion_property_cache
+import emotion_registry
+import form_kernel
+import geometry_cache
+import mesh_export
+import mesh_rasterizer
+import user_dictionary_store
 import os
+import turntable_render
 
 # This class takes all tasks related to drawing objects in the main Rhino UI window from emotive_script_ui. These include: modifying user dictionary, adding to system dictionary, drawing emotion object, rendering emotion object, and saving emotion object
 
 # Generate dictionary objects
-user_emotion_dict_file = open(config.user_emotion_dictionary_filename).read()
-user_emotion_dict = json.loads(user_emotion_dict_file)
-system_emotion_dict_file = open(config.system_emotion_dictionary_filename).read()
-system_emotion_dict = json.loads(system_emotion_dict_file)
+user_emotion_dict = user_dictionary_store.get_user_emotion_dictionary()		# journals every change to disk
+system_emotion_dict = emotion_index.load_system_emotion_dictionary()
 
 class Drawable_Object():
-	def __init__(self, object_id, emotion_id, user_emotion_dict, revert=False):
+	def __init__(self, object_id, emotion_id, user_emotion_dict, revert=False, emotion=None):
 		self.object_id = object_id
 		self.user_emotion_dict = user_emotion_dict
-		self.system_emotion_dict = system_emotion_dict #might take too long
-		self.emotion = self.__get_emotion_object(emotion_id, revert)
+		self.system_emotion_dict = system_emotion_dict
+		self.emotion = emotion if emotion is not None else self.__get_emotion_object(emotion_id, revert)
 
-	# Draws Drawable_Object based on its form.
+	# Draws Drawable_Object based on its form, replacing the objects of the previous design.
 	def draw(self):
-		self.__get_shape()
-		self.__clear_all()
-		# reset_view()
-		self.__get_shape()
+		rs.EnableRedraw(False)
+		try:
+			self.__clear_all()
+			self.__get_shape()
+		finally:
+			# redraw again even if the design failed, or the viewport stays frozen
+			rs.EnableRedraw(True)
 		self.__reset_view()
 
 	def get_emotion(self):
@@ -39,16 +51,15 @@ class Drawable_Object():
 
 	# Returns shape of constructed object
 	def __get_shape(self):
-		obj = construction_functions.ObjectConstruction(self.object_id, self.emotion)
+		obj = construction_functions.ObjectConstruction(self.object_id, self.emotion, geometry_cache.geometry_cache)
 		(spine_curve, end_plane) = obj.create_form()
+		construction_functions.record_drawn_objects(obj.get_object_ids())
 		return (spine_curve, end_plane)
 
 	# Returns Emotion object based on string representation of emotion.
 	def __get_emotion_object(self, emotion_id, revert):
-		with open(config.primary_emotion_taxonomy_filename) as primary_emotion_taxonomy_file:	# Emotion taxonomy for primary emotions
-			primary_emotion_taxonomy = json.loads(primary_emotion_taxonomy_file.read())
-		with open(config.primary_scaling_factors_filename) as primary_scaling_factors_file:		# Scaling factors for primary emotions
-			primary_scaling_factors = json.loads(primary_scaling_factors_file.read())
+		primary_emotion_taxonomy = emotion_registry.get_primary_emotion_taxonomy()		# Emotion taxonomy for primary emotions
+		primary_scaling_factors = emotion_registry.get_primary_scaling_factors()		# Scaling factors for primary emotions
 
 		return emotion_class.Emotion(emotion_id, self.user_emotion_dict, self.system_emotion_dict, primary_emotion_taxonomy, primary_scaling_factors, revert)
 
@@ -63,8 +74,7 @@ class Drawable_Object():
 
 	# Clears everything drawn
 	def __clear_all(self):
-		rs.Command("_SelAll")
-		rs.Command("Delete")
+		construction_functions.delete_drawn_objects()
 
 # def get_modified_emotion_breakdown_proportionally(emotion_object):
 # 	emotions_contained = emotion_object.get_emotions_contained()
@@ -88,36 +98,13 @@ class Drawable_Object():
 # 	return emotion_breakdown
 
 
-# Modifies the user dictionary and writes it to file
+# Modifies the user dictionary: sets emotion_id and updates the emotions that contain it (every change is journaled to file by user_dictionary_store)
 def modify_user_dictionary(object_id, emotion_id, emotion_breakdown):
-	# update entry for emotion_id in user_emotion_dict
-	user_emotion_dict[emotion_id] = emotion_breakdown
-	# update emotions that contain this emotion
-	emotions_contained = emotion_id.split(".")
-	for key in user_emotion_dict:
-		key_emotions = key.split(".")
-		# check to see if all emotions in emotion_id are contained in key
-		contains_all_so_far = True
-		for e in emotions_contained:
-			if e not in key_emotions:
-				contains_all_so_far = False
-				break
-		# if so, updates user_emotion_dict_data
-		if contains_all_so_far and key != emotion_id:
-			# remove from dictionary and put back correctly
-			user_emotion_dict.pop(key)
-			if object_id:
-				drawable = Drawable_Object(object_id, key, user_emotion_dict)
-			key_breakdown = drawable.get_emotion().get_breakdown()
-			user_emotion_dict[key] = key_breakdown
-	# write user_emotion_dict data to file
-	with open(config.user_emotion_dictionary_filename, 'w') as outfile:
-		json.dump(user_emotion_dict, outfile)
+	user_dictionary_store.modify_breakdown(user_emotion_dict, system_emotion_dict, emotion_id, emotion_breakdown)
 
+# Adds a word to the system dictionary and writes it to the dictionary's overlay file (the JSON and its index aren't changed)
 def add_to_system_dictionary(emotion_id, emotion_breakdown):
-	system_emotion_dict[emotion_id] = emotion_breakdown
-	with open(config.system_emotion_dictionary_filename, 'w') as outfile:
-		json.dump(system_emotion_dict, outfile)
+	emotion_index.add_word(system_emotion_dict, emotion_id, emotion_breakdown)
 
 # Draws Drawable_Object with type and emotion
 def draw_emotion_object(object_id, emotion_id, revert=False):
@@ -125,25 +112,131 @@ def draw_emotion_object(object_id, emotion_id, revert=False):
 	drawable.draw()
 	return drawable
 
-# Renders object
-def render_emotion_object(object_id, emotion_id):
+# Returns True if the design of emotion_id comes from the user dictionary (the word was modified with the sliders)
+def is_modified(emotion_id):
+	return emotion_id in user_emotion_dict
+
+# Draws emotion_id as it was in the history, from its blend_weights (see DesignHistory.get_blend_weights), the same way
+# as the previews. Undo and redo only redraw: the user dictionary and its files are left as they are.
+def restore_emotion_object(object_id, emotion_id, blend_weights):
+	emotion = get_preview_emotion(emotion_id, blend_weights)
+	drawable = Drawable_Object(object_id, emotion_id, user_emotion_dict, emotion=emotion)
+	drawable.draw()
+	return drawable
+
+# Returns the Emotion for emotion_id with emotion_breakdown (from the sliders), without changing the user dictionary.
+# Safe to call from the live preview's background thread: words that aren't in the dictionary raise ValueError instead of
+# reaching the questions Emotion asks about them in Rhino.
+def get_preview_emotion(emotion_id, emotion_breakdown):
+	unknown_words = [word for word in emotion_id.split(".") if word not in system_emotion_dict]
+	if unknown_words:
+		raise ValueError("Not in the dictionary: " + ", ".join(unknown_words))
+	return emotion_class.Emotion(emotion_id, {emotion_id: emotion_breakdown}, system_emotion_dict, emotion_registry.get_primary_emotion_taxonomy(), emotion_registry.get_primary_scaling_factors())
+
+# Returns what draw_preview needs to show emotion_id with emotion_breakdown: the Emotion and, at low resolution, a coarse
+# mesh of the form (no Rhino calls, so this runs on the live preview's background thread)
+def compute_preview(object_id, emotion_id, emotion_breakdown, low_resolution):
+	emotion = get_preview_emotion(emotion_id, emotion_breakdown)
+	emotion_properties = emotion.get_properties()
+	mesh = None
+	if low_resolution:
+		form = form_kernel.build_form(object_id, emotion_properties, None, "preview")
+		mesh = mesh_export.get_detail_mesh(form)
+	return (emotion, mesh)
+
+# Draws a preview from compute_preview in place of the design on screen: the coarse mesh at low resolution, the full
+# form otherwise. The view isn't reset, so the preview doesn't jump while the sliders are dragged.
+def draw_preview(object_id, preview, low_resolution):
+	(emotion, mesh) = preview
+	rs.EnableRedraw(False)
+	try:
+		construction_functions.delete_drawn_objects()
+		if low_resolution:
+			mesh_id = rs.AddMesh(mesh.vertices, mesh.triangles)
+			rs.ObjectColor(mesh_id, mesh.color)
+			construction_functions.record_drawn_objects([mesh_id])
+		else:
+			obj = construction_functions.ObjectConstruction(object_id, emotion, geometry_cache.geometry_cache)
+			obj.create_form()
+			construction_functions.record_drawn_objects(obj.get_object_ids())
+	finally:
+		rs.EnableRedraw(True)
+
+# Returns the dictionary words whose forms look most like the design of emotion (an Emotion), most alike first, for the
+# suggestion panel (see design_search.py). The words of the design itself are left out.
+def get_similar_words(emotion):
+	shape_index = design_search.get_shape_index(system_emotion_dict)
+	return [word for (distance, word) in shape_index.search(emotion.get_properties(), exclude=emotion.get_emotions_contained(), user_emotion_dict=user_emotion_dict)]
+
+# Returns a design history picture (the bytes of a PNG) of object_id for emotion_id with blend_weights (see
+# DesignHistory.get_blend_weights). Draws the kernel form with mesh_rasterizer instead of rendering the Rhino view, so it
+# runs on the history queue's background thread.
+def get_history_image(object_id, emotion_id, blend_weights):
+	# a user dictionary breakdown is used as the blend weights as it is
+	emotion_properties = get_preview_emotion(emotion_id, blend_weights).get_properties()
+	form = form_kernel.build_form(object_id, emotion_properties, None, "thumbnail")
+	mesh = mesh_export.get_detail_mesh(form)
+	(width, height) = config.history_image_size
+	return mesh_rasterizer.get_png(mesh_rasterizer.render_mesh(mesh, width, height))
+
+# Returns on_exit(exit code) for a background process doing task (e.g. "Rendering joy"), which tells the user if it
+# failed. invoke(function): runs function on the UI thread, e.g. with the form's BeginInvoke (called directly if None)
+def get_exit_report(task, outpath, invoke=None):
+	invoke = invoke or (lambda function: function())
+	def on_exit(exit_code):
+		if exit_code != 0:
+			invoke(lambda: rs.MessageBox(task + " failed (exit code " + str(exit_code) + "). What was finished is in " + outpath))
+	return on_exit
+
+# Renders a turntable animation of object in the background (see turntable_render.py): the mesh is exported here and
+# the frames are written to the target folder by a separate process, so Rhino isn't blocked while they render. A
+# render that fails is reported with invoke (see get_exit_report).
+def render_emotion_object(object_id, emotion_id, invoke=None):
 	outpath = config.outpath_render + object_id+"_"+emotion_id
-	if not os.path.exists(outpath):
-		os.makedirs(outpath)
-	# set render view to perspective view
-	rs.CurrentView("Perspective")
-	# set animation turntable properties
-	rs.Command("-SetTurntableAnimation 30 Clockwise png RenderFull Perspective " + emotion_id + " -Enter")
-	# record animation to target folder
-	rs.Command("-RecordAnimation  _TargetFolder " + outpath + " -Enter")
-
-# Saves object
+	emotion = Drawable_Object(object_id, emotion_id, user_emotion_dict).get_emotion()
+	mesh_filename = turntable_render.export_design(object_id, emotion, outpath, emotion_id)
+	try:
+		turntable_render.start_render(mesh_filename, on_exit=get_exit_report("Rendering " + emotion_id, outpath, invoke))
+	except OSError as error:
+		rs.MessageBox("The render couldn't be started (check config.render_python): " + str(error))
+		return
+	print("Rendering " + str(config.turntable_frames) + " frames of " + emotion_id + " to " + outpath + " in the background")
+
+# Sweeps object from one design to the next in the background (see design_sweep.py): the meshes and frames of every
+# step are written to the sweep folder by a separate process. blend_weights: the blend weights of the designs to pass
+# through, in order (see Emotion.get_blend_weights). A sweep that fails is reported with invoke (see get_exit_report).
+def sweep_emotion_objects(object_id, blend_weights, name, invoke=None):
+	outpath = config.outpath_sweep + object_id+"_"+name
+	try:
+		design_sweep.start_sweep(object_id, blend_weights, outpath, name, on_exit=get_exit_report("Sweeping " + name, outpath, invoke))
+	except OSError as error:
+		rs.MessageBox("The sweep couldn't be started (check config.render_python): " + str(error))
+		return
+	print("Sweeping " + object_id + " through " + str(config.sweep_steps) + " designs of " + name + " to " + outpath + " in the background")
+
+# Saves object, and writes it as watertight meshes ready to print in each of config.export_formats (see mesh_export.py)
 def save_emotion_object(object_id, emotion_id):
 	outpath = config.outpath_save + object_id+"_"+emotion_id
 	rs.Command("-Save  " + outpath + " -Enter")
+	emotion = Drawable_Object(object_id, emotion_id, user_emotion_dict).get_emotion()
+	form = form_kernel.build_form(object_id, emotion.get_properties(), None, "fabrication")
+	mesh = mesh_export.get_detail_mesh(form, object_id+"_"+emotion_id, True)
+	try:
+		mesh_export.check_watertight(mesh)
+	except ValueError as error:
+		rs.MessageBox("Saved, but the meshes for printing weren't written: " + str(error))
+		return
+	for extension in config.export_formats:
+		mesh_export.write_mesh(mesh, outpath + "." + extension)
 	rs.MessageBox("Saved!")
 
+# Prints the hit and miss counters of the shared emotion property cache to the Rhino command line
+def report_caches():
+	print(emotion_property_cache.property_cache.report())
+	print(geometry_cache.geometry_cache.report())
+
 def exit_script():
+	report_caches()
 	rs.Exit()
 
 # def switch_on_new_emotion(object_id, emotion_id=None):
@@ -167,4 +260,10 @@ def exit_script():
 # Fixes data reload problem in Rhino
 construction_functions = reload(construction_functions)
 emotion_class = reload(emotion_class)
+emotion_index = reload(emotion_index)
+form_kernel = reload(form_kernel)
+mesh_export = reload(mesh_export)
+mesh_rasterizer = reload(mesh_rasterizer)
+turntable_render = reload(turntable_render)
+design_sweep = reload(design_sweep)
 config = reload(config)
\ No newline at end of file
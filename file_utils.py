@@ -0,0 +1,62 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import os
+import json
+
+# Small file helpers shared by the modules that write the dictionary, journal and index files
+
+# Return True if target_filename is missing or older than source_filename
+def is_stale(source_filename, target_filename):
+	if not os.path.exists(target_filename):
+		return True
+	return os.path.getmtime(source_filename) > os.path.getmtime(target_filename)
+
+# Move temp_filename over filename. os.rename can't overwrite on Windows, so the old file is removed first;
+# a crash in between leaves temp_filename behind, which recover_file picks up on the next load.
+def replace_file(temp_filename, filename):
+	if os.path.exists(filename):
+		os.remove(filename)
+	os.rename(temp_filename, filename)
+
+# Finish an interrupted replace_file: if filename is missing but its temp file was completely written, move it into place
+def recover_file(temp_filename, filename):
+	if not os.path.exists(filename) and os.path.exists(temp_filename):
+		os.rename(temp_filename, filename)
+
+# Make sure what was written to open_file is on disk (not every IronPython build has os.fsync)
+def sync(open_file):
+	open_file.flush()
+	if hasattr(os, "fsync"):
+		os.fsync(open_file.fileno())
+
+# Append line to the journal file filename and sync it. A line left half written by a crash is ended first, so it
+# stays one unreadable line instead of running into this one.
+def append_line(filename, line):
+	ended = True
+	if os.path.exists(filename) and os.path.getsize(filename) > 0:
+		with open(filename, "rb") as journal_file:
+			journal_file.seek(-1, os.SEEK_END)
+			ended = journal_file.read(1) == b"\n"
+	with open(filename, "a") as journal_file:
+		journal_file.write(("" if ended else "\n") + line + "\n")
+		sync(journal_file)
+
+# Return the JSON values in the journal file filename, one per line, and whether any line couldn't be read
+# (half written by a crash). A missing file is an empty journal.
+def read_lines(filename):
+	values = []
+	damaged = False
+	if os.path.exists(filename):
+		with open(filename) as journal_file:
+			lines = journal_file.read().split("\n")
+		for line in lines:
+			if not line.strip():
+				continue
+			try:
+				values.append(json.loads(line))
+			except ValueError:
+				damaged = True
+	return (values, damaged)
@@ -0,0 +1,302 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import sys
+import math
+import config
+import emotion_registry
+
+# Headless geometry kernel: all the math of construction_functions.ObjectConstruction (object dimensions, spine circle
+# equation, cross-section planes, spiky profile ellipses, finishing features) without rhinoscriptsyntax, so forms can be
+# generated, exported and benchmarked outside Rhino. build_form returns the whole form as plain coordinate lists;
+# ObjectConstruction pushes that to Rhino. Written in plain Python rather than NumPy so the same code runs in Rhino's IronPython.
+# The planes copy what Rhino does for the degree 1 spine curve (tangent of the segment after each spine point,
+# Plane(origin, normal) axes), so the kernel places every level exactly where the Rhino construction does.
+# Forms are built at a detail level from config.detail_levels, chosen by what they are for: drafts drawn while the
+# sliders move or for the history pictures get fewer cross-section points, the spine curve of exports follows the spine
+# circle more closely, and the meshes of each use (see mesh_export.py) are sampled at their own resolution.
+
+# Finishing feature sizes (mm)
+CYLINDER_HEIGHT = 14.5
+CYLINDER_RADIUS = 7.4
+TORUS_MAJOR_RADIUS = 5.0
+TORUS_MINOR_RADIUS = TORUS_MAJOR_RADIUS - 1.5
+BASE_WIDTH = 80
+BASE_LENGTH = 60
+BASE_DEPTH = -10
+
+# Levels that get a planar cap (bottom and top of the form)
+CAPPED_LEVELS = ("1", "5")
+
+# Detail level of the designs drawn in Rhino, at which profiles and spine are exactly as the taxonomy gives them
+DEFAULT_DETAIL_LEVEL = "design"
+MIN_PROFILE_POINTS = 4
+
+def add(a, b):
+	return (a[0]+b[0], a[1]+b[1], a[2]+b[2])
+
+def subtract(a, b):
+	return (a[0]-b[0], a[1]-b[1], a[2]-b[2])
+
+def scale(a, factor):
+	return (a[0]*factor, a[1]*factor, a[2]*factor)
+
+def cross_product(a, b):
+	return (a[1]*b[2] - a[2]*b[1], a[2]*b[0] - a[0]*b[2], a[0]*b[1] - a[1]*b[0])
+
+def unitize(a):
+	length = math.sqrt(a[0]*a[0] + a[1]*a[1] + a[2]*a[2])
+	return scale(a, 1.0/length) if length > 0 else a
+
+# Return a vector perpendicular to v, choosing the same one as Rhino's Vector3d.PerpendicularTo
+def perpendicular_to(v):
+	(x, y, z) = (abs(v[0]), abs(v[1]), abs(v[2]))
+	if y > x:
+		if z > y:
+			return (0.0, v[2], -v[1])
+		if z >= x:
+			return (0.0, -v[2], v[1])
+		return (v[1], -v[0], 0.0)
+	if z > x:
+		return (v[2], 0.0, -v[0])
+	if z > y:
+		return (-v[2], 0.0, v[0])
+	return (-v[1], v[0], 0.0)
+
+# Coordinate frame of a cross-section, like a Rhino plane
+class Plane():
+
+	def __init__(self, origin, xaxis, yaxis, zaxis):
+		self.origin = tuple(origin)
+		self.xaxis = tuple(xaxis)
+		self.yaxis = tuple(yaxis)
+		self.zaxis = tuple(zaxis)
+
+	# Return the world coordinates of a point given in this plane's coordinates (like rs.XformCPlaneToWorld)
+	def point_to_world(self, point):
+		z = point[2] if len(point) > 2 else 0
+		return (self.origin[0] + point[0]*self.xaxis[0] + point[1]*self.yaxis[0] + z*self.zaxis[0],
+				self.origin[1] + point[0]*self.xaxis[1] + point[1]*self.yaxis[1] + z*self.zaxis[1],
+				self.origin[2] + point[0]*self.xaxis[2] + point[1]*self.yaxis[2] + z*self.zaxis[2])
+
+	# Return the world coordinates of a list of points given in this plane's coordinates
+	def points_to_world(self, points):
+		return [self.point_to_world(point) for point in points]
+
+# Return the plane Rhino makes for origin and normal (rs.PlaneFromNormal without an x axis)
+def plane_from_normal(origin, normal):
+	zaxis = unitize(normal)
+	xaxis = unitize(perpendicular_to(zaxis))
+	yaxis = unitize(cross_product(zaxis, xaxis))
+	return Plane(origin, xaxis, yaxis, zaxis)
+
+# Return the settings of the detail level name (see config.detail_levels)
+def get_detail_level(name):
+	if name not in config.detail_levels:
+		raise ValueError("Unknown detail level '" + str(name) + "' (use one of " + ", ".join(sorted(config.detail_levels)) + ")")
+	return config.detail_levels[name]
+
+def world_xy_plane():
+	return Plane((0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0))
+
+# Return the point at t (0 to 1) on the curve rs.AddCurve(points, degree) makes: a clamped B-spline with uniform knots
+# and points as its control points (the degree drops to len(points) - 1 if there are too few points, as in Rhino)
+def evaluate_curve(points, degree, t):
+	degree = max(1, min(degree, len(points) - 1))
+	spans = len(points) - degree
+	# knot span containing t, and the de Boor points that affect it
+	span = min(int(t * spans), spans - 1)
+	knots = [0.0] * degree + [float(i) / spans for i in range(spans + 1)] + [1.0] * degree
+	span_points = [tuple(point) for point in points[span:span+degree+1]]
+	for level in range(1, degree + 1):
+		for i in range(degree, level - 1, -1):
+			left = knots[span + i]
+			right = knots[span + i + degree - level + 1]
+			alpha = (t - left) / (right - left) if right > left else 0.0
+			span_points[i] = add(scale(span_points[i-1], 1 - alpha), scale(span_points[i], alpha))
+	return span_points[degree]
+
+# One cross-section of the form
+class Level():
+
+	# number: the level ("1", "2", ...; the keys of vertical_AR and horizontal_AR)
+	# spine_point: where the spine passes through the level
+	# plane: the cross-section plane
+	# profile_points: closed profile in plane coordinates (the first point is repeated at the end)
+	# degree: degree of the profile curve (the level's horizontal_smoothness)
+	def __init__(self, number, spine_point, plane, profile_points, degree):
+		self.number = number
+		self.spine_point = spine_point
+		self.plane = plane
+		self.profile_points = profile_points
+		self.degree = degree
+		self.world_points = plane.points_to_world(profile_points)
+		# the profile's seam is moved half way round if it starts below the spine, so the loft doesn't twist
+		self.flip_seam = self.world_points[0][0] <= spine_point[0]
+		self.capped = number in CAPPED_LEVELS
+
+# A complete form: everything ObjectConstruction needs to build it in Rhino
+class Form():
+
+	def __init__(self, object_id, dimensions, spine_points, levels, features, color, loft_type, spine_curve_points=None, detail_level=DEFAULT_DETAIL_LEVEL):
+		self.object_id = object_id
+		self.dimensions = dimensions					# actual_width, actual_height, actual_depth, vertical_AR
+		self.spine_points = spine_points				# one per loft, bottom to top
+		self.spine_curve_points = spine_curve_points or spine_points	# points of the drawn spine curve, the spine points among them
+		self.detail_level = detail_level				# name of the detail level it was built at
+		self.levels = levels							# Level for every level with a vertical_AR, bottom to top
+		self.features = features						# finishing features (see get_finishing_features)
+		self.color = color								# (r, g, b) render color
+		self.loft_type = loft_type						# Rhino loft type (from vertical_wrapping)
+
+	# Return the cross-section plane of the first level (the end plane ObjectConstruction.create_form returns)
+	def get_end_plane(self):
+		return self.levels[0].plane if self.levels else None
+
+# Return the object's actual width, height and depth for its volume and the emotion's aspect ratios
+def get_dimensions(object_properties, emotion_properties):
+	global_volume = object_properties["global_volume"]
+	global_width = object_properties["global_width"]
+	# Average aspect ratios
+	vertical_AR = emotion_properties["global_vertical_AR"]
+	horizontal_AR = emotion_properties["global_horizontal_AR"]
+
+	# Calculations
+	global_height = global_width/vertical_AR
+	global_depth = global_width/horizontal_AR
+	actual_width = global_width/math.pow(((global_width*global_height*global_depth)/(global_volume)), 1.0/3)
+	actual_height = actual_width/vertical_AR
+	actual_depth = actual_width/horizontal_AR
+
+	dimensions = {}
+	dimensions["actual_width"] = actual_width
+	dimensions["actual_height"] = actual_height
+	dimensions["actual_depth"] = actual_depth
+	dimensions["vertical_AR"] = vertical_AR
+	return dimensions
+
+# Return the spine points, one per loft: a circle in the xz plane given by the emotion's spine equation
+# spine_detail: points per loft; the points in between follow the circle, for a smoother spine curve. Every spine_detail-th
+# point is exactly the point of that loft, so the levels don't move.
+def get_spine_points(object_properties, emotion_properties, dimensions, spine_detail=1):
+	a_term = (emotion_properties["spine_equation"]["a_term"]*dimensions["actual_height"])
+	b_term = (emotion_properties["spine_equation"]["b_term"]*dimensions["actual_height"])
+	if b_term == 0:
+		b_term = 1
+	h_term = (emotion_properties["spine_equation"]["h_term"]*dimensions["actual_height"])
+	k_term = (emotion_properties["spine_equation"]["k_term"]*dimensions["actual_height"])
+
+	spine_points = []
+	for point_index in range((object_properties["number_of_lofts"] - 1) * spine_detail + 1):
+		loft_index = point_index / float(spine_detail)
+		y = 0
+		z = loft_index * (dimensions["actual_height"] / object_properties["number_of_lofts"])
+		x = h_term + math.sqrt(abs(math.pow(a_term,2.0) * (1 - ((math.pow(z-k_term,2.0))/math.pow(b_term,2.0))))) #equation of circle
+		spine_points.append((x, y, z))
+	return spine_points
+
+# Return the cross-section plane at every spine point: normal to the spine (the direction of the segment that starts
+# there, or the last segment at the top), except the bottom one, which is the world XY plane
+def get_spine_planes(spine_points):
+	planes = []
+	for (index, point) in enumerate(spine_points):
+		if index == 0:
+			planes.append(world_xy_plane())
+		else:
+			if index < len(spine_points) - 1:
+				tangent = subtract(spine_points[index+1], point)
+			else:
+				tangent = subtract(point, spine_points[index-1])
+			planes.append(plane_from_normal(point, tangent))
+	return planes
+
+# Return the number of profile points at profile_detail (a factor on points_in_curve). Other than at full detail the
+# number is rounded to an even one, so the pulled-in points of spiky profiles keep alternating across the seam and the
+# point half way round, where a flipped seam goes, is a profile point as it is at angle 0.
+def get_profile_point_count(points_in_curve, profile_detail=1.0):
+	if profile_detail == 1.0:
+		return points_in_curve
+	count = int(round(points_in_curve * profile_detail))
+	return max(count + count % 2, MIN_PROFILE_POINTS)
+
+# Return the closed profile of level in its plane's coordinates: an ellipse of points_in_curve points (scaled by
+# profile_detail), with every other point pulled in by up to 20% for spiky emotions, and the first point repeated at the end
+def get_profile_points(emotion_properties, dimensions, level, profile_detail=1.0):
+	spikiness = emotion_properties["spikiness"] # max spikiness = 1
+	scaling_factor_aid = 0.2*spikiness
+	level_horizontal_AR = emotion_properties["horizontal_AR"][level]
+	points_in_curve = get_profile_point_count(level_horizontal_AR["points_in_curve"], profile_detail)
+	profile_points = []
+	for i in range(points_in_curve):
+		scaling_factor = 1 - scaling_factor_aid if i%2 == 0 else 1 #ranges from a difference in 0.8 and 1 (no difference)
+		angle = 2 * math.pi * i / points_in_curve
+		x_point = scaling_factor*dimensions["actual_height"] * dimensions["vertical_AR"] * emotion_properties["vertical_AR"][level] * level_horizontal_AR["level_horizontal_AR_x"] * math.cos(angle) / 2
+		y_point = scaling_factor*dimensions["actual_height"] * dimensions["vertical_AR"] * emotion_properties["vertical_AR"][level] * level_horizontal_AR["level_horizontal_AR_y"] * math.sin(angle) / 2
+		profile_points.append((x_point, y_point, 0))
+	profile_points.append(profile_points[0])
+	return profile_points
+
+# Return the levels of the form: one for every spine point whose level has a vertical_AR
+def get_levels(emotion_properties, dimensions, spine_points, spine_planes, profile_detail=1.0):
+	levels = []
+	for (index, (spine_point, plane)) in enumerate(zip(spine_points, spine_planes)):
+		number = str(index + 1)
+		if emotion_properties["vertical_AR"][number] != None:
+			profile_points = get_profile_points(emotion_properties, dimensions, number, profile_detail)
+			degree = emotion_properties["horizontal_AR"][number]["horizontal_smoothness"]
+			levels.append(Level(number, spine_point, plane, profile_points, degree))
+	return levels
+
+# Return the finishing features of object_id as a list of dicts with the "level" they belong to and a "type" of:
+#	"cylinder" (plane, height, radius): neck of the Bottle and seat of the Chair, on top level 5
+#	"torus" (origin, direction, major_radius, minor_radius): Jewelry loop, on top level 5
+#	"box" (corners): Totem base under level 1, in world coordinates (8 corners, bottom face first, like rs.AddBox)
+def get_finishing_features(object_id, levels):
+	features = []
+	for level in levels:
+		if object_id in ("Bottle", "Chair") and level.number == "5":
+			features.append({"type": "cylinder", "level": level.number, "plane": level.plane, "height": CYLINDER_HEIGHT, "radius": CYLINDER_RADIUS})
+		if object_id == "Jewelry" and level.number == "5":
+			# Rhino's torus direction is the point (0, 0, 1) seen from the torus origin
+			direction = subtract((0, 0, 1), level.plane.origin)
+			features.append({"type": "torus", "level": level.number, "origin": level.plane.origin, "direction": direction, "major_radius": TORUS_MAJOR_RADIUS, "minor_radius": TORUS_MINOR_RADIUS})
+		if object_id == "Totem" and level.number == "1":
+			corners = [(-BASE_WIDTH/2,-BASE_LENGTH/2,0),(BASE_WIDTH/2,-BASE_LENGTH/2,0),(BASE_WIDTH/2,BASE_LENGTH/2,0),(-BASE_WIDTH/2,BASE_LENGTH/2,0),(-BASE_WIDTH/2,-BASE_LENGTH/2,BASE_DEPTH),(BASE_WIDTH/2,-BASE_LENGTH/2,BASE_DEPTH),(BASE_WIDTH/2,BASE_LENGTH/2,BASE_DEPTH),(-BASE_WIDTH/2,BASE_LENGTH/2,BASE_DEPTH)]
+			features.append({"type": "box", "level": level.number, "corners": corners})
+	return features
+
+# Return the render color (r, g, b) of the emotion
+def get_color(emotion_properties):
+	return (emotion_properties["color"]["r"], emotion_properties["color"]["g"], emotion_properties["color"]["b"])
+
+# Return the Rhino loft type for the emotion's vertical wrapping
+def get_loft_type(emotion_properties):
+	return int(round(emotion_properties["vertical_wrapping"]))
+
+# Return the Form of object_id ("Bottle", "Jewelry", "Totem" or "Chair") for emotion_properties (see Emotion.get_properties)
+# object_properties: the object's entry in object_features.json (looked up in emotion_registry if not given)
+def build_form(object_id, emotion_properties, object_properties=None, detail_level=DEFAULT_DETAIL_LEVEL):
+	if object_properties is None:
+		object_properties = emotion_registry.get_object_features()["object_name"][object_id]
+	detail = get_detail_level(detail_level)
+	dimensions = get_dimensions(object_properties, emotion_properties)
+	spine_curve_points = get_spine_points(object_properties, emotion_properties, dimensions, detail["spine_detail"])
+	spine_points = spine_curve_points[::detail["spine_detail"]]
+	spine_planes = get_spine_planes(spine_points)
+	levels = get_levels(emotion_properties, dimensions, spine_points, spine_planes, detail["profile_detail"])
+	features = get_finishing_features(object_id, levels)
+	return Form(object_id, dimensions, spine_points, levels, features, get_color(emotion_properties), get_loft_type(emotion_properties), spine_curve_points, detail_level)
+
+# Print a summary of the form for an object type and word, e.g. "python form_kernel.py Bottle joyful"
+if __name__ == "__main__":
+	import emotion_class
+	import emotion_index
+	object_id = sys.argv[1] if len(sys.argv) > 1 else "Bottle"
+	word = sys.argv[2] if len(sys.argv) > 2 else "neutral"
+	emotion = emotion_class.Emotion(word, {}, emotion_index.load_system_emotion_dictionary(), emotion_registry.get_primary_emotion_taxonomy(), emotion_registry.get_primary_scaling_factors())
+	form = build_form(object_id, emotion.get_properties())
+	print(object_id + " '" + emotion.get_emotion() + "': " + str(len(form.spine_points)) + " spine points, " + str(len(form.levels)) + " levels, " + str(len(form.features)) + " finishing features")
+	for level in form.levels:
+		print("level " + level.number + ": " + str(len(level.profile_points)) + " profile points, degree " + str(level.degree) + ", origin " + str(level.plane.origin))
@@ -0,0 +1,77 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import collections
+import config
+import emotion_registry
+
+# Least recently used cache of the Rhino geometry of designs already drawn, so undo, redo and going back to a recently
+# used word add the stored geometry to the document instead of rebuilding the spine, cross-sections and loft.
+# Entries are keyed by object type, detail level, the version of object_features.json and Emotion.get_properties_key() (the
+# blend weights and taxonomy version the form is computed from), so a modified breakdown, an edited taxonomy or edited
+# object features never get an old shape. Every entry is charged its
+# estimated size in bytes and the least recently used entries are dropped to stay under the limit.
+# Like emotion_property_cache, this module is left out of the reload() calls in the scripts so the cache survives between runs.
+
+class GeometryCache():
+
+	# limit: bytes of geometry kept before the least recently used entries are dropped
+	def __init__(self, limit=config.geometry_cache_limit):
+		self.limit = limit
+		self.entries = collections.OrderedDict()		# key: (value, size)
+		self.size = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	# Return the key of the design of object_id for emotion (an Emotion) at detail_level, or None if it can't be cached
+	def get_key(self, object_id, emotion, detail_level):
+		properties_key = emotion.get_properties_key()
+		if properties_key is None:
+			return None
+		return (object_id, detail_level, emotion_registry.get_object_features_version(), properties_key)
+
+	# Return the value stored for key, or None
+	def get(self, key):
+		entry = self.entries.pop(key, None)
+		if entry is None:
+			self.misses += 1
+			return None
+		self.hits += 1
+		self.entries[key] = entry			# now the most recently used
+		return entry[0]
+
+	# Store value for key, charging it size bytes. A value bigger than the whole cache isn't stored.
+	def put(self, key, value, size):
+		old_entry = self.entries.pop(key, None)
+		if old_entry is not None:
+			self.size -= old_entry[1]
+		if size > self.limit:
+			return
+		while self.entries and self.size + size > self.limit:
+			(old_key, (old_value, old_size)) = self.entries.popitem(last=False)
+			self.size -= old_size
+			self.evictions += 1
+		self.entries[key] = (value, size)
+		self.size += size
+
+	def clear(self):
+		self.entries.clear()
+		self.size = 0
+
+	# Return a dict of the cache counters
+	def get_stats(self):
+		return {"entries": len(self.entries), "size": self.size, "limit": self.limit, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+	# Return the cache counters as one line for the Rhino command line
+	def report(self):
+		lookups = self.hits + self.misses
+		hit_rate = 100.0 * self.hits / lookups if lookups else 0.0
+		return "Geometry cache: %d hits, %d misses (%.0f%% hit rate), %d designs in %.1f of %.1f MB, %d evicted" % (self.hits, self.misses, hit_rate, len(self.entries), self.size / 1048576.0, self.limit / 1048576.0, self.evictions)
+
+geometry_cache = GeometryCache()
@@ -0,0 +1,70 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import threading
+from collections import deque
+
+# Background queue for the design history pictures.
+# Drawing, modifying or adding a word used to wait for a full render of the previous design before doing anything. Now
+# the UI only submits what the picture needs; a single worker thread makes the pictures one after the other, in the
+# order they were submitted, and hands each picture back to the UI thread once it is made, or None if making it failed.
+
+class SnapshotQueue():
+
+	# capture(value): returns the picture of value; runs on the worker thread, so it mustn't touch Rhino
+	# invoke(function): runs function on the UI thread, e.g. with the form's BeginInvoke (called directly if None)
+	def __init__(self, capture, invoke=None):
+		self.capture = capture
+		self.invoke = invoke or (lambda function: function())
+		self.condition = threading.Condition()
+		self.jobs = deque()				# (value, on_ready) waiting to be captured
+		self.running = True
+		self.thread = threading.Thread(target=self.__run)
+		self.thread.daemon = True
+		self.thread.start()
+
+	# Make the picture of value in the background and call on_ready(picture) on the UI thread when it's done (with None
+	# if capture raised an error, which is printed on the UI thread)
+	def submit(self, value, on_ready=None):
+		with self.condition:
+			self.jobs.append((value, on_ready))
+			self.condition.notify()
+
+	# Return the number of pictures not made yet
+	def pending(self):
+		with self.condition:
+			return len(self.jobs)
+
+	# Stop the worker thread, dropping the pictures not made yet (the form they were for is closing)
+	def stop(self):
+		with self.condition:
+			self.running = False
+			self.jobs.clear()
+			self.condition.notify()
+
+	def __run(self):
+		while True:
+			with self.condition:
+				while self.running and not self.jobs:
+					self.condition.wait()
+				if not self.jobs:
+					return
+				(value, on_ready) = self.jobs.popleft()
+			try:
+				(picture, error) = (self.capture(value), None)
+			except Exception as capture_error:
+				(picture, error) = (None, capture_error)
+			with self.condition:
+				if not self.running:
+					return			# the form may be disposed already
+			# bound now: the loop moves on to the next picture before the UI thread gets to it
+			self.invoke(lambda on_ready=on_ready, picture=picture, error=error: self.__deliver(on_ready, picture, error))
+
+	# Runs on the UI thread
+	def __deliver(self, on_ready, picture, error):
+		if error is not None:
+			print("Design history picture failed: " + str(error))
+		if on_ready is not None:
+			on_ready(picture)
@@ -0,0 +1,114 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import time
+import threading
+
+# Debounced background previews for the emotion sliders.
+# Every slider tick calls request() with the latest value. A single worker thread waits until the value has been still
+# for delay seconds, computes a cheap low resolution preview of it and hands it to the UI thread to show; once the value
+# has been still for refine_delay seconds it computes the full resolution version the same way.
+# Only the latest value is ever computed, a result is dropped if a newer value came in while it was computed, and a new
+# result isn't handed over until the UI has shown the previous one, so dragging never queues up stale redraws.
+# An error computing a preview is handed to the UI thread the same way, since only that thread may talk to Rhino.
+
+class LivePreview():
+
+	# compute(value, low_resolution): returns what show needs; runs on the worker thread, so it mustn't touch Rhino
+	# show(result, low_resolution): draws the result; always called through invoke
+	# invoke(function): runs function on the UI thread, e.g. with the form's BeginInvoke (called directly if None)
+	# on_error(error): reports an exception raised by compute; always called through invoke (prints it if None)
+	def __init__(self, compute, show, invoke=None, delay=0.05, refine_delay=0.4, on_error=None):
+		self.compute = compute
+		self.show = show
+		self.invoke = invoke or (lambda function: function())
+		self.on_error = on_error or print_error
+		self.delay = delay
+		self.refine_delay = refine_delay
+		self.condition = threading.Condition()
+		self.value = None
+		self.generation = 0				# increases with every request
+		self.request_time = 0
+		self.previewed = 0				# generation last computed at low and at full resolution
+		self.refined = 0
+		self.showing = False			# a result has been handed to the UI thread and not shown yet
+		self.running = True
+		self.thread = threading.Thread(target=self.__run)
+		self.thread.daemon = True
+		self.thread.start()
+
+	# Preview value (replacing any value that hasn't been computed yet)
+	def request(self, value):
+		with self.condition:
+			self.value = value
+			self.generation += 1
+			self.request_time = time.time()
+			self.condition.notify()
+
+	# Forget the requested value, e.g. because the design is being drawn for real
+	def cancel(self):
+		with self.condition:
+			self.generation += 1
+			self.previewed = self.generation
+			self.refined = self.generation
+			self.condition.notify()
+
+	# Stop the worker thread
+	def stop(self):
+		with self.condition:
+			self.running = False
+			self.condition.notify()
+
+	def __run(self):
+		while True:
+			job = self.__wait_for_job()
+			if job is None:
+				return
+			(generation, value, low_resolution) = job
+			try:
+				result = self.compute(value, low_resolution)
+			except Exception as error:
+				with self.condition:
+					if not self.running:
+						return
+				self.invoke(lambda error=error: self.on_error(error))
+				continue
+			with self.condition:
+				if generation != self.generation or not self.running:
+					continue			# a newer value came in while this one was computed
+				self.showing = True
+			self.invoke(lambda: self.__show(generation, result, low_resolution))
+
+	# Return (generation, value, low_resolution) to compute next, or None when stopped
+	def __wait_for_job(self):
+		with self.condition:
+			while self.running:
+				timeout = None
+				if not self.showing and self.generation > self.refined:
+					low_resolution = self.generation > self.previewed
+					ready_time = self.request_time + (self.delay if low_resolution else self.refine_delay)
+					if time.time() >= ready_time:
+						if low_resolution:
+							self.previewed = self.generation
+						else:
+							self.refined = self.generation
+						return (self.generation, self.value, low_resolution)
+					timeout = max(0, ready_time - time.time())
+				self.condition.wait(timeout)
+			return None
+
+	# Show a result on the UI thread, unless a newer value was requested since it was computed
+	def __show(self, generation, result, low_resolution):
+		try:
+			if generation == self.generation and self.running:
+				self.show(result, low_resolution)
+		finally:
+			with self.condition:
+				self.showing = False
+				self.condition.notify()
+
+# Report an error computing a preview on the Rhino command line
+def print_error(error):
+	print("Live preview failed: " + str(error))
@@ -0,0 +1,273 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import os
+import json
+import math
+import struct
+import zipfile
+import form_kernel
+
+# Triangle meshes of form_kernel forms, written as OBJ, binary STL, 3MF or JSON files without Rhino.
+# Every cross-section profile is sampled at the same number of points (starting at its seam, so the rings line up the way
+# the Rhino loft does), the rings are joined with triangles, and capped levels get a flat fan of triangles.
+# The rings in between levels follow the loft type: straight lines for straight lofts, a B-spline through the cross-sections
+# as control points for loose lofts and a Catmull-Rom spline through them for the others. The result is close to Rhino's
+# loft surface, not a copy of it.
+# The finishing features (Bottle and Chair cylinder, Jewelry torus, Totem base box) are added as closed shells of their own.
+# Every shell shares the vertices along its edges, so with both ends of the loft capped the mesh is watertight and can be
+# printed; the shells overlap where the features meet the form, which slicers merge. A form of a single cross-section (the
+# Chair of a neutral word) is a flat sheet, so capping it gives the sheet a thickness instead. check_watertight makes sure
+# of the result before a mesh is written for printing.
+
+DEFAULT_PROFILE_SAMPLES = 48		# points around every ring
+DEFAULT_SPAN_SAMPLES = 4			# rings from one level to the next
+DEFAULT_FEATURE_SAMPLES = 32		# points around the cylinder and torus
+SHEET_THICKNESS = 2.0				# millimeters given to a form of a single cross-section when it is capped
+
+# Rhino loft types (see form_kernel.get_loft_type)
+LOFT_LOOSE = 1
+LOFT_STRAIGHT = 3
+
+class Mesh():
+
+	# name: name written into the file
+	# vertices: list of (x, y, z)
+	# triangles: list of (i, j, k) vertex indices, counter-clockwise seen from outside
+	# color: (r, g, b) render color, or None
+	def __init__(self, name, vertices, triangles, color=None):
+		self.name = name
+		self.vertices = vertices
+		self.triangles = triangles
+		self.color = color
+
+	# Return the unit normal of triangle number index
+	def get_normal(self, index):
+		(a, b, c) = [self.vertices[i] for i in self.triangles[index]]
+		return form_kernel.unitize(form_kernel.cross_product(form_kernel.subtract(b, a), form_kernel.subtract(c, a)))
+
+# Return samples points around the profile curve of level, in world coordinates, starting at the curve's seam
+def get_profile_ring(level, samples):
+	seam = 0.5 if level.flip_seam else 0.0
+	return [form_kernel.evaluate_curve(level.world_points, level.degree, (seam + float(i) / samples) % 1.0) for i in range(samples)]
+
+# Return the point at t (0 to 1) on the Catmull-Rom spline from b to c (a and d are the points before and after)
+def catmull_rom(a, b, c, d, t):
+	t2 = t * t
+	t3 = t2 * t
+	return tuple(0.5 * (2*b[i] + (c[i] - a[i])*t + (2*a[i] - 5*b[i] + 4*c[i] - d[i])*t2 + (3*b[i] - a[i] - 3*c[i] + d[i])*t3) for i in range(3))
+
+# Return the rings of the loft through the level rings: span_samples rings from each level to the next, and the last level
+def get_loft_rings(level_rings, loft_type, span_samples):
+	if len(level_rings) < 2 or span_samples < 2:
+		return list(level_rings)
+	rings = []
+	spans = len(level_rings) - 1
+	for span in range(spans):
+		for step in range(span_samples):
+			t = float(step) / span_samples
+			if loft_type == LOFT_STRAIGHT:
+				ring = [form_kernel.add(form_kernel.scale(a, 1 - t), form_kernel.scale(b, t)) for (a, b) in zip(level_rings[span], level_rings[span+1])]
+			elif loft_type == LOFT_LOOSE:
+				ring = [form_kernel.evaluate_curve(column, 3, (span + t) / spans) for column in zip(*level_rings)]
+			else:
+				before = level_rings[max(span - 1, 0)]
+				after = level_rings[min(span + 2, spans)]
+				ring = [catmull_rom(a, b, c, d, t) for (a, b, c, d) in zip(before, level_rings[span], level_rings[span+1], after)]
+			rings.append(ring)
+	rings.append(list(level_rings[-1]))
+	return rings
+
+# Return the Mesh of form (a form_kernel.Form)
+# profile_samples: points around every ring; span_samples: rings from one level to the next
+# feature_samples: points around the cylinder and torus features (no features if 0)
+# cap_open_ends: cap the ends of the loft that Rhino leaves open as well (the top of the Chair), so the mesh is watertight
+def get_mesh(form, profile_samples=DEFAULT_PROFILE_SAMPLES, span_samples=DEFAULT_SPAN_SAMPLES, name=None, feature_samples=DEFAULT_FEATURE_SAMPLES, cap_open_ends=False):
+	vertices = []
+	triangles = []
+	level_rings = [get_profile_ring(level, profile_samples) for level in form.levels]
+	rings = get_loft_rings(level_rings, form.loft_type, span_samples)
+	top_center = form.levels[-1].plane.origin if form.levels else None
+	if len(rings) == 1 and cap_open_ends:
+		offset = form_kernel.scale(form.levels[0].plane.zaxis, SHEET_THICKNESS)
+		rings.append([form_kernel.add(point, offset) for point in rings[0]])
+		top_center = form_kernel.add(top_center, offset)
+	for ring in rings:
+		vertices.extend(ring)
+	for r in range(len(rings) - 1):
+		add_strip(triangles, r * profile_samples, (r + 1) * profile_samples, profile_samples)
+
+	# flat caps on the capped end levels, facing away from the form
+	if form.levels and (form.levels[0].capped or cap_open_ends):
+		add_cap(vertices, triangles, form.levels[0].plane.origin, 0, profile_samples, False)
+	if len(rings) > 1 and (form.levels[-1].capped or cap_open_ends):
+		add_cap(vertices, triangles, top_center, (len(rings) - 1) * profile_samples, profile_samples, True)
+	if feature_samples:
+		for feature in form.features:
+			add_feature(vertices, triangles, feature, feature_samples)
+	return Mesh(name or form.object_id, vertices, triangles, form.color)
+
+# Return the Mesh of form at the resolution of the detail level it was built at (see config.detail_levels)
+def get_detail_mesh(form, name=None, cap_open_ends=False):
+	detail = form_kernel.get_detail_level(form.detail_level)
+	return get_mesh(form, detail["profile_samples"], detail["span_samples"], name, detail["feature_samples"], cap_open_ends)
+
+# Join the ring of samples vertices starting at lower to the one starting at upper with triangles
+def add_strip(triangles, lower, upper, samples):
+	for i in range(samples):
+		j = (i + 1) % samples
+		triangles.append((lower + i, lower + j, upper + j))
+		triangles.append((lower + i, upper + j, upper + i))
+
+# Add a fan of triangles from center to the ring of samples vertices starting at first_vertex, facing along the ring's
+# direction (up the form) if facing_up and against it otherwise
+def add_cap(vertices, triangles, center, first_vertex, samples, facing_up):
+	center_vertex = len(vertices)
+	vertices.append(center)
+	for i in range(samples):
+		j = (i + 1) % samples
+		if facing_up:
+			triangles.append((center_vertex, first_vertex + i, first_vertex + j))
+		else:
+			triangles.append((center_vertex, first_vertex + j, first_vertex + i))
+
+# Add a finishing feature (see form_kernel.get_finishing_features) as a closed shell, samples points around its circles
+def add_feature(vertices, triangles, feature, samples):
+	first_triangle = len(triangles)
+	if feature["type"] == "cylinder":
+		add_cylinder(vertices, triangles, feature["plane"], feature["height"], feature["radius"], samples)
+	elif feature["type"] == "torus":
+		plane = form_kernel.plane_from_normal(feature["origin"], feature["direction"])
+		add_torus(vertices, triangles, plane, feature["major_radius"], feature["minor_radius"], samples)
+	elif feature["type"] == "box":
+		add_box(vertices, triangles, feature["corners"])
+	orient_shell(vertices, triangles, first_triangle)
+
+# Add a capped cylinder standing on plane, along its z axis (like rs.AddCylinder)
+def add_cylinder(vertices, triangles, plane, height, radius, samples):
+	first_vertex = len(vertices)
+	for z in (0, height):
+		for i in range(samples):
+			angle = 2 * math.pi * i / samples
+			vertices.append(plane.point_to_world((radius * math.cos(angle), radius * math.sin(angle), z)))
+	add_strip(triangles, first_vertex, first_vertex + samples, samples)
+	add_cap(vertices, triangles, plane.point_to_world((0, 0, 0)), first_vertex, samples, False)
+	add_cap(vertices, triangles, plane.point_to_world((0, 0, height)), first_vertex + samples, samples, True)
+
+# Add a torus around the z axis of plane, with samples rings of samples points (like rs.AddTorus)
+def add_torus(vertices, triangles, plane, major_radius, minor_radius, samples):
+	first_vertex = len(vertices)
+	for i in range(samples):
+		u = 2 * math.pi * i / samples
+		for j in range(samples):
+			v = 2 * math.pi * j / samples
+			distance = major_radius + minor_radius * math.cos(v)
+			vertices.append(plane.point_to_world((distance * math.cos(u), distance * math.sin(u), minor_radius * math.sin(v))))
+	for i in range(samples):
+		add_strip(triangles, first_vertex + i * samples, first_vertex + ((i + 1) % samples) * samples, samples)
+
+# Add a box from its 8 corners, bottom face first (like rs.AddBox)
+def add_box(vertices, triangles, corners):
+	first_vertex = len(vertices)
+	vertices.extend(tuple(corner) for corner in corners)
+	for (a, b, c, d) in [(0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7)]:
+		triangles.append((first_vertex + a, first_vertex + b, first_vertex + c))
+		triangles.append((first_vertex + a, first_vertex + c, first_vertex + d))
+
+# Turn the closed shell of the triangles from first_triangle on inside out if it faces inwards (negative volume)
+def orient_shell(vertices, triangles, first_triangle):
+	if get_signed_volume(vertices, triangles[first_triangle:]) < 0:
+		triangles[first_triangle:] = [(i, k, j) for (i, j, k) in triangles[first_triangle:]]
+
+# Return the volume enclosed by the closed triangles, negative if they face inwards
+def get_signed_volume(vertices, triangles):
+	volume = 0.0
+	for (i, j, k) in triangles:
+		normal = form_kernel.cross_product(vertices[j], vertices[k])
+		volume += vertices[i][0] * normal[0] + vertices[i][1] * normal[1] + vertices[i][2] * normal[2]
+	return volume / 6.0
+
+# Return the number of edges of mesh that aren't shared by exactly two triangles running along them in opposite
+# directions: 0 for a closed, consistently oriented mesh
+def get_bad_edge_count(mesh):
+	edges = {}
+	for (i, j, k) in mesh.triangles:
+		for edge in ((i, j), (j, k), (k, i)):
+			edges[edge] = edges.get(edge, 0) + 1
+	return sum(1 for ((i, j), count) in edges.items() if count != 1 or edges.get((j, i)) != 1)
+
+# Raise ValueError if mesh can't be printed: it has open or badly shared edges, or encloses no volume
+def check_watertight(mesh):
+	bad_edges = get_bad_edge_count(mesh)
+	if bad_edges:
+		raise ValueError("Mesh '"+mesh.name+"' isn't watertight: "+str(bad_edges)+" edges are open or badly shared")
+	if get_signed_volume(mesh.vertices, mesh.triangles) <= 0:
+		raise ValueError("Mesh '"+mesh.name+"' encloses no volume")
+
+def write_obj(mesh, filename):
+	with open(filename, "w") as obj_file:
+		obj_file.write("# EmotiveModeler\n")
+		if mesh.color:
+			obj_file.write("# color %d %d %d\n" % tuple(mesh.color))
+		obj_file.write("o " + mesh.name + "\n")
+		for vertex in mesh.vertices:
+			obj_file.write("v %.6f %.6f %.6f\n" % tuple(vertex))
+		for triangle in mesh.triangles:
+			obj_file.write("f %d %d %d\n" % (triangle[0] + 1, triangle[1] + 1, triangle[2] + 1))
+
+# Binary STL: 80 byte header, triangle count, then normal, three vertices and an unused attribute per triangle
+def write_stl(mesh, filename):
+	facet = struct.Struct("<12fH")
+	with open(filename, "wb") as stl_file:
+		stl_file.write(struct.pack("<80sI", ("EmotiveModeler " + mesh.name)[:80].encode("ascii", "replace"), len(mesh.triangles)))
+		for (index, triangle) in enumerate(mesh.triangles):
+			(a, b, c) = [mesh.vertices[i] for i in triangle]
+			stl_file.write(facet.pack(*(mesh.get_normal(index) + tuple(a) + tuple(b) + tuple(c) + (0,))))
+
+# 3MF: a zip of the model XML (in millimeters, with the render color as its material) and the files that describe it
+def write_3mf(mesh, filename):
+	content_types = ('<?xml version="1.0" encoding="UTF-8"?>\n<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+		'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+		'<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/></Types>')
+	relationships = ('<?xml version="1.0" encoding="UTF-8"?>\n<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+		'<Relationship Target="/3D/3dmodel.model" Id="rel0" Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/></Relationships>')
+	model = ['<?xml version="1.0" encoding="UTF-8"?>\n<model unit="millimeter" xml:lang="en-US" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02"><resources>']
+	material = ""
+	if mesh.color:
+		model.append('<basematerials id="1"><base name="%s" displaycolor="#%02X%02X%02X"/></basematerials>' % ((escape_xml(mesh.name),) + tuple(int(channel) for channel in mesh.color)))
+		material = ' pid="1" pindex="0"'
+	model.append('<object id="2" name="%s" type="model"%s><mesh><vertices>' % (escape_xml(mesh.name), material))
+	model.extend('<vertex x="%.6f" y="%.6f" z="%.6f"/>' % tuple(vertex) for vertex in mesh.vertices)
+	model.append('</vertices><triangles>')
+	model.extend('<triangle v1="%d" v2="%d" v3="%d"/>' % tuple(triangle) for triangle in mesh.triangles)
+	model.append('</triangles></mesh></object></resources><build><item objectid="2"/></build></model>')
+	with zipfile.ZipFile(filename, "w", zipfile.ZIP_DEFLATED) as archive:
+		archive.writestr("[Content_Types].xml", content_types)
+		archive.writestr("_rels/.rels", relationships)
+		archive.writestr("3D/3dmodel.model", "".join(model))
+
+def escape_xml(text):
+	return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+
+def write_json(mesh, filename):
+	with open(filename, "w") as json_file:
+		json.dump({"name": mesh.name, "color": mesh.color, "vertices": mesh.vertices, "triangles": mesh.triangles}, json_file)
+
+# Return the Mesh in a file written by write_json
+def read_json(filename):
+	with open(filename) as json_file:
+		data = json.loads(json_file.read())
+	color = tuple(data["color"]) if data.get("color") else None
+	return Mesh(data["name"], [tuple(vertex) for vertex in data["vertices"]], [tuple(triangle) for triangle in data["triangles"]], color)
+
+# File writer for every format, by file extension
+WRITERS = {"obj": write_obj, "stl": write_stl, "3mf": write_3mf, "json": write_json}
+
+# Write mesh to filename in the format given by its extension (.obj, .stl, .3mf or .json)
+def write_mesh(mesh, filename):
+	extension = os.path.splitext(filename)[1].lstrip(".").lower()
+	if extension not in WRITERS:
+		raise ValueError("Can't write '"+filename+"': meshes can be written as " + ", ".join(sorted(WRITERS)))
+	WRITERS[extension](mesh, filename)
@@ -0,0 +1,129 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import sys
+import math
+import zlib
+import struct
+import form_kernel
+
+# Small software rasterizer for mesh_export meshes: orthographic view from any angle around the form, flat shaded
+# triangles with a depth buffer, written as PNG with zlib. Needs neither Rhino nor a render engine, so pictures of
+# designs can be made on any thread or process (design history thumbnails, turntable frames).
+
+BACKGROUND = (255, 255, 255)
+AMBIENT = 0.35						# share of the color that is lit regardless of the light direction
+DEFAULT_ELEVATION = 25				# degrees above the horizon the form is seen from
+DEFAULT_ANGLE = -60					# degrees around the vertical axis (about the direction of Rhino's Perspective view)
+
+# Return the (right, up, forward) unit vectors of a view looking at the form from angle degrees around the vertical
+# axis and elevation degrees above the horizon
+def get_view(angle=DEFAULT_ANGLE, elevation=DEFAULT_ELEVATION):
+	(a, e) = (math.radians(angle), math.radians(elevation))
+	forward = (-math.cos(e)*math.cos(a), -math.cos(e)*math.sin(a), -math.sin(e))
+	right = form_kernel.unitize(form_kernel.cross_product(forward, (0.0, 0.0, 1.0)))
+	up = form_kernel.cross_product(right, forward)
+	return (right, up, forward)
+
+# Return (center, radius) of a sphere around all the vertices. The picture is fitted to it rather than to the outline,
+# so the form stays the same size from every angle.
+def get_bounding_sphere(vertices):
+	low = [min(vertex[i] for vertex in vertices) for i in range(3)]
+	high = [max(vertex[i] for vertex in vertices) for i in range(3)]
+	center = tuple((low[i] + high[i]) / 2.0 for i in range(3))
+	radius = max(math.sqrt(sum((vertex[i] - center[i])**2 for i in range(3))) for vertex in vertices)
+	return (center, radius or 1.0)
+
+def dot(a, b):
+	return a[0]*b[0] + a[1]*b[1] + a[2]*b[2]
+
+# Return the picture of mesh as a list of height rows of width (r, g, b) tuples
+# angle, elevation: view direction in degrees (see get_view); margin: empty share of the picture around the form
+# sphere: (center, radius) to fit the picture to instead of the mesh's own bounding sphere, so a sequence of pictures of
+# different meshes keeps one scale
+def render_mesh(mesh, width, height, angle=DEFAULT_ANGLE, elevation=DEFAULT_ELEVATION, background=BACKGROUND, margin=0.08, sphere=None):
+	pixels = [[background] * width for row in range(height)]
+	if not mesh.triangles:
+		return pixels
+	(right, up, forward) = get_view(angle, elevation)
+	(center, radius) = sphere or get_bounding_sphere(mesh.vertices)
+	scale = (1 - margin) * min(width, height) / (2.0 * radius)
+	# screen position and depth of every vertex (y grows downwards)
+	screen = []
+	for vertex in mesh.vertices:
+		offset = form_kernel.subtract(vertex, center)
+		screen.append((width / 2.0 + dot(offset, right) * scale, height / 2.0 - dot(offset, up) * scale, dot(offset, forward)))
+	# light from behind the viewer's left shoulder
+	light = form_kernel.unitize(form_kernel.add(form_kernel.scale(forward, -1), form_kernel.add(form_kernel.scale(right, -0.5), up)))
+	color = mesh.color or (180, 180, 180)
+	depth = [[float("inf")] * width for row in range(height)]
+	for (index, triangle) in enumerate(mesh.triangles):
+		# both sides are lit, so open forms (the Chair) look right from inside too
+		brightness = AMBIENT + (1 - AMBIENT) * abs(dot(mesh.get_normal(index), light))
+		shade = tuple(int(channel * brightness) for channel in color)
+		draw_triangle(pixels, depth, [screen[i] for i in triangle], shade)
+	return pixels
+
+# Fill triangle (three (x, y, depth) screen points) with color where it is nearer than what is already drawn
+def draw_triangle(pixels, depth, triangle, color):
+	((x0, y0, z0), (x1, y1, z1), (x2, y2, z2)) = triangle
+	area = (x1 - x0) * (y2 - y0) - (x2 - x0) * (y1 - y0)
+	if area == 0:
+		return
+	height = len(pixels)
+	width = len(pixels[0])
+	# pixel centers inside the triangle's bounding box
+	left = max(int(math.floor(min(x0, x1, x2))), 0)
+	right = min(int(math.ceil(max(x0, x1, x2))), width - 1)
+	top = max(int(math.floor(min(y0, y1, y2))), 0)
+	bottom = min(int(math.ceil(max(y0, y1, y2))), height - 1)
+	for y in range(top, bottom + 1):
+		py = y + 0.5
+		pixel_row = pixels[y]
+		depth_row = depth[y]
+		for x in range(left, right + 1):
+			px = x + 0.5
+			# barycentric weights of the pixel center
+			w0 = ((x1 - px) * (y2 - py) - (x2 - px) * (y1 - py)) / area
+			w1 = ((x2 - px) * (y0 - py) - (x0 - px) * (y2 - py)) / area
+			w2 = 1 - w0 - w1
+			if w0 < 0 or w1 < 0 or w2 < 0:
+				continue
+			z = w0 * z0 + w1 * z1 + w2 * z2
+			if z < depth_row[x]:
+				depth_row[x] = z
+				pixel_row[x] = color
+
+# Return the bytes of a PNG file of pixels (rows of (r, g, b) tuples)
+def get_png(pixels):
+	height = len(pixels)
+	width = len(pixels[0]) if height else 0
+	raw = bytearray()
+	for row in pixels:
+		raw.append(0)				# no filter
+		for pixel in row:
+			raw.extend(pixel)
+	def chunk(kind, data):
+		return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+	header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)		# 8 bit RGB
+	return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(bytes(raw), 6)) + chunk(b"IEND", b"")
+
+def write_png(pixels, filename):
+	with open(filename, "wb") as png_file:
+		png_file.write(get_png(pixels))
+
+# Write a picture of an object type and word, e.g. "python mesh_rasterizer.py Bottle joyful joyful.png"
+if __name__ == "__main__":
+	import emotion_class
+	import emotion_index
+	import emotion_registry
+	import mesh_export
+	object_id = sys.argv[1] if len(sys.argv) > 1 else "Bottle"
+	word = sys.argv[2] if len(sys.argv) > 2 else "neutral"
+	filename = sys.argv[3] if len(sys.argv) > 3 else object_id + "_" + word + ".png"
+	emotion = emotion_class.Emotion(word, {}, emotion_index.load_system_emotion_dictionary(), emotion_registry.get_primary_emotion_taxonomy(), emotion_registry.get_primary_scaling_factors())
+	mesh = mesh_export.get_mesh(form_kernel.build_form(object_id, emotion.get_properties()))
+	write_png(render_mesh(mesh, 400, 300), filename)
+	print("Wrote " + filename)
@@ -3,243 +3,276 @@
 # Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
 # Copyright 2016 Massachusetts Institute of Technology
 
-import math
 import json
-import rhinoscriptsyntax as rs
-
-# # Return the primary emotion breakdown dictionary for a secondary emotion
-# def get_emotion_breakdown(emotion_dict, user_emotion_dict, emotion):
-# 	emotion_breakdown = {}
-# 	if emotion in user_emotion_dict:
-# 		emotion_breakdown = user_emotion_dict[emotion]
-# 	elif emotion in emotion_dict:
-# 		emotion_breakdown = emotion_dict[emotion]
-# 	else:		# multiple adjectives
-# 		emotions = emotion.split(".")
-# 		for e in emotions:
-# 			e_breakdown = get_emotion_breakdown(emotion_dict, user_emotion_dict, e)
-# 			for value in e_breakdown:
-# 				if value in emotion_breakdown:		# add emotions together
-# 					emotion_breakdown[value] = emotion_breakdown[value] + e_breakdown[value]
-# 				else:								# add new emotion
-# 					emotion_breakdown[value] = e_breakdown[value]
-# 	return emotion_breakdown
-
-# # Return a list of primary emotions present in a secondary emotion
-# def get_emotions_present(emotion_dict, user_emotion_dict, emotion):
-# 	emotion_breakdown = get_emotion_breakdown(emotion_dict, user_emotion_dict, emotion)
-# 	primary_emotions_present = []
-# 	for primary_emotion in emotion_breakdown:
-# 		if emotion_breakdown[primary_emotion] != 0:
-# 			primary_emotions_present.append(primary_emotion)
-# 	return primary_emotions_present
-
-# # Return the sum of each scaling factor for all the primary emotions present in a secondary emotion
-# def get_sum_scaling_factors(emotion_taxonomy_data, scaling_factors_data, primary_emotions_present, user_emotion_dict, emotion):
-# 	sums = {}
-# 	for weight in scaling_factors_data["neutral"]:
-# 		sums[weight] = 0
-# 	for primary_emotion in primary_emotions_present:
-# 		for weight in sums:
-# 			# In the original word_emotion_dictionary, emotions either are present or aren't (0 or 1)
-# 			multiplier = 1
-# 			if emotion in user_emotion_dict:
-# 				multiplier = user_emotion_dict[emotion][primary_emotion]
-# 			sums[weight] += scaling_factors_data[primary_emotion][weight] * multiplier
-# 	return sums
-
-# # Return the spine equation for a secondary emotion
-# def get_spine_equation(emotion_taxonomy_data, scaling_factors_data, primary_emotions_present, sum_spine_weighting, user_emotion_dict, emotion):
-# 	spine_equation = {}
-# 	if len(primary_emotions_present) == 0:			# set to neutral values
-# 		spine_equation = emotion_taxonomy_data["neutral"]["spine_equation"]
-# 	else:
-# 		primary_emotion_scaling_factors_data = {}
-# 		for primary_emotion in primary_emotions_present:
-# 			primary_emotion_data = emotion_taxonomy_data[primary_emotion]
-# 			emotion_spine_equation = primary_emotion_data["spine_equation"]
-# 			primary_emotion_scaling_factors_data[primary_emotion] = scaling_factors_data[primary_emotion]
-# 			emotion_spine_equation_weighting = primary_emotion_scaling_factors_data[primary_emotion]["spine_weighting"]
-# 			for term in emotion_spine_equation:			# a_term, b_term, h_term, k_term
-# 				if term not in spine_equation:
-# 					spine_equation[term] = 0
-# 				multiplier = 1
-# 				if emotion in user_emotion_dict:
-# 					multiplier = user_emotion_dict[emotion][primary_emotion]
-# 				spine_equation[term] += (emotion_spine_equation[term] * emotion_spine_equation_weighting * multiplier)/sum_spine_weighting
-# 	return spine_equation
-
-# # Return the value for a weighted combination of primary emotions for a secondary emotion property in the form of a number (int or float)
-# ## used for global_vertical_AR, global_horizontal_AR, vertical_wrapping
-# def get_value_number_property(property_name, emotion_taxonomy_data, scaling_factors_data, primary_emotions_present, sum_weighting, user_emotion_dict, emotion):
-# 	number_property = 0
-# 	if len(primary_emotions_present) == 0:			# set to neutral values
-# 		number_property = emotion_taxonomy_data["neutral"][property_name]
-# 	else:
-# 		primary_emotion_scaling_factors_data = {}
-# 		for primary_emotion in primary_emotions_present:
-# 			primary_emotion_data = emotion_taxonomy_data[primary_emotion]
-# 			primary_emotion_scaling_factors_data[primary_emotion] = scaling_factors_data[primary_emotion]
-# 			emotion_number_property = primary_emotion_data[property_name]
-# 			emotion_number_property_weighting = primary_emotion_scaling_factors_data[primary_emotion][property_name+"_weighting"]
-# 			multiplier = 1
-# 			if emotion in user_emotion_dict:
-# 				multiplier = user_emotion_dict[emotion][primary_emotion]
-# 			number_property += (emotion_number_property * emotion_number_property_weighting * multiplier)/sum_weighting
-# 	return number_property
-
-# # Return the vertical_AR dict for a weighted combination of primary emotions
-# def get_vertical_AR(emotion_taxonomy_data, scaling_factors_data, primary_emotions_present, user_emotion_dict, emotion):
-# 	vertical_AR = {}
-# 	if len(primary_emotions_present) == 0:			# set to neutral values
-# 		vertical_AR = emotion_taxonomy_data["neutral"]["vertical_AR"]
-# 	else:
-# 		levels = {}
-# 		levels_present = {}
-# 		sums = {}
-# 		primary_emotion_scaling_factors_data = {}
-# 		emotion_vertical_AR = {}
-# 		# record which vertical_AR levels (1, 2, 3, etc) are present in the union of the vertical_AR dicts of primary_emotions_present
-# 		# also keep a cumulative sum for doing a weighted sum later
-# 		for primary_emotion in primary_emotions_present:
-# 			primary_emotion_data = emotion_taxonomy_data[primary_emotion]
-# 			primary_emotion_scaling_factors_data[primary_emotion] = (scaling_factors_data[primary_emotion])
-# 			emotion_vertical_AR[primary_emotion] = primary_emotion_data["vertical_AR"]
-# 			for level in emotion_vertical_AR[primary_emotion]:				# 1, 2, 3, etc.
-# 				if level not in levels:
-# 					levels[level] = []
-# 					sums[level] = 0
-# 					levels_present[level] = 0
-# 				levels[level].append(primary_emotion)
-# 				multiplier = 1
-# 				if emotion in user_emotion_dict:
-# 					multiplier = user_emotion_dict[emotion][primary_emotion]
-# 				sums[level] += primary_emotion_scaling_factors_data[primary_emotion]["vertical_AR_weighting"] * multiplier
-# 				# check to see how many emotions present at each level
-# 				if emotion_vertical_AR[primary_emotion][level] == None:
-# 					level_present = 0
-# 				if emotion_vertical_AR[primary_emotion][level] != None:
-# 					level_present = 1
-# 				levels_present[level] += level_present
-# 		# get the weighted sum per level
-# 		for level in levels:
-# 			vertical_AR[level] = 0
-# 			for primary_emotion in levels[level]:
-# 				primary_emotion_data = emotion_taxonomy_data[primary_emotion]
-# 				if primary_emotion_data["vertical_AR"][level] != None:
-# 					multiplier = 1
-# 					if emotion in user_emotion_dict:
-# 						multiplier = user_emotion_dict[emotion][primary_emotion]
-# 					# scaling factors for diff nos. of emotions present at every level
-# 					# if combo of emotions, i.e. levels_present>1, need weighted scaling factors,
-# 					# if only one emotion present, i.e. levels_present<=1, scaling factor weighting needs to be 1 in total (i.e. sum of weightings/sum of weightings)
-# 					if levels_present[level] > 1:
-# 					 	scaling_factor = primary_emotion_scaling_factors_data[primary_emotion]["vertical_AR_weighting"]
-# 					else:
-# 					 	scaling_factor = sums[level]
-# 				 	# scaling_factor = primary_emotion_scaling_factors_data[primary_emotion]["vertical_AR_weighting"]
-# 					vertical_AR[level] += (primary_emotion_data["vertical_AR"][level] * scaling_factor * multiplier)/sums[level]
-# 					# set to null if it is 0 (all numbers are positive so there cannot be a valid 0)
-# 			if vertical_AR[level] == 0:
-# 				vertical_AR[level] = None
-# 	return vertical_AR
-
-# # Return the horizontal_AR dict for a weighted combination of primary emotions
-# def get_horizontal_AR(emotion_taxonomy_data, scaling_factors_data, primary_emotions_present, user_emotion_dict, emotion):
-# 	horizontal_AR = {}
-# 	if len(primary_emotions_present) == 0:			# set to neutral values
-# 		horizontal_AR = emotion_taxonomy_data["neutral"]["horizontal_AR"]
-# 	else:
-# 		levels = {}
-# 		levels_present = {}
-# 		sums = {}
-# 		primary_emotion_scaling_factors_data = {}
-# 		emotion_horizontal_AR = {}
-# 		# record which horizontal_AR levels (1, 2, 3, etc) are present in the union of the horizontal_AR dicts of primary_emotions_present
-# 		# also keep a dict of cumulative sums for doing weighted sums later
-# 		for primary_emotion in primary_emotions_present:
-# 			primary_emotion_data = emotion_taxonomy_data[primary_emotion]
-# 			primary_emotion_scaling_factors_data[primary_emotion] = scaling_factors_data[primary_emotion]
-# 			emotion_horizontal_AR[primary_emotion] = primary_emotion_data["horizontal_AR"]
-# 			for level in emotion_horizontal_AR[primary_emotion]:				# 1, 2, 3, etc.
-# 				if level not in levels:
-# 					levels[level] = []
-# 					sums[level] = {}
-# 					for term in emotion_horizontal_AR[primary_emotion][level]:		# level_horizontal_AR_x, level_horizontal_AR_y, points_in_curve, horizontal_smoothness
-# 						sums[level][term+"_weighting"] = 0
-# 				levels[level].append(primary_emotion)
-# 				for term in sums[level]:
-# 					multiplier = 1
-# 					if emotion in user_emotion_dict:
-# 						multiplier = user_emotion_dict[emotion][primary_emotion]
-# 					sums[level][term] += primary_emotion_scaling_factors_data[primary_emotion][term] * multiplier
-# 		for level in levels:
-# 			horizontal_AR[level] = {"level_horizontal_AR_x":0,"level_horizontal_AR_y":0,"points_in_curve":0,"horizontal_smoothness":0}
-# 			for primary_emotion in levels[level]:
-# 				primary_emotion_data = emotion_taxonomy_data[primary_emotion]
-# 				for term in horizontal_AR[level]:
-# 					multiplier = 1
-# 					if emotion in user_emotion_dict:
-# 						multiplier = user_emotion_dict[emotion][primary_emotion]
-# 					# scaling factors for diff nos. of emotions present at every level
-# 					# if combo of emotions, i.e. length of levels array at each level >1, need weighted scaling factors,
-# 					# if only one emotion present, i.e. length of levels array at each level <=1, scaling factor weighting needs to be 1 in total (i.e. sum of weightings/sum of weightings)
-# 					if len(levels[level]) > 1:
-# 					 	scaling_factor = primary_emotion_scaling_factors_data[primary_emotion][term+"_weighting"]
-# 					else:
-# 					 	scaling_factor = sums[level][term+"_weighting"]
-# 				 	scaling_factor = primary_emotion_scaling_factors_data[primary_emotion][term+"_weighting"]
-# 					horizontal_AR[level][term] += (primary_emotion_data["horizontal_AR"][level][term] * scaling_factor * multiplier)/sums[level][term+"_weighting"]
-# 			horizontal_AR[level]["points_in_curve"] = int(round(horizontal_AR[level]["points_in_curve"]))
-# 			horizontal_AR[level]["horizontal_smoothness"] = int(round(horizontal_AR[level]["horizontal_smoothness"]))
-# 	return horizontal_AR
-
-# # Return a dictionary of properties for a secondary emotion
-# def get_properties_for_emotion(emotion_taxonomy_data, scaling_factors_data, emotion_dict, user_emotion_dict, emotion):
-# 	emotion_properties = {}
-
-# 	primary_emotions_present = get_emotions_present(emotion_dict, user_emotion_dict, emotion)
-# 	sum_scaling_factors = get_sum_scaling_factors(emotion_taxonomy_data, scaling_factors_data, primary_emotions_present, user_emotion_dict, emotion)		# sums are never 0
-
-# 	# get individual values
-# 	spine_equation = get_spine_equation(emotion_taxonomy_data, scaling_factors_data, primary_emotions_present, sum_scaling_factors["spine_weighting"], user_emotion_dict, emotion)
-# 	global_vertical_AR = get_value_number_property("global_vertical_AR", emotion_taxonomy_data, scaling_factors_data, primary_emotions_present, sum_scaling_factors["global_vertical_AR_weighting"], user_emotion_dict, emotion)
-# 	global_horizontal_AR = get_value_number_property("global_horizontal_AR", emotion_taxonomy_data, scaling_factors_data, primary_emotions_present, sum_scaling_factors["global_horizontal_AR_weighting"], user_emotion_dict, emotion)
-# 	vertical_wrapping = get_value_number_property("vertical_wrapping", emotion_taxonomy_data, scaling_factors_data, primary_emotions_present, sum_scaling_factors["vertical_wrapping_weighting"], user_emotion_dict, emotion)
-# 	vertical_AR = get_vertical_AR(emotion_taxonomy_data, scaling_factors_data, primary_emotions_present, user_emotion_dict, emotion)
-# 	horizontal_AR = get_horizontal_AR(emotion_taxonomy_data, scaling_factors_data, primary_emotions_present, user_emotion_dict, emotion)
-
-# 	# insert into dictionary
-# 	emotion_properties["spine_equation"] = spine_equation
-# 	emotion_properties["global_vertical_AR"] = global_vertical_AR
-# 	emotion_properties["global_horizontal_AR"] = global_horizontal_AR
-# 	emotion_properties["vertical_AR"] = vertical_AR
-# 	emotion_properties["horizontal_AR"] = horizontal_AR
-# 	emotion_properties["vertical_wrapping"] = vertical_wrapping
-
-# 	rs.MessageBox(emotion_properties)
-
-# 	return emotion_properties
+import math
+import struct
+import config
+import emotion_index
+import emotion_registry
+import file_utils
 
-# Return a dictionary of properties for all secondary emotions in dictionary emotion_dict
-def get_all_secondary_emotion_properties(emotion_dict):
-	emotion_taxonomy_file = open('emotion_taxonomy.json').read()
-	emotion_taxonomy_data = json.loads(emotion_taxonomy_file)
-	scaling_factors_file = open('emotion_taxonomy_scaling_factors.json').read()
-	scaling_factors_data = json.loads(scaling_factors_file)
+# Precomputes the emotive properties of every word in the system dictionary, so looking up a dictionary word at design time
+# needs no blending math. Words are grouped by the primary emotions they contain (a dictionary word's properties only depend
+# on which emotions are present), the properties of every group are blended in one pass with the NumPy engine in
+# emotion_engine (using the same weights as emotion_class.Emotion), and the result is written as a compact columnar file.
+# Reading the file needs no NumPy, so Emotion.get_properties can use it inside Rhino. Words whose properties are a taxonomy
+# entry (primary emotions, and words without any emotion, which are neutral) refer to the taxonomy instead. The file is usually built with CPython
+# and read by IronPython, so it keeps what differs between the two: rounded terms are stored unrounded and rounded by the
+# reader, and colors are stored both as blended with true division and as blended with Python 2 integer division.
+#
+# Properties file layout (little endian):
+#	header			magic, word count, pattern count, column count, description length
+#	description		JSON: {"columns": [property, level, term] for every column, "taxonomy_patterns": {pattern id: emotion},
+#					"pattern_emotions": the primary emotions present in the words of every pattern}
+#	word table		sorted words (see emotion_index.WordTable)
+#	pattern ids		word count x uint16: which row of properties each word uses
+#	properties		column count x pattern count float64, one column after the other
+#
+# Run "python secondary_emotion_property_constructor.py" to rebuild it (needs NumPy).
+
+PROPERTIES_MAGIC = b"EMPROP01"
+INTEGER_DIVISION = (1/2 == 0)
+HEADER = struct.Struct("<8sIIII")
+PATTERN_ID = struct.Struct("<H")
+VALUE = struct.Struct("<d")
+ROUNDED_HORIZONTAL_TERMS = ("points_in_curve", "horizontal_smoothness")
+NO_LEVEL = -1.0				# vertical_AR levels no emotion has (all real values are positive)
+
+# Return value rounded to an int with halves away from zero, the way Python 2 (IronPython in Rhino) rounds, whichever Python
+# runs this. Summation noise is snapped away first, so a blend that is exactly n.5 rounds the same way in every code path.
+# Used for the rounded horizontal_AR terms by both emotion_class and the precomputed properties.
+def round_half_away_from_zero(value):
+	value = round(value, 9)
+	return int(math.floor(value + 0.5)) if value >= 0 else -int(math.floor(-value + 0.5))
+
+# Precomputed properties for every word of the system dictionary, read from a file written by write_results_to_file
+class SecondaryEmotionProperties():
+
+	def __init__(self, properties_filename):
+		with open(properties_filename, "rb") as properties_file:
+			self.data = properties_file.read()
+		(magic, word_count, self.pattern_count, column_count, description_length) = HEADER.unpack(self.data[:HEADER.size])
+		if magic != PROPERTIES_MAGIC:
+			raise ValueError("'"+properties_filename+"' is not an emotion properties file")
+		position = HEADER.size
+		description = json.loads(self.data[position:position+description_length].decode("utf-8"))
+		self.columns = description["columns"]
+		self.taxonomy_patterns = dict((int(pattern_id), emotion) for (pattern_id, emotion) in description["taxonomy_patterns"].items())
+		self.pattern_emotions = description["pattern_emotions"]
+		self.words = emotion_index.WordTable(self.data, position + description_length, word_count)
+		self.pattern_ids_start = self.words.end
+		self.values_start = self.pattern_ids_start + word_count * PATTERN_ID.size
+		self.patterns = {}
+
+	def __len__(self):
+		return len(self.words)
+
+	def __contains__(self, word):
+		return self.words.find(word) >= 0
+
+	# Return the properties dict for word (the same dict as Emotion.get_properties), or None if word isn't in the file.
+	# emotions_present: if given, the primary emotions the caller's breakdown of word contains; None is returned if they
+	# aren't the ones the properties were computed from.
+	def get_properties(self, word, emotions_present=None):
+		index = self.words.find(word)
+		if index < 0:
+			return None
+		position = self.pattern_ids_start + index * PATTERN_ID.size
+		pattern_id = PATTERN_ID.unpack(self.data[position:position+PATTERN_ID.size])[0]
+		if emotions_present is not None and sorted(emotions_present) != self.pattern_emotions[pattern_id]:
+			return None
+		if pattern_id in self.taxonomy_patterns:
+			return emotion_registry.thaw(emotion_registry.get_primary_emotion_taxonomy()[self.taxonomy_patterns[pattern_id]])
+		if pattern_id not in self.patterns:
+			values = []
+			for column in range(len(self.columns)):
+				position = self.values_start + (column * self.pattern_count + pattern_id) * VALUE.size
+				values.append(VALUE.unpack(self.data[position:position+VALUE.size])[0])
+			self.patterns[pattern_id] = values
+		return unpack_properties(self.columns, self.patterns[pattern_id])
+
+# Return the [property, level, term] columns needed to store the properties of every emotion in the taxonomy
+def get_columns(primary_emotion_taxonomy):
+	vertical_levels = sorted(set(level for emotion in primary_emotion_taxonomy.values() for level in emotion["vertical_AR"]), key=int)
+	horizontal_levels = sorted(set(level for emotion in primary_emotion_taxonomy.values() for level in emotion["horizontal_AR"]), key=int)
+	horizontal_terms = sorted(set(term for emotion in primary_emotion_taxonomy.values() for level in emotion["horizontal_AR"].values() for term in level))
+	columns = [["spine_equation", None, term] for term in sorted(primary_emotion_taxonomy["neutral"]["spine_equation"])]
+	columns += [[name, None, None] for name in ("global_vertical_AR", "global_horizontal_AR", "vertical_wrapping", "spikiness")]
+	columns += [["color", None, term] for term in ("r", "g", "b")]
+	columns += [["integer_color", None, term] for term in ("r", "g", "b")]
+	columns += [["vertical_AR", level, None] for level in vertical_levels]
+	columns += [["horizontal_AR", level, term] for level in horizontal_levels for term in horizontal_terms]
+	columns += [["color_is_int", None, None]]
+	return columns
 
-	secondary_emotion_properties = {}
-	for emotion in emotion_dict:
-		secondary_emotion_properties[emotion] = get_properties_for_emotion(emotion_taxonomy_data, scaling_factors_data, emotion_dict, emotion)
-	return secondary_emotion_properties
+# Return the column values for a properties dict (None is stored as NaN; levels that are missing as NaN or NO_LEVEL).
+# emotion_properties: unrounded properties blended with true division; integer_properties: blended with integer division
+def pack_properties(columns, emotion_properties, integer_properties):
+	values = []
+	for (name, level, term) in columns:
+		if name == "color_is_int":
+			value = all(isinstance(integer_properties["color"][color_term], int) for color_term in integer_properties["color"])
+		elif name == "integer_color":
+			value = integer_properties["color"][term]
+		elif name == "vertical_AR":
+			value = emotion_properties["vertical_AR"].get(level, NO_LEVEL)
+		elif name == "horizontal_AR":
+			value = emotion_properties["horizontal_AR"].get(level, {}).get(term)
+		elif term:
+			value = emotion_properties[name][term]
+		else:
+			value = emotion_properties[name]
+		values.append(float("nan") if value is None else float(value))
+	return values
+
+# Return the properties dict stored in column values, rounded and divided the way the running interpreter's
+# Emotion.get_properties would (the inverse of pack_properties)
+def unpack_properties(columns, values):
+	emotion_properties = {"spine_equation": {}, "color": {}, "vertical_AR": {}, "horizontal_AR": {}}
+	integer_color = {}
+	color_is_int = False
+	for ((name, level, term), value) in zip(columns, values):
+		if name == "color_is_int":
+			color_is_int = value == 1
+		elif name == "integer_color":
+			integer_color[term] = int(value)
+		elif name == "vertical_AR":
+			if value != NO_LEVEL:
+				emotion_properties["vertical_AR"][level] = None if value != value else value
+		elif name == "horizontal_AR":
+			if value == value:			# NaN: the level isn't there
+				if level not in emotion_properties["horizontal_AR"]:
+					emotion_properties["horizontal_AR"][level] = {}
+				emotion_properties["horizontal_AR"][level][term] = round_half_away_from_zero(value) if term in ROUNDED_HORIZONTAL_TERMS else value
+		elif term:
+			emotion_properties[name][term] = value
+		else:
+			emotion_properties[name] = value
+	if INTEGER_DIVISION and color_is_int:
+		emotion_properties["color"] = integer_color
+	return emotion_properties
+
+# Return (words, pattern id for each word, patterns, primary emotions present in each pattern) for every word in emotion_dict. A dictionary word's properties only
+# depend on the emotions it contains, so words are grouped by them: a pattern is the name of the taxonomy entry the words
+# use (primary emotions, and "neutral" for words without emotions, like Emotion does) or the blend weights Emotion gives them.
+def get_patterns(emotion_dict, primary_emotion_taxonomy, primary_scaling_factors):
+	import emotion_class
+	words = sorted(emotion_dict)
+	pattern_keys = {}
+	pattern_ids = []
+	patterns = []
+	pattern_emotions = []
+	for word in words:
+		breakdown = emotion_dict[word]
+		emotions_present = sorted(primary_emotion for primary_emotion in breakdown if breakdown[primary_emotion] != 0)
+		key = word if word in config.primary_emotions else tuple(emotions_present)
+		if key not in pattern_keys:
+			pattern_keys[key] = len(patterns)
+			pattern_emotions.append(emotions_present)
+			if word in config.primary_emotions:
+				patterns.append(word)
+			elif not key:
+				patterns.append("neutral")
+			else:
+				# not in the user dictionary, so every emotion present counts once
+				emotion = emotion_class.Emotion(word, {}, emotion_dict, primary_emotion_taxonomy, primary_scaling_factors)
+				patterns.append(emotion.get_blend_weights())
+		pattern_ids.append(pattern_keys[key])
+	return (words, pattern_ids, patterns, pattern_emotions)
+
+# Return the properties dict of every pattern from get_patterns, blending them all in one pass of engine
+def get_pattern_properties(patterns, engine, rounded=True):
+	blended = [(pattern_id, pattern) for (pattern_id, pattern) in enumerate(patterns) if isinstance(pattern, dict)]
+	pattern_properties = [None if isinstance(pattern, dict) else emotion_registry.thaw(engine.primary_emotion_taxonomy[pattern]) for pattern in patterns]
+	if blended:
+		batch = engine.get_properties_batch(*engine.pack([blend_weights for (pattern_id, blend_weights) in blended]))
+		for (row, (pattern_id, blend_weights)) in enumerate(blended):
+			pattern_properties[pattern_id] = engine.unpack(batch, row, rounded)
+	return pattern_properties
+
+# Return a dictionary of properties for all secondary emotions in dictionary emotion_dict
+def get_all_secondary_emotion_properties(emotion_dict, primary_emotion_taxonomy, primary_scaling_factors):
+	import emotion_engine
+	(words, pattern_ids, patterns, pattern_emotions) = get_patterns(emotion_dict, primary_emotion_taxonomy, primary_scaling_factors)
+	pattern_properties = get_pattern_properties(patterns, emotion_engine.get_engine(primary_emotion_taxonomy, primary_scaling_factors))
+	return dict((word, pattern_properties[pattern_id]) for (word, pattern_id) in zip(words, pattern_ids))
 
 # Write the properties of all the secondary emotions in file named word_dictionary_name to file named outfile_name
-def write_results_to_file(word_dictionary_name, outfile_name):
-	emotion_dict_file = open(word_dictionary_name).read()
-	emotion_dict_data = json.loads(emotion_dict_file)
-	secondary_emotion_properties = get_all_secondary_emotion_properties(emotion_dict_data)
-	with open(outfile_name, 'w') as outfile:
-		json.dump(secondary_emotion_properties, outfile)
-
-# # Iterate through word_emotion_dictionary.json and write results to secondary_emotion_properties.json
-# write_results_to_file('working dictionary json/word_emotion_dictionary_full.json', 'working dictionary json/secondary_emotion_properties.json')
\ No newline at end of file
+def write_results_to_file(word_dictionary_name=config.system_emotion_dictionary_filename, outfile_name=config.secondary_emotion_properties_filename):
+	import emotion_engine
+	with open(word_dictionary_name) as emotion_dict_file:
+		emotion_dict = json.loads(emotion_dict_file.read())
+	primary_emotion_taxonomy = emotion_registry.get_primary_emotion_taxonomy()
+	primary_scaling_factors = emotion_registry.get_primary_scaling_factors()
+	(words, pattern_ids, patterns, pattern_emotions) = get_patterns(emotion_dict, primary_emotion_taxonomy, primary_scaling_factors)
+	if len(patterns) > 65535:
+		raise ValueError("Too many distinct properties for the properties file")
+	engine = emotion_engine.VectorizedEmotionEngine(primary_emotion_taxonomy, primary_scaling_factors, integer_division=False)
+	integer_engine = emotion_engine.VectorizedEmotionEngine(primary_emotion_taxonomy, primary_scaling_factors, integer_division=True)
+	pattern_properties = get_pattern_properties(patterns, engine, rounded=False)
+	integer_pattern_properties = get_pattern_properties(patterns, integer_engine)
+
+	columns = get_columns(primary_emotion_taxonomy)
+	taxonomy_patterns = dict((str(pattern_id), pattern) for (pattern_id, pattern) in enumerate(patterns) if not isinstance(pattern, dict))
+	description = json.dumps({"columns": columns, "taxonomy_patterns": taxonomy_patterns, "pattern_emotions": pattern_emotions}).encode("utf-8")
+	rows = [pack_properties(columns, emotion_properties, integer_properties) for (emotion_properties, integer_properties) in zip(pattern_properties, integer_pattern_properties)]
+	temp_filename = outfile_name + ".tmp"
+	with open(temp_filename, "wb") as outfile:
+		outfile.write(HEADER.pack(PROPERTIES_MAGIC, len(words), len(rows), len(columns), len(description)))
+		outfile.write(description)
+		outfile.write(emotion_index.pack_word_table([word.encode("utf-8") for word in words]))
+		outfile.write(b"".join(PATTERN_ID.pack(pattern_id) for pattern_id in pattern_ids))
+		for column in range(len(columns)):
+			outfile.write(b"".join(VALUE.pack(row[column]) for row in rows))
+	file_utils.replace_file(temp_filename, outfile_name)
+	return (len(words), len(rows))
+
+# Return True if the properties file is missing or older than any of the files it was computed from
+def is_stale(properties_filename=config.secondary_emotion_properties_filename):
+	sources = [config.system_emotion_dictionary_filename, config.primary_emotion_taxonomy_filename, config.primary_scaling_factors_filename]
+	return any(file_utils.is_stale(source, properties_filename) for source in sources)
+
+loaded_properties = None
+
+# Return the precomputed properties, or None if they haven't been built or are out of date
+def get_precomputed_properties(properties_filename=config.secondary_emotion_properties_filename):
+	global loaded_properties
+	if is_stale(properties_filename):
+		loaded_properties = None
+	elif loaded_properties is None:
+		try:
+			loaded_properties = SecondaryEmotionProperties(properties_filename)
+		except (IOError, OSError, ValueError):
+			return None
+	return loaded_properties
+
+# Return (number of words checked, list of (word, difference)) for the words of system_emotion_dict whose precomputed
+# properties differ from what the dictionary code in emotion_class computes on the running interpreter (needs NumPy).
+# The primary emotions are left out: Emotion takes theirs from the taxonomy.
+def compare_with_dictionary_code(system_emotion_dict, properties_filename=config.secondary_emotion_properties_filename):
+	import emotion_class
+	import emotion_engine
+	properties = SecondaryEmotionProperties(properties_filename)
+	# copies of the registry's taxonomy, so Emotion blends the properties itself instead of reading the precomputed ones
+	primary_emotion_taxonomy = emotion_registry.thaw(emotion_registry.get_primary_emotion_taxonomy())
+	primary_scaling_factors = emotion_registry.thaw(emotion_registry.get_primary_scaling_factors())
+	use_vectorized_emotion_engine = config.use_vectorized_emotion_engine
+	config.use_vectorized_emotion_engine = False
+	mismatches = []
+	try:
+		for word in system_emotion_dict:
+			if word in config.primary_emotions:
+				continue
+			emotion = emotion_class.Emotion(word, {}, system_emotion_dict, primary_emotion_taxonomy, primary_scaling_factors)
+			precomputed = properties.get_properties(word, emotion.primary_emotions_present)
+			difference = "no precomputed properties" if precomputed is None else emotion_engine.properties_difference(emotion.get_properties(), precomputed)
+			if difference:
+				mismatches.append((word, difference))
+	finally:
+		config.use_vectorized_emotion_engine = use_vectorized_emotion_engine
+	return (len([word for word in system_emotion_dict if word not in config.primary_emotions]), mismatches)
+
+# Iterate through the system dictionary and write results to the properties file
+if __name__ == "__main__":
+	(word_count, pattern_count) = write_results_to_file()
+	print("Wrote properties of " + str(word_count) + " words (" + str(pattern_count) + " distinct) to " + config.secondary_emotion_properties_filename)
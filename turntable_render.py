@@ -0,0 +1,127 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import os
+import sys
+import argparse
+import background_process
+import config
+import file_utils
+import form_kernel
+import mesh_export
+import mesh_rasterizer
+
+try:
+	import multiprocessing
+except ImportError:		# IronPython has no multiprocessing; frames rendered there run one after another
+	multiprocessing = None
+
+# Turntable animations of designs, rendered outside Rhino.
+# Rendering used to run -SetTurntableAnimation and -RecordAnimation in the Rhino session, which was blocked until every
+# frame was done. Now the design is exported once as a JSON mesh (see mesh_export.py) and a separate Python process
+# renders the frames with mesh_rasterizer on all cores, writing each PNG straight into the output folder. Frames already
+# there are skipped, so an interrupted render carries on where it stopped, and a range of frames can be rendered on its own.
+#
+# Run "python turntable_render.py design.json [design.json ...] [--output folder] [--frames 30] [--first 0] [--last 29]
+# [--size 640x480] [--processes 4] [--force]". Without --output, the frames of a design go next to its mesh file.
+
+# (mesh filename, Mesh) last loaded by this process; the frames of a design mostly go to the same workers one after another
+loaded_mesh = (None, None)
+
+# Return the file frame number is written to
+def get_frame_filename(output_folder, name, frame):
+	return os.path.join(output_folder, "%s_%04d.png" % (name, frame))
+
+# Return the view angle of frame number out of frames: one clockwise turn (seen from above) over the animation
+def get_frame_angle(frame, frames):
+	return mesh_rasterizer.DEFAULT_ANGLE - 360.0 * frame / frames
+
+# Render one frame and write it. Returns (filename, error message or None), so a bad frame is reported instead of
+# stopping the others.
+def render_frame(arguments):
+	global loaded_mesh
+	(mesh_filename, output_folder, frame, frames, width, height) = arguments
+	try:
+		if loaded_mesh[0] != mesh_filename:
+			loaded_mesh = (mesh_filename, mesh_export.read_json(mesh_filename))
+		mesh = loaded_mesh[1]
+		filename = get_frame_filename(output_folder, mesh.name, frame)
+		# written next to it first, so a frame that exists is always complete (and is skipped when resuming)
+		temp_filename = filename + ".tmp"
+		mesh_rasterizer.write_png(mesh_rasterizer.render_mesh(mesh, width, height, get_frame_angle(frame, frames)), temp_filename)
+		file_utils.replace_file(temp_filename, filename)
+		return (filename, None)
+	except Exception as error:
+		return (mesh_filename + " frame " + str(frame), type(error).__name__ + ": " + str(error))
+
+# Render frames first to last (inclusive, of frames in a full turn) of every mesh file, processes at a time (all cores if
+# None). Frames go to output_folder, or next to their mesh if it is None; frames that exist already are skipped unless force.
+# Returns the list of (filename, error message or None) in the order the frames finish.
+def render_turntables(mesh_filenames, output_folder=None, frames=config.turntable_frames, first=0, last=None, size=config.turntable_size, processes=None, force=False):
+	if last is None:
+		last = frames - 1
+	(width, height) = size
+	arguments = []
+	for mesh_filename in mesh_filenames:
+		folder = output_folder or os.path.dirname(os.path.abspath(mesh_filename))
+		if not os.path.exists(folder):
+			os.makedirs(folder)
+		name = mesh_export.read_json(mesh_filename).name
+		for frame in range(max(first, 0), min(last, frames - 1) + 1):
+			if force or not os.path.exists(get_frame_filename(folder, name, frame)):
+				arguments.append((mesh_filename, folder, frame, frames, width, height))
+	if multiprocessing is None or processes == 1 or len(arguments) < 2:
+		return [render_frame(argument) for argument in arguments]
+	processes = processes or multiprocessing.cpu_count()
+	pool = multiprocessing.Pool(processes)
+	try:
+		return list(pool.imap_unordered(render_frame, arguments))
+	finally:
+		pool.close()
+		pool.join()
+
+# Write the mesh of object_id for emotion (an Emotion) to output_folder as name.json, for render_turntables. Returns the filename.
+def export_design(object_id, emotion, output_folder, name):
+	if not os.path.exists(output_folder):
+		os.makedirs(output_folder)
+	form = form_kernel.build_form(object_id, emotion.get_properties(), None, "render")
+	mesh_filename = os.path.join(output_folder, name + ".json")
+	mesh_export.write_json(mesh_export.get_detail_mesh(form, name), mesh_filename)
+	return mesh_filename
+
+# Start rendering the turntable of mesh_filename into its folder in a separate process (config.render_python) and return
+# its Popen without waiting for it, so Rhino can be used while the frames are rendered. Raises OSError if the process
+# can't be started; on_exit(exit code) is called on a background thread when it ends (see background_process.py).
+def start_render(mesh_filename, frames=config.turntable_frames, on_exit=None):
+	script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "turntable_render.py")
+	return background_process.start([config.render_python, script, mesh_filename, "--frames", str(frames)], os.path.dirname(script), on_exit)
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Render turntable animations of EmotiveModeler designs (JSON meshes from mesh_export), without Rhino.")
+	parser.add_argument("meshes", nargs="+", help="JSON mesh files")
+	parser.add_argument("--output", default=None, help="folder for the frames (default: the folder of each mesh)")
+	parser.add_argument("--frames", type=int, default=config.turntable_frames, help="frames in a full turn")
+	parser.add_argument("--first", type=int, default=0, help="first frame to render")
+	parser.add_argument("--last", type=int, default=None, help="last frame to render (default: the last of the turn)")
+	parser.add_argument("--size", default="%dx%d" % config.turntable_size, help="frame size in pixels, e.g. 640x480")
+	parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per core)")
+	parser.add_argument("--force", action="store_true", help="render frames that already exist again")
+	options = parser.parse_args()
+
+	try:
+		size = tuple(int(value) for value in options.size.lower().split("x"))
+	except ValueError:
+		size = ()
+	if len(size) != 2:
+		parser.error("--size must look like 640x480")
+	mesh_filenames = [os.path.abspath(filename) for filename in options.meshes]
+	output_folder = os.path.abspath(options.output) if options.output else None
+
+	results = render_turntables(mesh_filenames, output_folder, options.frames, options.first, options.last, size, options.processes, options.force)
+	failures = [(filename, error) for (filename, error) in results if error]
+	for (filename, error) in failures:
+		print("Failed " + filename + ": " + error)
+	print("Rendered %d frames of %d designs" % (len(results) - len(failures), len(mesh_filenames)))
+	sys.exit(1 if failures else 0)
@@ -0,0 +1,200 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import os
+import json
+import config
+import emotion_class
+import emotion_registry
+import file_utils
+
+# Journaled storage for the user dictionary (user_emotion_dictionary.json).
+# Instead of rewriting the whole JSON on every "Modify shape", each change is appended as one line to a journal file
+# next to it. Every so often (config.user_emotion_journal_limit changes) the journal is compacted: the dictionary is
+# written to a temp file, moved over the JSON and the journal is emptied. Loading reads the JSON and replays the journal.
+# A crash can at worst lose the change being written: the JSON is never written in place, a half written journal line
+# is ignored, and a journal that was already compacted into the JSON replays to the same entries.
+# The store also keeps an index from every word to the compound entries containing it ("calm" -> "calm.happy", ...),
+# so modify_breakdown only visits the entries an edit affects instead of splitting every key in the dictionary.
+# This module is deliberately left out of the reload() calls in the scripts, so every script shares the same store.
+
+# Journal entries: {"word": key, "breakdown": {...}} sets key, {"word": key, "deleted": true} removes it
+
+# Mapping of emotion id -> emotion breakdown that journals every change to disk
+class UserDictionaryStore(dict):
+
+	# snapshot_filename: the user dictionary JSON; journal_filename: its journal of changes
+	def __init__(self, snapshot_filename=config.user_emotion_dictionary_filename, journal_filename=config.user_emotion_journal_filename, journal_limit=config.user_emotion_journal_limit):
+		dict.__init__(self)
+		self.snapshot_filename = snapshot_filename
+		self.journal_filename = journal_filename
+		self.journal_limit = journal_limit
+		self.load()
+
+	# Read the dictionary from the snapshot and journal, replacing what is in memory
+	def load(self):
+		(entries, journal_entries, torn) = read_dictionary(self.snapshot_filename, self.journal_filename)
+		dict.clear(self)
+		dict.update(self, entries)
+		self.compound_keys = {}			# word: set of the compound keys (words separated by periods) containing it
+		for key in entries:
+			self.__index(key)
+		self.journal_entries = journal_entries
+		# the next entry would run into a torn line, and a long journal slows down loading
+		if torn or journal_entries >= self.journal_limit:
+			self.compact()
+		self.disk_state = self.__get_disk_state()
+
+	# Reload the dictionary if another process (or store) has changed the files since this store last read or wrote them
+	def refresh(self):
+		if self.__get_disk_state() != self.disk_state:
+			self.load()
+
+	def __setitem__(self, key, emotion_breakdown):
+		if key not in self:
+			self.__index(key)
+		dict.__setitem__(self, key, emotion_breakdown)
+		self.__append({"word": key, "breakdown": emotion_breakdown})
+
+	def __delitem__(self, key):
+		dict.__delitem__(self, key)
+		self.__unindex(key)
+		self.__append({"word": key, "deleted": True})
+
+	def pop(self, key, *default):
+		if key not in self:
+			return dict.pop(self, key, *default)
+		value = dict.pop(self, key)
+		self.__unindex(key)
+		self.__append({"word": key, "deleted": True})
+		return value
+
+	def setdefault(self, key, default=None):
+		if key not in self:
+			self[key] = default
+		return self[key]
+
+	def update(self, *args, **kwargs):
+		for (key, value) in dict(*args, **kwargs).items():
+			self[key] = value
+
+	def clear(self):
+		dict.clear(self)
+		self.compound_keys = {}
+		self.compact()
+
+	def popitem(self):
+		(key, value) = dict.popitem(self)
+		self.__unindex(key)
+		self.__append({"word": key, "deleted": True})
+		return (key, value)
+
+	# A plain dict copy (the copy doesn't write to disk)
+	def copy(self):
+		return dict(self)
+
+	# Iterate over a copy of the keys, so entries can be changed while iterating
+	def __iter__(self):
+		return iter(list(dict.keys(self)))
+
+	# Return the compound keys other than emotion_id that contain every word of emotion_id ("calm" or "calm.happy")
+	def get_keys_containing(self, emotion_id):
+		words = emotion_id.split(".")
+		candidates = [self.compound_keys.get(word, set()) for word in words]
+		candidates.sort(key=len)
+		keys = set(candidates[0]).intersection(*candidates[1:])
+		keys.discard(emotion_id)
+		return keys
+
+	# Write the whole dictionary to the snapshot file and empty the journal
+	def compact(self):
+		temp_filename = self.snapshot_filename + ".tmp"
+		with open(temp_filename, "w") as snapshot_file:
+			json.dump(dict(self), snapshot_file)
+			file_utils.sync(snapshot_file)
+		file_utils.replace_file(temp_filename, self.snapshot_filename)
+		# the journal only holds changes that are now in the snapshot, so losing it from here on is harmless
+		open(self.journal_filename, "w").close()
+		self.journal_entries = 0
+		self.disk_state = self.__get_disk_state()
+
+	# Append one change to the journal, compacting it once it holds journal_limit changes
+	def __append(self, entry):
+		file_utils.append_line(self.journal_filename, json.dumps(entry))
+		self.journal_entries += 1
+		if self.journal_entries >= self.journal_limit:
+			self.compact()
+		else:
+			self.disk_state = self.__get_disk_state()
+
+	# Add key to the word index if it is a compound key
+	def __index(self, key):
+		words = key.split(".")
+		if len(words) > 1:
+			for word in words:
+				self.compound_keys.setdefault(word, set()).add(key)
+
+	def __unindex(self, key):
+		words = key.split(".")
+		if len(words) > 1:
+			for word in words:
+				keys = self.compound_keys.get(word)
+				if keys is not None:
+					keys.discard(key)
+					if not keys:
+						del self.compound_keys[word]
+
+	# Return what the files on disk look like now (used to notice changes made by others)
+	def __get_disk_state(self):
+		return (file_modification(self.snapshot_filename), file_modification(self.journal_filename))
+
+# Return (modification time, size) of filename, or None if it doesn't exist
+def file_modification(filename):
+	if not os.path.exists(filename):
+		return None
+	status = os.stat(filename)
+	return (status.st_mtime, status.st_size)
+
+# Return (entries, number of journal entries, True if the journal has a half written line) for a snapshot and journal
+def read_dictionary(snapshot_filename, journal_filename):
+	file_utils.recover_file(snapshot_filename + ".tmp", snapshot_filename)
+	entries = {}
+	if os.path.exists(snapshot_filename):
+		with open(snapshot_filename) as snapshot_file:
+			entries = json.loads(snapshot_file.read())
+	# a line that can't be read was being written when the script stopped; it is skipped
+	(journal, torn) = file_utils.read_lines(journal_filename)
+	for entry in journal:
+		if entry.get("deleted"):
+			entries.pop(entry["word"], None)
+		else:
+			entries[entry["word"]] = entry["breakdown"]
+	return (entries, len(journal), torn)
+
+# Set the breakdown of emotion_id in the store user_emotion_dict and update the compound entries that contain all of its
+# words. A compound entry's breakdown is the sum of its words' breakdowns, so each affected entry is recalculated once
+# with the Emotion breakdown math (ignoring its own old entry, like reverting), in any order. Returns the updated keys.
+def modify_breakdown(user_emotion_dict, system_emotion_dict, emotion_id, emotion_breakdown):
+	user_emotion_dict[emotion_id] = emotion_breakdown
+	updated_keys = sorted(user_emotion_dict.get_keys_containing(emotion_id))
+	for key in updated_keys:
+		emotion = emotion_class.Emotion(key, user_emotion_dict, system_emotion_dict, emotion_registry.get_primary_emotion_taxonomy(), emotion_registry.get_primary_scaling_factors(), revert=True)
+		user_emotion_dict[key] = emotion.get_breakdown(revert=True)
+	return updated_keys
+
+# Return the user dictionary as a plain dict (snapshot plus journal) without changing any files, e.g. for batch tools
+def load_user_emotion_dictionary():
+	return read_dictionary(config.user_emotion_dictionary_filename, config.user_emotion_journal_filename)[0]
+
+store = None
+
+# Return the process-wide user dictionary store, reloading it if the files were changed by someone else
+def get_user_emotion_dictionary():
+	global store
+	if store is None:
+		store = UserDictionaryStore()
+	else:
+		store.refresh()
+	return store
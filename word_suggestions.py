@@ -0,0 +1,208 @@
+# EmotiveModeler CAD plugin for Rhino, 2016
+# Created by Philippa Mothersill as part of her Masters at the MIT Media Lab (2014) - read more here: http://emotivemodeler.media.mit.edu/
+# Advised by Mike Bove, Object-Based Media group, and helped by Itamar Belsen, Jane Cutler and Anna Walsh
+# Copyright 2016 Massachusetts Institute of Technology
+
+import sys
+import time
+
+# Finds the known words closest to a word that isn't in the dictionary, so an inflection ("happier") can be mapped to its
+# dictionary word ("happy") and a misspelling ("hapy") can be suggested instead of asking the user to add a new word.
+#	stems		suffix rules ("ier" -> "y", "ing" -> "" or "e", doubled consonants, ...) whose result is a dictionary word
+#	prefix trie	dictionary words starting with what was typed
+#	deletions	dictionary words one or two edits away (a typo or swapped letters), found through their one letter deletions
+# The structures are built once per dictionary, the first time a word is looked up.
+#
+# Run "python word_suggestions.py word ..." to see the suggestions and lookup times.
+
+# Inflection suffixes and what replaces them to get the word they were added to, longest suffix first
+SUFFIX_RULES = [
+	("iness", ["y"]),
+	("iest", ["y"]),
+	("ness", [""]),
+	("ier", ["y"]),
+	("ily", ["y"]),
+	("ies", ["y"]),
+	("ied", ["y"]),
+	("ing", ["", "e"]),
+	("est", ["", "e"]),
+	("ly", ["", "le"]),
+	("ed", ["", "e"]),
+	("er", ["", "e"]),
+	("es", ["", "e"]),
+	("s", [""]),
+]
+
+VOWELS = "aeiou"
+
+# Return the number of single character insertions, deletions, substitutions and swaps of neighbouring characters
+# that turn a into b (optimal string alignment distance)
+def edit_distance(a, b):
+	before_previous = None
+	previous = list(range(len(b) + 1))
+	for i in range(1, len(a) + 1):
+		current = [i]
+		for j in range(1, len(b) + 1):
+			distance = min(previous[j] + 1, current[j-1] + 1, previous[j-1] + (a[i-1] != b[j-1]))
+			if i > 1 and j > 1 and a[i-1] == b[j-2] and a[i-2] == b[j-1]:
+				distance = min(distance, before_previous[j-2] + 1)
+			current.append(distance)
+		(before_previous, previous) = (previous, current)
+	return previous[-1]
+
+# Return the words word might be an inflection of ("happier" -> ["happy"], "bigger" -> ["bigg", "big", ...]),
+# most likely first. They aren't checked against the dictionary.
+def get_stem_candidates(word):
+	candidates = []
+	for (suffix, replacements) in SUFFIX_RULES:
+		if len(word) > len(suffix) + 1 and word.endswith(suffix):
+			stem = word[:-len(suffix)]
+			for replacement in replacements:
+				candidates.append(stem + replacement)
+			# "bigger" -> "big", "stopped" -> "stop"
+			if len(stem) > 2 and stem[-1] == stem[-2] and stem[-1] not in VOWELS:
+				candidates.append(stem[:-1])
+	return candidates
+
+# Prefix tree of words: nested dicts of characters, with the word itself stored under None where a word ends
+class PrefixTrie():
+
+	def __init__(self, words=()):
+		self.root = {}
+		for word in words:
+			self.add(word)
+
+	def add(self, word):
+		node = self.root
+		for char in word:
+			node = node.setdefault(char, {})
+		node[None] = word
+
+	# Return up to limit words starting with prefix, shortest first
+	def get_words_with_prefix(self, prefix, limit=10):
+		node = self.root
+		for char in prefix:
+			node = node.get(char)
+			if node is None:
+				return []
+		# breadth first, so shorter words come first
+		words = []
+		level = [node]
+		while level and len(words) < limit:
+			next_level = []
+			for current in level:
+				for (char, child) in sorted(current.items(), key=lambda item: (item[0] is not None, item[0])):
+					if char is None:
+						words.append(child)
+					else:
+						next_level.append(child)
+			level = next_level
+		return words[:limit]
+
+# Index of the words one deletion away from every dictionary word ("happy" -> "appy", "hppy", "hapy", "happ").
+# Two words share a deletion (or one is a deletion of the other) when they are one insertion, deletion, substitution or
+# swap of neighbouring letters apart, so close words are found with a few dict lookups instead of comparing against
+# every word (the SymSpell idea, limited to one deletion to keep the index small).
+class DeletionIndex():
+
+	def __init__(self, words=()):
+		self.deletions = {}				# deletion: list of the words it comes from (or the word itself)
+		for word in words:
+			self.add(word)
+
+	def add(self, word):
+		for deletion in get_deletions(word):
+			self.deletions.setdefault(deletion, []).append(word)
+
+	# Return (distance, word) for the words found within max_distance edits of word, closest first
+	def search(self, word, max_distance):
+		candidates = set()
+		for deletion in get_deletions(word):
+			candidates.update(self.deletions.get(deletion, ()))
+		matches = []
+		for candidate in candidates:
+			distance = edit_distance(word, candidate)
+			if distance <= max_distance:
+				matches.append((distance, candidate))
+		matches.sort()
+		return matches
+
+# Return word and the strings made by deleting one of its characters
+def get_deletions(word):
+	deletions = set([word])
+	for i in range(len(word)):
+		deletions.add(word[:i] + word[i+1:])
+	return deletions
+
+class WordSuggestions():
+
+	# words: the dictionary words (any iterable, e.g. an emotion_index.EmotionIndex)
+	# word_weights: word -> weight; of the words equally close, the heavier ones are suggested first (optional)
+	def __init__(self, words, word_weights=None):
+		self.words = set(words)
+		self.word_weights = word_weights or {}
+		self.trie = PrefixTrie(self.words)
+		self.deletions = DeletionIndex(self.words)
+
+	def __contains__(self, word):
+		return word in self.words
+
+	# Return the dictionary words word is an inflection of, most likely first
+	def get_stem_matches(self, word):
+		matches = []
+		for candidate in get_stem_candidates(word):
+			if candidate in self.words and candidate not in matches:
+				matches.append(candidate)
+		return matches
+
+	# Return up to limit dictionary words within max_distance (at most 2) edits of word, closest first. Words two edits away
+	# are only found if the edits are next to each other or one is a deletion.
+	def get_close_words(self, word, max_distance=2, limit=5):
+		matches = self.deletions.search(word, max_distance)
+		matches.sort(key=lambda match: (match[0], -self.word_weights.get(match[1], 0), match[1]))
+		return [match for (distance, match) in matches if match != word][:limit]
+
+	# Return up to limit dictionary words starting with prefix, shortest first
+	def get_words_with_prefix(self, prefix, limit=10):
+		return self.trie.get_words_with_prefix(prefix, limit)
+
+	# Return the dictionary word an unknown word can be replaced by without asking (its stem, e.g. "happier" -> "happy"),
+	# or None if there isn't one
+	def get_best_match(self, word):
+		matches = self.get_stem_matches(word)
+		return matches[0] if matches else None
+
+	# Return up to limit dictionary words to suggest for word: its stems, then close words, then completions
+	def suggest(self, word, limit=5):
+		suggestions = self.get_stem_matches(word)
+		max_distance = 1 if len(word) <= 4 else 2
+		for match in self.get_close_words(word, max_distance, limit) + self.get_words_with_prefix(word, limit):
+			if match not in suggestions and match != word:
+				suggestions.append(match)
+		return suggestions[:limit]
+
+suggestions = None
+suggestions_dict = None
+
+# Return the WordSuggestions for system_emotion_dict, building it the first time. Words added to the dictionary later
+# aren't in it, which is fine: they are known words, so they are never looked up.
+def get_word_suggestions(system_emotion_dict):
+	global suggestions, suggestions_dict
+	if suggestions is None or suggestions_dict is not system_emotion_dict:
+		# words with stronger emotions are more useful suggestions ("happy" before "hap")
+		word_weights = dict((word, sum(system_emotion_dict[word].values())) for word in system_emotion_dict)
+		suggestions = WordSuggestions(system_emotion_dict, word_weights)
+		suggestions_dict = system_emotion_dict
+	return suggestions
+
+if __name__ == "__main__":
+	import emotion_index
+	system_emotion_dict = emotion_index.load_system_emotion_dictionary()
+	start = time.time()
+	word_suggestions = get_word_suggestions(system_emotion_dict)
+	print("Built suggestions for %d words in %.2f s" % (len(word_suggestions.words), time.time() - start))
+	for word in sys.argv[1:] or ["happier", "hapy", "furiously", "calmness", "sadder", "exstatic", "lov"]:
+		start = time.time()
+		best_match = word_suggestions.get_best_match(word)
+		found = word_suggestions.suggest(word)
+		print("%-12s best match %-10s suggestions %s (%.2f ms)" % (word, best_match, ", ".join(found), (time.time() - start) * 1000))